@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import CACHE_EVENTS, ENGINE_ERRORS, ENGINE_IMAGES, ENGINE_SECONDS, span, trace
+from .models import BlockArray, OcrResult, map_block_boxes
+from .ocr.base import InputError, OCREngine
+from .preprocess import PreparedImage, Preprocessor
+
+# Bump when the on-disk entry layout or key derivation changes.
+CACHE_SCHEMA_VERSION = 1
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file's contents, read in chunks."""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+# CacheStats field -> `event` label of paku_cache_events_total.
+_CACHE_EVENT_NAMES = {"hits": "hit", "misses": "miss", "writes": "write", "evictions": "eviction"}
+
+
+class OcrResultCache:
+    """
+    Persistent, content-addressed cache of OcrResult objects.
+
+    Entries live under `root` as one JSON file each, sharded by the first two
+    hex digits of the key. The key is derived from the file contents plus the
+    engine name and its cache params, so moving or renaming an image keeps
+    its entry valid, while changing e.g. `paddle_lang` does not reuse it.
+
+    LRU eviction uses the entry mtime as last-access time: hits touch the
+    file, and once the total size exceeds `max_bytes` the least recently
+    used entries are removed until usage drops below the low watermark.
+    """
+
+    _STATS_FILE = "stats.json"
+    _LOW_WATERMARK = 0.9
+
+    def __init__(self, root: Path, max_bytes: int, logger=None) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._total_bytes: Optional[int] = None
+
+    # ---------- keys ----------
+
+    def key_for(
+        self,
+        path: Path,
+        engine: OCREngine,
+        preprocess: Optional[dict] = None,
+    ) -> str:
+        payload = {
+            "v": CACHE_SCHEMA_VERSION,
+            "content": hash_file(path),
+            "engine": engine.name(),
+            "params": engine.cache_params(),
+        }
+        # Only engines fed decoded pixels see the preprocessing options, so
+        # keys of engines that read files themselves are left unchanged.
+        if preprocess is not None:
+            payload["preprocess"] = preprocess
+        blob = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    # ---------- lookup / store ----------
+
+    def get(self, key: str, path: Optional[Path] = None) -> Optional[OcrResult]:
+        """
+        Return the cached result for `key`, or None on a miss.
+
+        If `path` is given and the entry was produced for a different file
+        with identical contents, meta values pointing at the old path are
+        rebound to the new one.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            data = json.loads(entry_path.read_text(encoding="utf-8"))
+            fields = data["result"]
+            # Cached blocks load into columns, not one model per block.
+            fields["blocks"] = BlockArray(fields.get("blocks") or ()).as_blocks()
+            result = OcrResult.model_validate(fields)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count(misses=1)
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        self._count(hits=1)
+
+        source = data.get("source")
+        if path is not None and source and source != str(path):
+            result.meta = {
+                k: (str(path) if v == source else v) for k, v in result.meta.items()
+            }
+        return result
+
+    def put(self, key: str, result: OcrResult, path: Optional[Path] = None) -> None:
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "v": CACHE_SCHEMA_VERSION,
+            "source": str(path) if path is not None else None,
+            "result": result.model_dump(mode="json"),
+        }
+        blob = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        tmp = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(blob)
+        with self._lock:
+            # An overwritten entry only adds the difference in size.
+            try:
+                old_size = entry_path.stat().st_size
+            except OSError:
+                old_size = 0
+            os.replace(tmp, entry_path)
+            if self._total_bytes is not None:
+                self._total_bytes += len(blob) - old_size
+            over = self._current_bytes_locked() > self.max_bytes
+
+        self._count(writes=1)
+        if over:
+            self.prune()
+
+    # ---------- maintenance ----------
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if not self.root.is_dir():
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+        return entries
+
+    def _current_bytes_locked(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        return self._total_bytes
+
+    def usage(self) -> Tuple[int, int]:
+        """Return (entry_count, total_bytes) by scanning the cache directory."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            self._total_bytes = total
+        return len(entries), total
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict least recently used entries until usage is below the low
+        watermark of `max_bytes` (defaults to the configured cap).
+        Returns the number of evicted entries.
+        """
+        cap = self.max_bytes if max_bytes is None else max_bytes
+        target = int(cap * self._LOW_WATERMARK)
+
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= cap:
+            with self._lock:
+                self._total_bytes = total
+            return 0
+
+        entries.sort(key=lambda e: e[0])
+        removed = 0
+        for _, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                entry_path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._total_bytes = total
+        self._count(evictions=removed)
+        if self._logger is not None and removed:
+            self._logger.info(f"[cache] Evicted {removed} entries from {self.root}")
+        return removed
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of removed entries."""
+        return self.prune(max_bytes=0)
+
+    # ---------- stats ----------
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for field, delta in deltas.items():
+                setattr(self._stats, field, getattr(self._stats, field) + delta)
+        for field, delta in deltas.items():
+            if delta:
+                CACHE_EVENTS.inc(delta, event=_CACHE_EVENT_NAMES.get(field, field))
+
+    def stats(self) -> CacheStats:
+        """Counters accumulated in this process since the last flush."""
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+    def persisted_stats(self) -> CacheStats:
+        try:
+            data = json.loads((self.root / self._STATS_FILE).read_text(encoding="utf-8"))
+            return CacheStats(**{k: int(data.get(k, 0)) for k in asdict(CacheStats())})
+        except (OSError, ValueError):
+            return CacheStats()
+
+    def take_stats(self) -> CacheStats:
+        """Return the in-process counters and reset them."""
+        with self._lock:
+            delta = self._stats
+            self._stats = CacheStats()
+        return delta
+
+    def add_stats(self, other: CacheStats) -> None:
+        """Fold counters gathered elsewhere (e.g. worker processes) into ours."""
+        # Not via _count: the workers' metrics arrive with their own snapshot.
+        with self._lock:
+            for field, delta in asdict(other).items():
+                setattr(self._stats, field, getattr(self._stats, field) + delta)
+
+    def flush_stats(self) -> None:
+        """Add the in-process counters to the persisted totals and reset them."""
+        delta = self.take_stats()
+        if delta == CacheStats():
+            return
+
+        totals = self.persisted_stats()
+        for field, value in asdict(delta).items():
+            setattr(totals, field, getattr(totals, field) + value)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        stats_path = self.root / self._STATS_FILE
+        tmp = stats_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(asdict(totals)), encoding="utf-8")
+        os.replace(tmp, stats_path)
+
+
+def _preprocessing(
+    engine: OCREngine, preprocessor: Optional[Preprocessor]
+) -> Optional[Preprocessor]:
+    if preprocessor is not None and preprocessor.applies_to(engine):
+        return preprocessor
+    return None
+
+
+def _annotate(result: OcrResult, image: PreparedImage) -> OcrResult:
+    """Record the preprocessing and put block boxes back in original pixels."""
+    update: dict = {"meta": {**result.meta, "preprocess": image.info()}}
+    if image.scale != 1.0 or image.deskew_angle:
+        update["blocks"] = map_block_boxes(result.blocks, image.to_original)
+    return result.model_copy(update=update)
+
+
+_call_depth = threading.local()
+
+
+@contextmanager
+def _engine_call(engine: OCREngine, call: str, images: int) -> Iterator[None]:
+    """
+    Latency, image and error metrics for one engine call. Routed engines
+    call concrete engines through here too; only the outermost call counts
+    towards the "ocr" stage, the nested ones are traced under their name.
+    """
+    name = engine.name()
+    depth = getattr(_call_depth, "value", 0)
+    _call_depth.value = depth + 1
+    timer = span("ocr", engine=name, images=images) if depth == 0 else trace(name, images=images)
+    started = time.perf_counter()
+    try:
+        with timer:
+            yield
+    except Exception:
+        ENGINE_ERRORS.inc(engine=name)
+        raise
+    finally:
+        _call_depth.value = depth
+        ENGINE_SECONDS.observe(time.perf_counter() - started, engine=name, call=call)
+        ENGINE_IMAGES.inc(images, engine=name)
+
+
+def _load(preprocessor: Preprocessor, path: Path) -> PreparedImage:
+    try:
+        return preprocessor.load(path)
+    except Exception as exc:  # noqa: BLE001
+        raise InputError(f"Could not load {path}: {exc}") from exc
+
+
+def _key(
+    cache: OcrResultCache, path: Path, engine: OCREngine, params: Optional[dict]
+) -> str:
+    try:
+        return cache.key_for(path, engine, preprocess=params)
+    except OSError as exc:
+        raise InputError(f"Could not read {path}: {exc}") from exc
+
+
+def _extract(
+    engine: OCREngine, path: Path, preprocessor: Optional[Preprocessor]
+) -> OcrResult:
+    if preprocessor is None:
+        with _engine_call(engine, "extract", 1):
+            return engine.extract(path)
+    image = _load(preprocessor, path)
+    with _engine_call(engine, "extract", 1):
+        result = engine.extract_image(image.pixels, path)
+    return _annotate(result, image)
+
+
+def _extract_batch(
+    engine: OCREngine, paths: Sequence[Path], preprocessor: Optional[Preprocessor]
+) -> List[OcrResult]:
+    if preprocessor is None:
+        with _engine_call(engine, "batch", len(paths)):
+            return _check_batch(engine, paths, engine.extract_batch(paths))
+    images = [_load(preprocessor, p) for p in paths]
+    with _engine_call(engine, "batch", len(paths)):
+        results = engine.extract_image_batch([i.pixels for i in images], paths)
+    _check_batch(engine, paths, results)
+    return [_annotate(r, i) for r, i in zip(results, images)]
+
+
+def _check_batch(
+    engine: OCREngine, paths: Sequence[Path], results: List[OcrResult]
+) -> List[OcrResult]:
+    # Results are matched to paths by position; a short batch would drop
+    # images silently (and leave their callers waiting).
+    if len(results) != len(paths):
+        raise RuntimeError(
+            f"[{engine.name()}] Batch returned {len(results)} results "
+            f"for {len(paths)} images"
+        )
+    return results
+
+
+def cached_extract(
+    engine: OCREngine,
+    path: Path,
+    cache: Optional[OcrResultCache],
+    preprocessor: Optional[Preprocessor] = None,
+) -> OcrResult:
+    """
+    Run `engine.extract(path)` through the result cache when one is given
+    and the engine is cacheable. Shared by every pipeline that runs OCR.
+
+    With a `preprocessor`, engines that accept decoded images get
+    `extract_image` on the preprocessed pixels instead; the image is only
+    decoded on a cache miss.
+    """
+    preprocessor = _preprocessing(engine, preprocessor)
+    if cache is None or not engine.cacheable():
+        return _extract(engine, path, preprocessor)
+
+    params = preprocessor.cache_params() if preprocessor is not None else None
+    key = _key(cache, path, engine, params)
+    result = cache.get(key, path=path)
+    if result is not None:
+        return result
+
+    result = _extract(engine, path, preprocessor)
+    cache.put(key, result, path=path)
+    return result
+
+
+def cached_extract_batch(
+    engine: OCREngine,
+    paths: Sequence[Path],
+    cache: Optional[OcrResultCache],
+    preprocessor: Optional[Preprocessor] = None,
+) -> List[OcrResult]:
+    """
+    Batched counterpart of `cached_extract`: cache hits are served directly
+    and only the misses are sent to `engine.extract_batch` (or
+    `extract_image_batch`), in one call.
+    """
+    preprocessor = _preprocessing(engine, preprocessor)
+    if cache is None or not engine.cacheable():
+        return _extract_batch(engine, paths, preprocessor)
+
+    params = preprocessor.cache_params() if preprocessor is not None else None
+    found: Dict[int, OcrResult] = {}
+    keys: Dict[int, str] = {}
+    for i, p in enumerate(paths):
+        keys[i] = _key(cache, p, engine, params)
+        hit = cache.get(keys[i], path=p)
+        if hit is not None:
+            found[i] = hit
+
+    missing = [i for i in range(len(paths)) if i not in found]
+    if missing:
+        fresh = _extract_batch(engine, [paths[i] for i in missing], preprocessor)
+        for i, result in zip(missing, fresh):
+            cache.put(keys[i], result, path=paths[i])
+            found[i] = result
+
+    return [found[i] for i in range(len(paths))]
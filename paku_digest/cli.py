@@ -1,34 +1,59 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
 from pathlib import Path
 import json
 import sys
 
 import typer
 
-from typing import List
+from typing import TYPE_CHECKING, Iterable, List, cast
 
 from .context import AppContext
 from .config import AppConfig
-from .pipelines.digest_pipeline import run_digest
+from .discovery import DiscoveryOptions, iter_images
+from .manifest import DigestManifest, RunPlan, truncate_output
+from .metrics import REGISTRY, TRACER
+from .models import Document
+from .preprocess import PreprocessOptions
+from .similarity import SIMILARITY_METRICS
+from .pipelines.digest_pipeline import iter_digest
 from .pipelines.benchmark_pipeline import run_benchmark
 from .pipelines.compare_pipeline import run_compare
-from .pipelines.export_pipeline import export_documents_to_string
+from .pipelines.export_pipeline import (
+    EXPORT_FORMATS,
+    ExportFormat,
+    open_export_file,
+    write_documents,
+)
+
+if TYPE_CHECKING:
+    from .index import ResultIndex
+    from .workqueue import WorkQueue
+
+# Commands import the modules only they use (server, watch, queue, index,
+# store, profiling) when they run, keeping `paku-digest --help` and the
+# other commands quick to start.
 
 app = typer.Typer(help="paku-digest – OCR and document extraction pipeline.")
+cache_app = typer.Typer(help="Inspect or prune the OCR result cache.")
+app.add_typer(cache_app, name="cache")
+queue_app = typer.Typer(help="Spread a digest over workers on several hosts via a shared queue.")
+app.add_typer(queue_app, name="queue")
 
 
 @app.command()
 @app.command()
 def digest(
-    input_path: Path = typer.Argument(..., help="Input file or directory."),
+    input_path: Path = typer.Argument(..., help="Input image, PDF or directory."),
     ocr: str | None = typer.Option(
         None,
         "--ocr",
         help=(
             "OCR engine or strategy to use. "
             "Engines: stub, paddle, chandra-api. "
-            "Strategies: light, heavy, auto. "
+            "Strategies: light, heavy, auto, cascade (light first, heavy "
+            "only for low-confidence or empty results). "
             "Defaults to PAKU_DEFAULT_OCR."
         ),
     ),
@@ -38,47 +63,671 @@ def digest(
         help=(
             "Number of parallel workers. "
             "0 = use PAKU_MAX_WORKERS from config; "
-            "1 = sequential; >1 = ThreadPool."
+            "1 = sequential; >1 = parallel (see --executor)."
+        ),
+    ),
+    executor: str | None = typer.Option(
+        None,
+        "--executor",
+        help=(
+            "Parallel executor: thread (shared engine) | process "
+            "(one engine per worker process). Defaults to PAKU_EXECUTOR."
+        ),
+    ),
+    batch_size: int = typer.Option(
+        1,
+        "--batch-size",
+        help=(
+            "Images per engine call. >1 groups paths into batches so engines "
+            "can batch model invocation (default: 1)."
+        ),
+    ),
+    max_in_flight: int = typer.Option(
+        0,
+        "--max-in-flight",
+        help=(
+            "Most tasks submitted to the workers and not yet written out "
+            "(0 = PAKU_MAX_IN_FLIGHT, or 4 per worker)."
+        ),
+    ),
+    ordered: bool = typer.Option(
+        False,
+        "--ordered/--unordered",
+        help=(
+            "Write documents in input order rather than as they complete "
+            "(default: unordered)."
         ),
     ),
     format: str = typer.Option(
         "json",
         "--format",
         "-f",
-        help="Output format: json | jsonl | txt | csv (default: json).",
+        help=(
+            "Output format: json | jsonl | txt | csv | bin (indexed binary "
+            "result store, needs --out) (default: json)."
+        ),
     ),
     out: Path | None = typer.Option(
         None,
         "--out",
         help="Output file (stdout by default).",
     ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Reuse OCR results from the workdir result cache (default: on).",
+    ),
+    use_manifest: bool = typer.Option(
+        True,
+        "--manifest/--no-manifest",
+        help="Record processed files in the workdir checkpoint manifest (default: on).",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help=(
+            "Continue the last run over this input: skip files it already "
+            "processed and append to its --out file (jsonl, csv or txt)."
+        ),
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="Only process files that are new or changed since the last run.",
+    ),
+    include: List[str] = typer.Option(
+        None,
+        "--include",
+        help=(
+            "Glob a file must match to be processed (repeatable). Patterns "
+            "with '/' match the path relative to the input, others the file name."
+        ),
+    ),
+    exclude: List[str] = typer.Option(
+        None,
+        "--exclude",
+        help="Glob for files or directories to skip (repeatable); excluded directories are not scanned.",
+    ),
+    max_depth: int | None = typer.Option(
+        None,
+        "--max-depth",
+        help="Directory levels to descend below the input (0 = top level only; default: unlimited).",
+    ),
+    symlinks: str = typer.Option(
+        "files",
+        "--symlinks",
+        help="Symlink policy: skip | files (keep linked files, don't enter linked dirs) | follow.",
+    ),
+    discovery_workers: int = typer.Option(
+        1,
+        "--discovery-workers",
+        help="Threads scanning the input tree concurrently (default: 1).",
+    ),
+    max_side: int | None = typer.Option(
+        None,
+        "--max-side",
+        help=(
+            "Downscale images whose longer side exceeds this many pixels "
+            "before OCR (0 = off). Defaults to PAKU_PREPROCESS_MAX_SIDE."
+        ),
+    ),
+    grayscale: bool | None = typer.Option(
+        None,
+        "--grayscale/--no-grayscale",
+        help="Convert images to grayscale before OCR. Defaults to PAKU_PREPROCESS_GRAYSCALE.",
+    ),
+    deskew: bool | None = typer.Option(
+        None,
+        "--deskew/--no-deskew",
+        help="Rotate skewed text level before OCR. Defaults to PAKU_PREPROCESS_DESKEW.",
+    ),
+    pdf_dpi: int | None = typer.Option(
+        None,
+        "--pdf-dpi",
+        help="Resolution PDF pages are rasterized at for OCR. Defaults to PAKU_PDF_DPI.",
+    ),
+    dedup: bool | None = typer.Option(
+        None,
+        "--dedup/--no-dedup",
+        help=(
+            "OCR only one image of each group of near-duplicates (consecutive "
+            "frames, re-uploads) and copy its result to the rest. Needs Pillow. "
+            "Defaults to PAKU_DEDUP."
+        ),
+    ),
+    dedup_distance: int | None = typer.Option(
+        None,
+        "--dedup-distance",
+        help=(
+            "Bits two 64-bit perceptual hashes may differ by to count as near-"
+            "duplicates with --dedup. Defaults to PAKU_DEDUP_DISTANCE."
+        ),
+    ),
+    index: bool | None = typer.Option(
+        None,
+        "--index/--no-index",
+        help=(
+            "Also write documents into the workdir's full-text search index "
+            "(see `search`). Defaults to PAKU_INDEX_ENABLED."
+        ),
+    ),
+    metrics_out: Path | None = typer.Option(
+        None,
+        "--metrics-out",
+        help=(
+            "Write run metrics (documents, errors, per-stage and per-engine "
+            "latency, cache hits) here in Prometheus text format."
+        ),
+    ),
+    trace_out: Path | None = typer.Option(
+        None,
+        "--trace-out",
+        help="Write a per-stage trace of the run here (Chrome trace JSON, e.g. for Perfetto).",
+    ),
+    profile: Path | None = typer.Option(
+        None,
+        "--profile",
+        help=(
+            "Sample a CPU profile of the run (all threads and worker processes) "
+            "into PREFIX.pstats and PREFIX.collapsed (flamegraphs), and print "
+            "the hottest functions per stage."
+        ),
+    ),
+    profile_interval_ms: float = typer.Option(
+        10.0,
+        "--profile-interval-ms",
+        help="Milliseconds between profile samples (default: 10).",
+    ),
+    profile_top: int = typer.Option(
+        15,
+        "--profile-top",
+        help="Functions listed in the profile summary (default: 15).",
+    ),
 ) -> None:
+    fmt = format.lower()
+    if fmt not in EXPORT_FORMATS and fmt != "bin":
+        raise typer.BadParameter(
+            f"Unsupported format: {format!r}. Use one of: json, jsonl, txt, csv, bin.",
+            param_hint="--format",
+        )
+
+    if fmt == "bin" and out is None:
+        raise typer.BadParameter("--format bin needs --out.", param_hint="--format")
+
+    if executor is not None and executor.lower() not in {"thread", "process"}:
+        raise typer.BadParameter(
+            f"Unsupported executor: {executor!r}. Use one of: thread, process.",
+            param_hint="--executor",
+        )
+
+    if batch_size < 1:
+        raise typer.BadParameter("--batch-size must be >= 1", param_hint="--batch-size")
+
+    if max_in_flight < 0:
+        raise typer.BadParameter("--max-in-flight must be >= 0", param_hint="--max-in-flight")
+
+    _check_profile_options(profile_interval_ms, profile_top)
+    discovery = _discovery_options(include, exclude, max_depth, symlinks, discovery_workers)
+
+    if max_side is not None and max_side < 0:
+        raise typer.BadParameter("--max-side must be >= 0", param_hint="--max-side")
+
+    if pdf_dpi is not None and pdf_dpi < 1:
+        raise typer.BadParameter("--pdf-dpi must be >= 1", param_hint="--pdf-dpi")
+
+    if dedup_distance is not None and not 0 <= dedup_distance <= 32:
+        raise typer.BadParameter(
+            "--dedup-distance must be between 0 and 32", param_hint="--dedup-distance"
+        )
+
+    if (resume or incremental) and not use_manifest:
+        raise typer.BadParameter(
+            "--resume / --incremental need the manifest; drop --no-manifest.",
+            param_hint="--no-manifest",
+        )
+
+    if resume and (out is None or fmt in ("json", "bin")):
+        raise typer.BadParameter(
+            "--resume needs --out with jsonl, csv or txt "
+            "(a JSON array or result store cannot be appended to).",
+            param_hint="--resume",
+        )
+
+    ctx = AppContext.instance()
+    TRACER.enabled = trace_out is not None
     if workers <= 0:
-        ctx = AppContext.instance()
         resolved_workers = ctx.config.max_workers
     else:
         resolved_workers = workers
 
-    docs = run_digest(
+    cfg = ctx.config
+    try:
+        ctx.check_engine_key(ocr or cfg.default_ocr)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--ocr")
+
+    preprocess = PreprocessOptions(
+        max_side=cfg.preprocess_max_side if max_side is None else max_side,
+        grayscale=cfg.preprocess_grayscale if grayscale is None else grayscale,
+        deskew=cfg.preprocess_deskew if deskew is None else deskew,
+    )
+    dedup_bits: int | None = None
+    if cfg.dedup_enabled if dedup is None else dedup:
+        dedup_bits = cfg.dedup_distance if dedup_distance is None else dedup_distance
+
+    manifest: DigestManifest | None = None
+    plan: RunPlan | None = None
+    if use_manifest:
+        manifest = DigestManifest.for_input(ctx.config.manifest_dir, input_path)
+        try:
+            plan = manifest.plan(
+                resume=resume,
+                incremental=incremental,
+                out=out,
+                fmt=fmt,
+                log=ctx.logger,
+            )
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--resume")
+
+    docs = iter_digest(
         input_path=input_path,
         ocr_engine_name=ocr,
         workers=resolved_workers,
+        use_cache=use_cache,
+        executor=executor,
+        batch_size=batch_size,
+        skip=plan.skip if plan is not None else None,
+        discovery=discovery,
+        preprocess=preprocess,
+        pdf_dpi=pdf_dpi,
+        max_in_flight=max_in_flight,
+        ordered=ordered,
+        dedup_distance=dedup_bits,
+    )
+
+    result_index: ResultIndex | None = None
+    if cfg.index_enabled if index is None else index:
+        result_index = _open_index(cfg.index_path)
+        docs = result_index.tap(docs)
+
+    # Documents are written as they complete; nothing is accumulated.
+    try:
+        with _profiling(profile, profile_interval_ms, profile_top):
+            _export_digest(docs, fmt=fmt, out=out, manifest=manifest, plan=plan, log=ctx.logger)
+    finally:
+        if result_index is not None:
+            result_index.close()
+        _write_telemetry(metrics_out, trace_out, ctx.logger)
+
+
+def _open_index(path: Path) -> "ResultIndex":
+    from .index import ResultIndex
+
+    try:
+        return ResultIndex(path)
+    except RuntimeError as e:
+        raise typer.BadParameter(str(e), param_hint="--index")
+
+
+def _check_profile_options(interval_ms: float, top: int) -> None:
+    if interval_ms <= 0:
+        raise typer.BadParameter(
+            "--profile-interval-ms must be > 0", param_hint="--profile-interval-ms"
+        )
+    if top < 1:
+        raise typer.BadParameter("--profile-top must be >= 1", param_hint="--profile-top")
+
+
+def _profiling(prefix: Path | None, interval_ms: float, top: int):
+    """Profile the block into `prefix`.* when given; summary goes to stderr."""
+    if prefix is None:
+        return nullcontext()
+    from .profiling import profile_session
+
+    return profile_session(
+        prefix, interval_ms / 1000.0, top, report=lambda text: typer.echo(text, err=True)
     )
 
+
+def _write_telemetry(metrics_out: Path | None, trace_out: Path | None, log) -> None:
+    if metrics_out is not None:
+        REGISTRY.write(metrics_out)
+        log.info(f"[metrics] Wrote metrics to {metrics_out}")
+    if trace_out is not None:
+        count = TRACER.write(trace_out)
+        TRACER.enabled = False
+        log.info(f"[metrics] Wrote {count} spans to {trace_out}")
+
+
+@app.command()
+def watch(
+    input_dir: Path = typer.Argument(..., help="Directory to watch."),
+    ocr: str | None = typer.Option(
+        None,
+        "--ocr",
+        help="OCR engine or strategy (see `digest`). Defaults to PAKU_DEFAULT_OCR.",
+    ),
+    format: str = typer.Option(
+        "jsonl",
+        "--format",
+        "-f",
+        help="Output format: jsonl | txt | csv (default: jsonl).",
+    ),
+    out: Path | None = typer.Option(
+        None,
+        "--out",
+        help="File new results are appended to (stdout by default).",
+    ),
+    index: bool | None = typer.Option(
+        None,
+        "--index/--no-index",
+        help="Also write results into the full-text search index. Defaults to PAKU_INDEX_ENABLED.",
+    ),
+    workers: int = typer.Option(
+        0,
+        "--workers",
+        help="Threads OCR'ing a batch of changes (0 = PAKU_MAX_WORKERS).",
+    ),
+    batch_size: int = typer.Option(
+        1,
+        "--batch-size",
+        help="Images per engine call (default: 1).",
+    ),
+    interval: float = typer.Option(
+        2.0,
+        "--interval",
+        help="Seconds between checks for changes (default: 2).",
+    ),
+    settle: float = typer.Option(
+        2.0,
+        "--settle",
+        help=(
+            "Seconds a file's size and mtime must stay unchanged before it is "
+            "processed, so partially written files are skipped (default: 2)."
+        ),
+    ),
+    poll: bool = typer.Option(
+        False,
+        "--poll",
+        help="Poll the tree even when file-system events (watchdog) are available.",
+    ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Reuse OCR results from the workdir result cache (default: on).",
+    ),
+    use_manifest: bool = typer.Option(
+        True,
+        "--manifest/--no-manifest",
+        help=(
+            "Record processed files in the checkpoint manifest and skip files "
+            "unchanged since an earlier run (default: on)."
+        ),
+    ),
+    include: List[str] = typer.Option(
+        None,
+        "--include",
+        help="Glob a file must match to be processed (repeatable).",
+    ),
+    exclude: List[str] = typer.Option(
+        None,
+        "--exclude",
+        help="Glob for files or directories to skip (repeatable).",
+    ),
+    max_depth: int | None = typer.Option(
+        None,
+        "--max-depth",
+        help="Directory levels to watch below the input (default: unlimited).",
+    ),
+    pdf_dpi: int | None = typer.Option(
+        None,
+        "--pdf-dpi",
+        help="Resolution PDF pages are rasterized at for OCR. Defaults to PAKU_PDF_DPI.",
+    ),
+    metrics_out: Path | None = typer.Option(
+        None,
+        "--metrics-out",
+        help=(
+            "Keep Prometheus metrics in this file, rewritten after every batch "
+            "(e.g. for node_exporter's textfile collector)."
+        ),
+    ),
+) -> None:
+    """
+    Keep the OCR engine loaded and process files as they are added to or
+    changed in a directory, appending results to --out. Stop with Ctrl+C.
+    """
     fmt = format.lower()
-    if fmt not in {"json", "jsonl", "txt", "csv"}:
+    if fmt not in ("jsonl", "txt", "csv"):
         raise typer.BadParameter(
-            f"Unsupported format: {format!r}. Use one of: json, jsonl, txt, csv.",
+            f"Unsupported format: {format!r}. Use one of: jsonl, txt, csv "
+            "(watch appends, so json and bin are not available).",
             param_hint="--format",
         )
+    if not input_dir.is_dir():
+        raise typer.BadParameter(f"Not a directory: {input_dir}", param_hint="INPUT_DIR")
+    if batch_size < 1:
+        raise typer.BadParameter("--batch-size must be >= 1", param_hint="--batch-size")
+    if interval <= 0:
+        raise typer.BadParameter("--interval must be > 0", param_hint="--interval")
+    if settle < 0:
+        raise typer.BadParameter("--settle must be >= 0", param_hint="--settle")
+    if pdf_dpi is not None and pdf_dpi < 1:
+        raise typer.BadParameter("--pdf-dpi must be >= 1", param_hint="--pdf-dpi")
+
+    discovery = _discovery_options(include, exclude, max_depth, "files", 1)
+    ctx = AppContext.instance()
+    cfg = ctx.config
+
+    from .watch import WatchSink, run_watch
+
+    result_index: ResultIndex | None = None
+    if cfg.index_enabled if index is None else index:
+        result_index = _open_index(cfg.index_path)
+
+    sink = WatchSink(out, fmt, index=result_index)
+    try:
+        run_watch(
+            input_dir,
+            sink,
+            ocr_engine_name=ocr,
+            workers=workers or None,
+            use_cache=use_cache,
+            batch_size=batch_size,
+            discovery=discovery,
+            pdf_dpi=pdf_dpi,
+            interval=interval,
+            settle_s=settle,
+            poll=poll,
+            use_manifest=use_manifest,
+            metrics_out=metrics_out,
+        )
+    finally:
+        sink.close()
 
-    text = export_documents_to_string(docs, fmt=fmt)
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind (default: 127.0.0.1)."),
+    port: int = typer.Option(8080, "--port", help="TCP port (default: 8080)."),
+    ocr: str | None = typer.Option(
+        None,
+        "--ocr",
+        help="OCR engine or strategy (see `digest`). Defaults to PAKU_DEFAULT_OCR.",
+    ),
+    max_batch: int = typer.Option(
+        8,
+        "--max-batch",
+        help="Most images OCR'd in one engine call (default: 8).",
+    ),
+    batch_window_ms: float = typer.Option(
+        10.0,
+        "--batch-window-ms",
+        help=(
+            "How long the first request of a batch waits for others to join "
+            "it, i.e. the most latency batching adds (default: 10)."
+        ),
+    ),
+    max_queue: int = typer.Option(
+        256,
+        "--max-queue",
+        help="Requests allowed to wait for a batch before answering 503 (default: 256).",
+    ),
+    max_upload_mb: int = typer.Option(
+        32,
+        "--max-upload-mb",
+        help="Largest accepted upload in MB (default: 32).",
+    ),
+    timeout: float = typer.Option(
+        300.0,
+        "--timeout",
+        help="Seconds a request waits for its result before answering 504 (default: 300).",
+    ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Serve repeated images from the OCR result cache (default: on).",
+    ),
+) -> None:
+    """
+    Serve OCR over HTTP: POST an image to /ocr to get OcrResult JSON.
+    Concurrent requests are OCR'd together in micro-batches. GET /readyz
+    reports when the engine is loaded, GET /metrics serves Prometheus metrics.
+    """
+    if max_batch < 1:
+        raise typer.BadParameter("--max-batch must be >= 1", param_hint="--max-batch")
+    if batch_window_ms < 0:
+        raise typer.BadParameter("--batch-window-ms must be >= 0", param_hint="--batch-window-ms")
+    if max_queue < 1:
+        raise typer.BadParameter("--max-queue must be >= 1", param_hint="--max-queue")
+    if max_upload_mb < 1:
+        raise typer.BadParameter("--max-upload-mb must be >= 1", param_hint="--max-upload-mb")
+    if timeout <= 0:
+        raise typer.BadParameter("--timeout must be > 0", param_hint="--timeout")
+
+    from .server import OcrService, serve as serve_http
+
+    service = OcrService(
+        ocr_engine_name=ocr,
+        use_cache=use_cache,
+        max_batch=max_batch,
+        max_wait_ms=batch_window_ms,
+        max_queue=max_queue,
+    )
+    serve_http(
+        service,
+        host=host,
+        port=port,
+        max_upload_mb=max_upload_mb,
+        request_timeout_s=timeout,
+    )
+
+
+def _discovery_options(
+    include: List[str] | None,
+    exclude: List[str] | None,
+    max_depth: int | None,
+    symlinks: str,
+    workers: int,
+) -> DiscoveryOptions:
+    try:
+        return DiscoveryOptions(
+            include=tuple(include or ()),
+            exclude=tuple(exclude or ()),
+            max_depth=max_depth,
+            symlinks=symlinks.lower(),
+            workers=workers,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+def _export_digest(
+    docs: Iterable[Document],
+    fmt: str,
+    out: Path | None,
+    manifest: DigestManifest | None,
+    plan: RunPlan | None,
+    log,
+) -> None:
+    """
+    Stream documents to --out (or stdout), checkpointing each one in the
+    manifest with a pointer to the bytes it occupies in the output.
+    """
+    if fmt == "bin":
+        if out is None:  # digest() rejects this before any OCR runs
+            raise ValueError("--format bin needs --out")
+        _export_store(docs, out, manifest, plan)
+        return
+    export_fmt = cast(ExportFormat, fmt)  # validated by the command
+
+    if manifest is None or plan is None:
+        if out:
+            with open_export_file(out, export_fmt) as f:
+                write_documents(docs, fmt=export_fmt, stream=f)
+        else:
+            write_documents(docs, fmt=export_fmt, stream=sys.stdout)
+            sys.stdout.write("\n")
+        return
+
+    # A resumed run that recorded nothing yet starts its output afresh.
+    output_end = plan.output_end if plan.resumed else None
+    appending = bool(output_end)
+    out_ref = str(out) if out else None
+
+    def on_write(doc: Document, start: int | None, end: int | None) -> None:
+        output = {"file": out_ref, "offset": start, "end": end} if out_ref else None
+        manifest.record(doc.path, output=output)
 
     if out:
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(text, encoding="utf-8")
+        if output_end:
+            truncate_output(out, output_end, log)
+        with open_export_file(out, export_fmt, append=appending) as f:
+            manifest.begin_run(plan, out=out, fmt=fmt, output_stream=f)
+            try:
+                write_documents(
+                    docs,
+                    fmt=export_fmt,
+                    stream=f,
+                    write_header=not appending,
+                    on_write=on_write,
+                )
+            finally:
+                manifest.close()
     else:
-        sys.stdout.write(text + "\n")
+        manifest.begin_run(plan, out=None, fmt=fmt)
+        try:
+            write_documents(docs, fmt=export_fmt, stream=sys.stdout, on_write=on_write)
+            sys.stdout.write("\n")
+        finally:
+            manifest.close()
+
+
+def _export_store(
+    docs: Iterable[Document],
+    out: Path,
+    manifest: DigestManifest | None,
+    plan: RunPlan | None,
+) -> None:
+    """Stream documents into a binary result store at `out`."""
+    from .store import ResultStoreWriter, write_store
+
+    if manifest is None or plan is None:
+        write_store(docs, out)
+        return
+
+    out_ref = str(out)
+
+    def on_write(doc: Document, start: int | None, end: int | None) -> None:
+        manifest.record(doc.path, output={"file": out_ref, "offset": start, "end": end})
+
+    writer = ResultStoreWriter(out)
+    manifest.begin_run(plan, out=out, fmt="bin", output_stream=writer)
+    try:
+        write_store(docs, out, on_write=on_write, writer=writer)
+    finally:
+        manifest.close()
 
 
 @app.command()
@@ -90,19 +739,82 @@ def config() -> None:
         "default_ocr": ctx.config.default_ocr,
         "workdir": str(ctx.config.workdir),
         "paddle_lang": ctx.config.paddle_lang,
+        "max_workers": ctx.config.max_workers,
+        "executor": ctx.config.executor,
+        "cache_enabled": ctx.config.cache_enabled,
+        "cache_dir": str(ctx.config.cache_dir),
+        "cache_max_mb": ctx.config.cache_max_mb,
+        "preprocess_max_side": ctx.config.preprocess_max_side,
+        "preprocess_grayscale": ctx.config.preprocess_grayscale,
+        "preprocess_deskew": ctx.config.preprocess_deskew,
+        "decode_cache_mb": ctx.config.decode_cache_mb,
+        "pdf_dpi": ctx.config.pdf_dpi,
+        "index_enabled": ctx.config.index_enabled,
+        "index_path": str(ctx.config.index_path),
         "ocr_engines": list(ctx.ocr_engines.keys()),
     }
     print(json.dumps(data, indent=2))
 
 
+@app.command()
+def search(
+    query: str = typer.Argument(
+        ...,
+        help='Full-text query: words, "exact phrases", AND / OR / NOT, prefix*.',
+    ),
+    limit: int = typer.Option(20, "--limit", "-n", help="Maximum hits (default: 20)."),
+    db: Path | None = typer.Option(
+        None,
+        "--db",
+        help="Index database (default: the workdir's index, filled by digest --index).",
+    ),
+) -> None:
+    """
+    Search OCR text indexed by `digest --index`, best matches first.
+    """
+    if limit < 1:
+        raise typer.BadParameter("--limit must be >= 1", param_hint="--limit")
+
+    path = db or AppContext.instance().config.index_path
+    if not path.exists():
+        raise typer.BadParameter(
+            f"No result index at {path}; run `digest --index` first.", param_hint="--db"
+        )
+
+    from .index import ResultIndex
+
+    with ResultIndex(path) as result_index:
+        try:
+            hits = result_index.search(query, limit=limit)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="QUERY")
+
+    data = [
+        {"path": h.path, "engine": h.engine, "score": h.score, "snippet": h.snippet}
+        for h in hits
+    ]
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
 @app.command()
 def engines() -> None:
-    """List registered OCR engines."""
+    """List registered OCR engines with their routing statistics."""
     ctx = AppContext.instance()
-    engines = ctx.list_ocr_engines()
+    registry = ctx.ocr_engines
+    # Statistics persisted by earlier runs (EWMA latency, error rate,
+    # breaker state); None for engines the router has not used yet.
+    stats = ctx.router.stats()
     data = [
-        {"name": name, "type": engine.__class__.__name__}
-        for name, engine in engines.items()
+        {
+            "name": spec.name,
+            "type": spec.type_name,
+            "kind": spec.kind,
+            "source": spec.source,
+            "loaded": registry.is_loaded(spec.name),
+            "routing": stats.get(spec.name),
+        }
+        for spec in registry.specs()
+        if spec.name in registry
     ]
     print(json.dumps(data, indent=2))
 
@@ -139,12 +851,89 @@ def benchmark(
         "--out",
         help="JSON output file for benchmark results (stdout if omitted).",
     ),
+    use_cache: bool = typer.Option(
+        False,
+        "--cache/--no-cache",
+        help="Serve repeated images from the OCR result cache (default: off).",
+    ),
+    warmup: int = typer.Option(
+        1,
+        "--warmup",
+        help="Untimed calls per engine before measuring, e.g. to load models (default: 1).",
+    ),
+    repeat: int = typer.Option(
+        1,
+        "--repeat",
+        help="Timed passes over the dataset per engine (default: 1).",
+    ),
+    include: List[str] = typer.Option(
+        None,
+        "--include",
+        help=(
+            "Glob a file must match to be processed (repeatable). Patterns "
+            "with '/' match the path relative to the input, others the file name."
+        ),
+    ),
+    exclude: List[str] = typer.Option(
+        None,
+        "--exclude",
+        help="Glob for files or directories to skip (repeatable); excluded directories are not scanned.",
+    ),
+    max_depth: int | None = typer.Option(
+        None,
+        "--max-depth",
+        help="Directory levels to descend below the input (0 = top level only; default: unlimited).",
+    ),
+    symlinks: str = typer.Option(
+        "files",
+        "--symlinks",
+        help="Symlink policy: skip | files (keep linked files, don't enter linked dirs) | follow.",
+    ),
+    discovery_workers: int = typer.Option(
+        1,
+        "--discovery-workers",
+        help="Threads scanning the input tree concurrently (default: 1).",
+    ),
+    profile: Path | None = typer.Option(
+        None,
+        "--profile",
+        help=(
+            "Sample a CPU profile of the run (all threads and worker processes) "
+            "into PREFIX.pstats and PREFIX.collapsed (flamegraphs), and print "
+            "the hottest functions per stage."
+        ),
+    ),
+    profile_interval_ms: float = typer.Option(
+        10.0,
+        "--profile-interval-ms",
+        help="Milliseconds between profile samples (default: 10).",
+    ),
+    profile_top: int = typer.Option(
+        15,
+        "--profile-top",
+        help="Functions listed in the profile summary (default: 15).",
+    ),
 ) -> None:
     """
-    Benchmark engines over the given dataset and report per-image timings.
+    Benchmark engines over the given dataset and report per-image timings,
+    latency percentiles, throughput and peak RSS.
     """
+    if warmup < 0:
+        raise typer.BadParameter("--warmup must be >= 0", param_hint="--warmup")
+    if repeat < 1:
+        raise typer.BadParameter("--repeat must be >= 1", param_hint="--repeat")
+    _check_profile_options(profile_interval_ms, profile_top)
+
     engine_names = engine or None
-    result = run_benchmark(input_path=input_path, engine_names=engine_names)
+    with _profiling(profile, profile_interval_ms, profile_top):
+        result = run_benchmark(
+            input_path=input_path,
+            engine_names=engine_names,
+            use_cache=use_cache,
+            discovery=_discovery_options(include, exclude, max_depth, symlinks, discovery_workers),
+            warmup=warmup,
+            repeat=repeat,
+        )
     text = json.dumps(result, ensure_ascii=False, indent=2)
 
     if out:
@@ -156,18 +945,40 @@ def benchmark(
 
 @app.command()
 def compare(
-    left: Path = typer.Argument(..., help="Left JSON digest output."),
-    right: Path = typer.Argument(..., help="Right JSON digest output."),
+    left: Path = typer.Argument(..., help="Left digest output (JSON or result store)."),
+    right: Path = typer.Argument(..., help="Right digest output (JSON or result store)."),
     out: Path | None = typer.Option(
         None,
         "--out",
         help="JSON output file for comparison results (stdout if omitted).",
     ),
+    metric: str = typer.Option(
+        "ratio",
+        "--metric",
+        help=(
+            "Similarity metric: ratio (difflib, default) | cer (character "
+            "edit distance) | wer (word edit distance)."
+        ),
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        help="Processes scoring paths in parallel (0 = PAKU_MAX_WORKERS; default: 1).",
+    ),
 ) -> None:
     """
     Compare two digest outputs (per-path OCR text and similarity).
     """
-    result = run_compare(left=left, right=right)
+    metric = metric.lower()
+    if metric not in SIMILARITY_METRICS:
+        raise typer.BadParameter(
+            f"Unsupported metric: {metric!r}. Use one of: {', '.join(SIMILARITY_METRICS)}.",
+            param_hint="--metric",
+        )
+    if workers <= 0:
+        workers = AppContext.instance().config.max_workers
+
+    result = run_compare(left=left, right=right, metric=metric, workers=workers)
     text = json.dumps(result, ensure_ascii=False, indent=2)
 
     if out:
@@ -177,6 +988,223 @@ def compare(
         sys.stdout.write(text + "\n")
 
 
+def _require_cache():
+    ctx = AppContext.instance()
+    if ctx.result_cache is None:
+        print("OCR result cache is disabled (PAKU_CACHE_ENABLED=0).")
+        raise typer.Exit(code=1)
+    return ctx.result_cache
+
+
+@cache_app.command("stats")
+def cache_stats() -> None:
+    """Show OCR result cache size and cumulative hit/miss counters."""
+    cache = _require_cache()
+    entries, size = cache.usage()
+    totals = cache.persisted_stats()
+    lookups = totals.hits + totals.misses
+    data = {
+        "root": str(cache.root),
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": cache.max_bytes,
+        "hits": totals.hits,
+        "misses": totals.misses,
+        "hit_rate": totals.hits / lookups if lookups else 0.0,
+        "writes": totals.writes,
+        "evictions": totals.evictions,
+    }
+    print(json.dumps(data, indent=2))
+
+
+@cache_app.command("prune")
+def cache_prune(
+    max_mb: int | None = typer.Option(
+        None,
+        "--max-mb",
+        help="Evict LRU entries down to this size (default: PAKU_CACHE_MAX_MB).",
+    ),
+    all_entries: bool = typer.Option(
+        False,
+        "--all",
+        help="Remove every cache entry.",
+    ),
+) -> None:
+    """Evict least recently used entries from the OCR result cache."""
+    cache = _require_cache()
+    if all_entries:
+        removed = cache.clear()
+    else:
+        max_bytes = None if max_mb is None else max_mb * 1024 * 1024
+        removed = cache.prune(max_bytes=max_bytes)
+    cache.flush_stats()
+    entries, size = cache.usage()
+    print(json.dumps({"removed": removed, "entries": entries, "bytes": size}, indent=2))
+
+
+def _open_queue(queue_dir: Path) -> "WorkQueue":
+    from .workqueue import WorkQueue
+
+    try:
+        return WorkQueue(queue_dir)
+    except FileNotFoundError as e:
+        raise typer.BadParameter(str(e), param_hint="QUEUE_DIR")
+
+
+@queue_app.command("init")
+def queue_init(
+    queue_dir: Path = typer.Argument(..., help="Queue directory on storage shared by all workers."),
+    input_path: Path = typer.Argument(..., help="Input image, PDF or directory to distribute."),
+    lease_s: float = typer.Option(
+        300.0,
+        "--lease-s",
+        help=(
+            "Seconds a worker holds a batch without renewing it; after that a "
+            "dead worker's files go back to the queue (default: 300)."
+        ),
+    ),
+    max_attempts: int = typer.Option(
+        3,
+        "--max-attempts",
+        help="Times a file is handed out before it is marked failed (default: 3).",
+    ),
+    include: List[str] = typer.Option(None, "--include", help="Glob a file must match (repeatable)."),
+    exclude: List[str] = typer.Option(
+        None, "--exclude", help="Glob for files or directories to skip (repeatable)."
+    ),
+    max_depth: int | None = typer.Option(
+        None, "--max-depth", help="Directory levels to descend below the input."
+    ),
+    symlinks: str = typer.Option(
+        "files", "--symlinks", help="Symlink policy: skip | files | follow."
+    ),
+    discovery_workers: int = typer.Option(
+        1, "--discovery-workers", help="Threads scanning the input tree concurrently."
+    ),
+) -> None:
+    """
+    Create a work queue (or add to an existing one) with every file found
+    under INPUT_PATH. Run `queue work` on each host afterwards.
+    """
+    from .workqueue import WorkQueue
+
+    discovery = _discovery_options(include, exclude, max_depth, symlinks, discovery_workers)
+    try:
+        q = WorkQueue.create(queue_dir, lease_s=lease_s, max_attempts=max_attempts)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    with q:
+        added = q.enqueue(iter_images(input_path, discovery))
+        print(json.dumps({"queue": str(queue_dir), "added": added, **q.counts()}, indent=2))
+
+
+@queue_app.command("work")
+def queue_work(
+    queue_dir: Path = typer.Argument(..., help="Queue directory created by `queue init`."),
+    worker_id: str | None = typer.Option(
+        None,
+        "--worker-id",
+        help="Name of this worker and its shard file (default: <hostname>-<pid>).",
+    ),
+    ocr: str | None = typer.Option(
+        None,
+        "--ocr",
+        help="OCR engine or strategy (see `digest`). Defaults to PAKU_DEFAULT_OCR.",
+    ),
+    workers: int = typer.Option(
+        0,
+        "--workers",
+        help="Threads OCR'ing each leased batch (0 = PAKU_MAX_WORKERS).",
+    ),
+    batch_size: int = typer.Option(1, "--batch-size", help="Images per engine call (default: 1)."),
+    lease_size: int = typer.Option(
+        16,
+        "--lease-size",
+        help="Files taken from the queue at a time (default: 16).",
+    ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Reuse OCR results from the workdir result cache (default: on).",
+    ),
+    pdf_dpi: int | None = typer.Option(
+        None,
+        "--pdf-dpi",
+        help="Resolution PDF pages are rasterized at for OCR. Defaults to PAKU_PDF_DPI.",
+    ),
+) -> None:
+    """
+    Digest files from the queue until none are left, appending results to
+    this worker's shard. Start one per host (or several per host).
+    """
+    if batch_size < 1:
+        raise typer.BadParameter("--batch-size must be >= 1", param_hint="--batch-size")
+    if lease_size < 1:
+        raise typer.BadParameter("--lease-size must be >= 1", param_hint="--lease-size")
+    if pdf_dpi is not None and pdf_dpi < 1:
+        raise typer.BadParameter("--pdf-dpi must be >= 1", param_hint="--pdf-dpi")
+    _open_queue(queue_dir).close()
+
+    from .workqueue import run_worker
+
+    run_worker(
+        queue_dir,
+        worker_id=worker_id,
+        ocr_engine_name=ocr,
+        workers=workers or None,
+        use_cache=use_cache,
+        batch_size=batch_size,
+        lease_size=lease_size,
+        pdf_dpi=pdf_dpi,
+    )
+
+
+@queue_app.command("status")
+def queue_status(
+    queue_dir: Path = typer.Argument(..., help="Queue directory created by `queue init`."),
+) -> None:
+    """Show how many files are pending, leased, done and failed."""
+    with _open_queue(queue_dir) as q:
+        data = {
+            **q.counts(),
+            "failures": [{"path": p, "error": e} for p, e in q.failures()],
+        }
+    print(json.dumps(data, indent=2))
+
+
+@queue_app.command("merge")
+def queue_merge(
+    queue_dir: Path = typer.Argument(..., help="Queue directory created by `queue init`."),
+    out: Path = typer.Option(..., "--out", help="Merged output file."),
+    format: str = typer.Option(
+        "jsonl",
+        "--format",
+        "-f",
+        help="Output format: json | jsonl | txt | csv | bin (default: jsonl).",
+    ),
+) -> None:
+    """
+    Merge every worker's shard into one output, one document per path.
+    """
+    fmt = format.lower()
+    if fmt not in EXPORT_FORMATS and fmt != "bin":
+        raise typer.BadParameter(
+            f"Unsupported format: {format!r}. Use one of: json, jsonl, txt, csv, bin.",
+            param_hint="--format",
+        )
+    with _open_queue(queue_dir) as q:
+        counts = q.counts()
+    if counts["pending"] or counts["leased"]:
+        AppContext.instance().logger.warning(
+            f"[queue] Merging while {counts['pending'] + counts['leased']} file(s) "
+            "are still queued or in progress"
+        )
+    from .workqueue import merge_shards
+
+    written = merge_shards(queue_dir, out, fmt)
+    print(json.dumps({"out": str(out), "documents": written, **counts}, indent=2))
+
+
 def main() -> None:
     app()
 
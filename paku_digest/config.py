@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from importlib.metadata import entry_points
 import os
 from pathlib import Path
 
@@ -17,8 +18,42 @@ class AppConfig:
 
     chandra_api_url: str | None = None
     chandra_api_key: str | None = None
+    chandra_model: str = "chandra"
+    chandra_max_inflight: int = 16
+    chandra_images_per_request: int = 1
+    chandra_timeout: float = 120.0
 
     max_workers: int = 1
+    executor: str = "thread"
+    max_in_flight: int = 0
+
+    cache_enabled: bool = True
+    cache_max_mb: int = 1024
+
+    router_failure_threshold: int = 5
+    router_cooldown_s: float = 30.0
+    router_latency_budget_ms: float = 0.0
+
+    cascade_min_confidence: float = 0.8
+    cascade_min_chars: int = 1
+
+    preprocess_max_side: int = 0
+    preprocess_grayscale: bool = False
+    preprocess_deskew: bool = False
+    decode_cache_mb: int = 256
+
+    pdf_dpi: int = 200
+
+    dedup_enabled: bool = False
+    dedup_distance: int = 4
+
+    index_enabled: bool = False
+
+    log_format: str = "text"
+    log_async: bool = True
+    log_queue_size: int = 10000
+    log_file_sample: int = 1
+    log_file_rate: float = 0.0
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -32,6 +67,24 @@ class AppConfig:
 
         chandra_api_url = os.getenv("PAKU_CHANDRA_API_URL")
         chandra_api_key = os.getenv("PAKU_CHANDRA_API_KEY")
+        chandra_model = os.getenv("PAKU_CHANDRA_MODEL", "chandra")
+
+        try:
+            chandra_max_inflight = int(os.getenv("PAKU_CHANDRA_MAX_INFLIGHT", "16"))
+        except ValueError:
+            chandra_max_inflight = 16
+
+        try:
+            chandra_images_per_request = int(
+                os.getenv("PAKU_CHANDRA_IMAGES_PER_REQUEST", "1")
+            )
+        except ValueError:
+            chandra_images_per_request = 1
+
+        try:
+            chandra_timeout = float(os.getenv("PAKU_CHANDRA_TIMEOUT", "120"))
+        except ValueError:
+            chandra_timeout = 120.0
 
         max_workers_raw = os.getenv("PAKU_MAX_WORKERS", "1")
         try:
@@ -39,6 +92,102 @@ class AppConfig:
         except ValueError:
             max_workers = 1
 
+        executor = os.getenv("PAKU_EXECUTOR", "thread").strip().lower()
+
+        try:
+            max_in_flight = int(os.getenv("PAKU_MAX_IN_FLIGHT", "0"))
+        except ValueError:
+            max_in_flight = 0
+
+        cache_enabled = os.getenv("PAKU_CACHE_ENABLED", "1").strip().lower() not in {
+            "0",
+            "false",
+            "no",
+            "off",
+        }
+
+        cache_max_mb_raw = os.getenv("PAKU_CACHE_MAX_MB", "1024")
+        try:
+            cache_max_mb = int(cache_max_mb_raw)
+        except ValueError:
+            cache_max_mb = 1024
+
+        try:
+            router_failure_threshold = int(
+                os.getenv("PAKU_ROUTER_FAILURE_THRESHOLD", "5")
+            )
+        except ValueError:
+            router_failure_threshold = 5
+
+        try:
+            router_cooldown_s = float(os.getenv("PAKU_ROUTER_COOLDOWN_S", "30"))
+        except ValueError:
+            router_cooldown_s = 30.0
+
+        try:
+            router_latency_budget_ms = float(
+                os.getenv("PAKU_ROUTER_LATENCY_BUDGET_MS", "0")
+            )
+        except ValueError:
+            router_latency_budget_ms = 0.0
+
+        try:
+            cascade_min_confidence = float(
+                os.getenv("PAKU_CASCADE_MIN_CONFIDENCE", "0.8")
+            )
+        except ValueError:
+            cascade_min_confidence = 0.8
+
+        try:
+            cascade_min_chars = int(os.getenv("PAKU_CASCADE_MIN_CHARS", "1"))
+        except ValueError:
+            cascade_min_chars = 1
+
+        try:
+            preprocess_max_side = int(os.getenv("PAKU_PREPROCESS_MAX_SIDE", "0"))
+        except ValueError:
+            preprocess_max_side = 0
+
+        preprocess_grayscale = _env_flag("PAKU_PREPROCESS_GRAYSCALE", False)
+        preprocess_deskew = _env_flag("PAKU_PREPROCESS_DESKEW", False)
+
+        try:
+            decode_cache_mb = int(os.getenv("PAKU_DECODE_CACHE_MB", "256"))
+        except ValueError:
+            decode_cache_mb = 256
+
+        try:
+            pdf_dpi = int(os.getenv("PAKU_PDF_DPI", "200"))
+        except ValueError:
+            pdf_dpi = 200
+
+        dedup_enabled = _env_flag("PAKU_DEDUP", False)
+
+        try:
+            dedup_distance = int(os.getenv("PAKU_DEDUP_DISTANCE", "4"))
+        except ValueError:
+            dedup_distance = 4
+
+        index_enabled = _env_flag("PAKU_INDEX_ENABLED", False)
+
+        log_format = os.getenv("PAKU_LOG_FORMAT", "text").strip().lower()
+        log_async = _env_flag("PAKU_LOG_ASYNC", True)
+
+        try:
+            log_queue_size = int(os.getenv("PAKU_LOG_QUEUE_SIZE", "10000"))
+        except ValueError:
+            log_queue_size = 10000
+
+        try:
+            log_file_sample = int(os.getenv("PAKU_LOG_FILE_SAMPLE", "1"))
+        except ValueError:
+            log_file_sample = 1
+
+        try:
+            log_file_rate = float(os.getenv("PAKU_LOG_FILE_RATE", "0"))
+        except ValueError:
+            log_file_rate = 0.0
+
         cfg = cls(
                 env=env,
                 log_level=log_level,
@@ -47,7 +196,33 @@ class AppConfig:
                 paddle_lang=paddle_lang,
                 chandra_api_url=chandra_api_url,
                 chandra_api_key=chandra_api_key,
+                chandra_model=chandra_model,
+                chandra_max_inflight=chandra_max_inflight,
+                chandra_images_per_request=chandra_images_per_request,
+                chandra_timeout=chandra_timeout,
                 max_workers=max_workers,
+                executor=executor,
+                max_in_flight=max_in_flight,
+                cache_enabled=cache_enabled,
+                cache_max_mb=cache_max_mb,
+                router_failure_threshold=router_failure_threshold,
+                router_cooldown_s=router_cooldown_s,
+                router_latency_budget_ms=router_latency_budget_ms,
+                cascade_min_confidence=cascade_min_confidence,
+                cascade_min_chars=cascade_min_chars,
+                preprocess_max_side=preprocess_max_side,
+                preprocess_grayscale=preprocess_grayscale,
+                preprocess_deskew=preprocess_deskew,
+                decode_cache_mb=decode_cache_mb,
+                pdf_dpi=pdf_dpi,
+                dedup_enabled=dedup_enabled,
+                dedup_distance=dedup_distance,
+                index_enabled=index_enabled,
+                log_format=log_format,
+                log_async=log_async,
+                log_queue_size=log_queue_size,
+                log_file_sample=log_file_sample,
+                log_file_rate=log_file_rate,
             )
 
         cfg.validate()
@@ -64,10 +239,16 @@ class AppConfig:
         if not self.env:
             raise ValueError("Environment variable PAKU_ENV is required.")
 
-        if self.default_ocr not in {"stub", "paddle", "chandra-api"}:
+        # Plugin engines are accepted by their entry point name; reading the
+        # entry point metadata does not import the plugin.
+        plugin_engines = {
+            ep.name for ep in entry_points(group="paku_digest.ocr_engines")
+        }
+        if self.default_ocr not in {"stub", "paddle", "chandra-api"} | plugin_engines:
             raise ValueError(
                 f"Invalid PAKU_DEFAULT_OCR='{self.default_ocr}'. "
                 "Must be one of: stub, paddle, chandra-api"
+                + "".join(f", {name}" for name in sorted(plugin_engines))
             )
 
         if not isinstance(self.workdir, Path):
@@ -84,5 +265,95 @@ class AppConfig:
                     "PAKU_CHANDRA_API_KEY is required when PAKU_DEFAULT_OCR=chandra-api"
                 )
         
+        if self.chandra_max_inflight < 1:
+            raise ValueError("PAKU_CHANDRA_MAX_INFLIGHT must be >=1")
+
+        if self.chandra_images_per_request < 1:
+            raise ValueError("PAKU_CHANDRA_IMAGES_PER_REQUEST must be >=1")
+
         if self.max_workers < 1:
             raise ValueError("PAKU_MAX_WORKERS must be >=1")
+
+        if self.executor not in {"thread", "process"}:
+            raise ValueError(
+                f"Invalid PAKU_EXECUTOR='{self.executor}'. Must be one of: thread, process"
+            )
+
+        if self.max_in_flight < 0:
+            raise ValueError("PAKU_MAX_IN_FLIGHT must be >=0")
+
+        if self.cache_max_mb < 0:
+            raise ValueError("PAKU_CACHE_MAX_MB must be >=0")
+
+        if self.router_failure_threshold < 1:
+            raise ValueError("PAKU_ROUTER_FAILURE_THRESHOLD must be >=1")
+
+        if self.router_cooldown_s < 0:
+            raise ValueError("PAKU_ROUTER_COOLDOWN_S must be >=0")
+
+        if self.router_latency_budget_ms < 0:
+            raise ValueError("PAKU_ROUTER_LATENCY_BUDGET_MS must be >=0")
+
+        if not 0.0 <= self.cascade_min_confidence <= 1.0:
+            raise ValueError("PAKU_CASCADE_MIN_CONFIDENCE must be between 0 and 1")
+
+        if self.cascade_min_chars < 0:
+            raise ValueError("PAKU_CASCADE_MIN_CHARS must be >=0")
+
+        if self.preprocess_max_side < 0:
+            raise ValueError("PAKU_PREPROCESS_MAX_SIDE must be >=0")
+
+        if self.decode_cache_mb < 0:
+            raise ValueError("PAKU_DECODE_CACHE_MB must be >=0")
+
+        if self.pdf_dpi < 1:
+            raise ValueError("PAKU_PDF_DPI must be >=1")
+
+        if not 0 <= self.dedup_distance <= 32:
+            raise ValueError("PAKU_DEDUP_DISTANCE must be between 0 and 32")
+
+        if self.log_format not in {"text", "json"}:
+            raise ValueError(
+                f"Invalid PAKU_LOG_FORMAT='{self.log_format}'. Must be one of: text, json"
+            )
+
+        if self.log_queue_size < 1:
+            raise ValueError("PAKU_LOG_QUEUE_SIZE must be >=1")
+
+        if self.log_file_sample < 1:
+            raise ValueError("PAKU_LOG_FILE_SAMPLE must be >=1")
+
+        if self.log_file_rate < 0:
+            raise ValueError("PAKU_LOG_FILE_RATE must be >=0")
+
+    @property
+    def cache_dir(self) -> Path:
+        """Root of the OCR result cache inside the workdir."""
+        return self.workdir / ".paku-cache" / "ocr"
+
+    @property
+    def manifest_dir(self) -> Path:
+        """Checkpoint manifests for resumable / incremental digest runs."""
+        return self.workdir / ".paku-cache" / "manifests"
+
+    @property
+    def pages_dir(self) -> Path:
+        """Scratch space for PDF pages while they are being OCR'd."""
+        return self.workdir / ".paku-cache" / "pages"
+
+    @property
+    def index_path(self) -> Path:
+        """SQLite result index with full-text search (digest --index)."""
+        return self.workdir / ".paku-cache" / "index.sqlite3"
+
+    @property
+    def router_stats_path(self) -> Path:
+        """Persisted per-engine routing statistics (latency, errors, breaker)."""
+        return self.workdir / ".paku-cache" / "router-stats.json"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() not in {"0", "false", "no", "off", ""}
@@ -1,28 +1,34 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
-from typing import ClassVar, Dict, Optional
+from typing import ClassVar, Mapping, Optional
 
+from .cache import OcrResultCache
 from .config import AppConfig
 from .logging_utils import get_logger
 from .ocr.base import OCREngine
-from .ocr.stub import StubOCREngine
-from .ocr.paddle import PaddleOCREngine
-from .ocr.chandra_api import ChandraAPIOCREngine
-from .ocr.router import EngineRouter
+from .ocr.cascade import CascadePolicy
+from .ocr.registry import EngineRegistry, builtin_specs, plugin_specs
+from .ocr.router import STRATEGIES, EngineRouter
+from .preprocess import Preprocessor
 
 
 @dataclass
 class AppContext:
     """
-    Singleton that holds config, logger, and OCR engine registry.
+    Singleton that holds config, logger, OCR engine registry and result cache.
+
+    The registry is lazy: engines are only constructed when `get_ocr`,
+    `resolve_engine` or the router first need them.
     """
     _instance: ClassVar[Optional["AppContext"]] = None
 
     config: AppConfig
-    logger: object
-    ocr_engines: Dict[str, OCREngine]
+    logger: logging.Logger
+    ocr_engines: EngineRegistry
     router: EngineRouter
+    result_cache: Optional[OcrResultCache] = None
 
     @classmethod
     def instance(cls) -> "AppContext":
@@ -35,63 +41,93 @@ class AppContext:
         config = AppConfig.from_env()
         logger = get_logger(config)
 
-        engines: Dict[str, OCREngine] = {}
-
-        # Always available: stub
-        stub_engine = StubOCREngine(config=config, logger=logger)
-        engines[stub_engine.name()] = stub_engine
-
-        # Optional: Paddle
-        try:
-            paddle_engine = PaddleOCREngine(config=config, logger=logger)
-        except RuntimeError as e:
-            logger.info(f"[AppContext] PaddleOCREngine not available: {e}")
-        else:
-            engines[paddle_engine.name()] = paddle_engine
-
-        # Optional: Chandra API
-        try:
-            chandra_engine = ChandraAPIOCREngine(config=config, logger=logger)
-        except RuntimeError as e:
-            logger.info(f"[AppContext] ChandraAPIOCREngine not available: {e}")
-        else:
-            engines[chandra_engine.name()] = chandra_engine
+        # Built-in engines first, then third-party entry point plugins.
+        engines = EngineRegistry(
+            config=config,
+            logger=logger,
+            specs=builtin_specs() + plugin_specs(logger),
+        )
+        for name, reason in engines.unavailable().items():
+            logger.debug(f"[AppContext] OCR engine {name!r} not available: {reason}")
+
+        router = EngineRouter(
+            engines=engines,
+            failure_threshold=config.router_failure_threshold,
+            cooldown_s=config.router_cooldown_s,
+            latency_budget_ms=config.router_latency_budget_ms,
+            stats_path=config.router_stats_path,
+            cascade=CascadePolicy(
+                min_confidence=config.cascade_min_confidence,
+                min_chars=config.cascade_min_chars,
+            ),
+        )
 
-        router = EngineRouter(engines=engines)
+        result_cache: Optional[OcrResultCache] = None
+        if config.cache_enabled:
+            result_cache = OcrResultCache(
+                root=config.cache_dir,
+                max_bytes=config.cache_max_mb * 1024 * 1024,
+                logger=logger,
+            )
 
         return cls(
             config=config,
             logger=logger,
             ocr_engines=engines,
             router=router,
+            result_cache=result_cache,
         )
 
     def get_ocr(self, name: str) -> OCREngine:
-        if name not in self.ocr_engines:
+        try:
+            return self.ocr_engines[name]
+        except KeyError:
+            reason = self.ocr_engines.unavailable().get(name)
+            if reason is not None:
+                raise ValueError(f"OCR engine not available: {name}. {reason}") from None
             raise ValueError(
                 f"OCR engine not registered: {name}. "
                 f"Available: {', '.join(self.ocr_engines.keys())}"
-            )
-        return self.ocr_engines[name]
+            ) from None
 
-    def list_ocr_engines(self) -> Dict[str, OCREngine]:
-        return dict(self.ocr_engines)
+    def list_ocr_engines(self) -> Mapping[str, OCREngine]:
+        """Available engines by name; values are constructed on access."""
+        return self.ocr_engines
     
-    def resolve_engine(self, name_or_strategy: str) -> OCREngine:
+    def resolve_engine(
+        self,
+        name_or_strategy: str,
+        use_cache: bool = True,
+        preprocessor: Optional[Preprocessor] = None,
+    ) -> OCREngine:
         """
         Resolve either:
         - a concrete engine name (stub, paddle, chandra-api)
-        - a routing strategy (light, heavy, auto)
+        - a routing strategy (light, heavy, auto, cascade): returns a routed engine
+          that picks the best engine per call from live statistics, applying
+          `preprocessor` and (when `use_cache` is set) the result cache per
+          concrete engine
         """
-        key = name_or_strategy.lower()
-        if key in self.ocr_engines:
-            return self.ocr_engines[key]
-
-        if key in {"light", "heavy", "auto"}:
-            return self.router.select(key)
+        key = self.check_engine_key(name_or_strategy)
+        if key in STRATEGIES:
+            return self.router.route(
+                key,
+                cache=self.result_cache if use_cache else None,
+                preprocessor=preprocessor,
+            )
+        return self.get_ocr(key)
 
+    def check_engine_key(self, name_or_strategy: str) -> str:
+        """
+        The normalized engine name or strategy, without building anything;
+        ValueError if it is neither. Lets callers fail before starting
+        worker processes or opening their output.
+        """
+        key = name_or_strategy.lower()
+        if key in self.ocr_engines or key in STRATEGIES:
+            return key
         raise ValueError(
             f"Unknown OCR engine or strategy: {name_or_strategy!r}. "
             f"Available engines: {', '.join(self.ocr_engines.keys())}; "
-            f"strategies: light, heavy, auto."
+            f"strategies: {', '.join(STRATEGIES)}."
         )
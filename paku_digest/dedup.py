@@ -0,0 +1,280 @@
+"""
+Near-duplicate image detection (`digest --dedup`).
+
+Consecutive frames and re-uploads of the same screenshot are grouped
+before OCR: only the first image of a group (its representative) is sent
+to the engine, the others get a copy of its result with
+`meta["near_duplicate"]` saying where it came from.
+
+Each image is reduced to a fingerprint:
+
+- a 64-bit difference hash (dHash), compared by Hamming distance, which
+  survives rescaling and recompression;
+- a 32x32 grayscale thumbnail. A perceptual hash barely notices a changed
+  subtitle line, so a hash match only counts when no thumbnail cell
+  differs by more than `max_cell_diff` grey levels. Frames whose text
+  differs are OCRed separately.
+
+Hash lookups go through `HammingIndex` (multi-index hashing), so finding
+a group costs a few dict lookups rather than a comparison with every
+earlier image. Images are fingerprinted on a thread pool ahead of OCR,
+in discovery order, so grouping is deterministic.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Deque,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from .metrics import DOCUMENTS, span
+from .models import Document, OcrResult
+from .scheduler import bounded_map
+
+HASH_SIDE = 8
+HASH_BITS = HASH_SIDE * HASH_SIDE
+THUMB_SIDE = 32
+DEFAULT_DISTANCE = 4
+DEFAULT_MAX_CELL_DIFF = 20
+
+# Groups remembered for later duplicates, each about 1 KB of thumbnail
+# plus its OCR result once that is in. Older ones are forgotten; a
+# duplicate of one is simply OCRed.
+_KEEP_GROUPS = 65536
+
+K = TypeVar("K", bound=Hashable)
+
+
+def pillow_available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    hash: int
+    thumb: bytes  # THUMB_SIDE * THUMB_SIDE grayscale pixels
+
+    def distance(self, other: "Fingerprint") -> int:
+        return (self.hash ^ other.hash).bit_count()
+
+    def cell_diff(self, other: "Fingerprint") -> int:
+        """Largest per-pixel difference between the two thumbnails."""
+        return max(abs(a - b) for a, b in zip(self.thumb, other.thumb))
+
+
+def fingerprint(path: Path) -> Fingerprint:
+    """Decode `path` (at reduced scale where the format allows) and fingerprint it."""
+    from PIL import Image  # type: ignore[import]
+
+    with Image.open(path) as img:
+        # JPEG decodes straight to a fraction of its size (kept well above
+        # the thumbnail, or the DCT scaling shows up as cell differences).
+        img.draft("L", (THUMB_SIDE * 8, THUMB_SIDE * 8))
+        gray = img.convert("L")
+    box = Image.Resampling.BOX
+    thumb = gray.resize((THUMB_SIDE, THUMB_SIDE), box)
+
+    # dHash: one bit per horizontally adjacent pixel pair of a 9x8 image.
+    px = gray.resize((HASH_SIDE + 1, HASH_SIDE), box).tobytes()
+    bits = 0
+    for row in range(HASH_SIDE):
+        base = row * (HASH_SIDE + 1)
+        for col in range(HASH_SIDE):
+            bits = (bits << 1) | (px[base + col] < px[base + col + 1])
+    return Fingerprint(hash=bits, thumb=thumb.tobytes())
+
+
+class HammingIndex(Generic[K]):
+    """
+    Finds stored hashes within `radius` bits of a query (multi-index
+    hashing). Hashes are cut into `radius + 1` disjoint bit ranges; two
+    hashes at most `radius` bits apart agree exactly on at least one of
+    them, so only entries sharing a range value are ever compared.
+    """
+
+    def __init__(self, radius: int, bits: int = HASH_BITS) -> None:
+        if not 0 <= radius < bits:
+            raise ValueError(f"radius must be between 0 and {bits - 1}")
+        self.radius = radius
+        parts = radius + 1
+        bounds = [bits * i // parts for i in range(parts + 1)]
+        self._ranges = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables: List[Dict[int, Set[K]]] = [{} for _ in self._ranges]
+        self._hashes: Dict[K, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, key: K, value: int) -> None:
+        self._hashes[key] = value
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            table.setdefault((value >> shift) & mask, set()).add(key)
+
+    def remove(self, key: K) -> None:
+        value = self._hashes.pop(key)
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            part = (value >> shift) & mask
+            bucket = table[part]
+            bucket.discard(key)
+            if not bucket:
+                del table[part]
+
+    def near(self, value: int) -> List[Tuple[K, int]]:
+        """(key, distance) of every entry within `radius`, closest first."""
+        seen: Set[K] = set()
+        found: List[Tuple[K, int]] = []
+        for (shift, mask), table in zip(self._ranges, self._tables):
+            for key in table.get((value >> shift) & mask, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = (self._hashes[key] ^ value).bit_count()
+                if distance <= self.radius:
+                    found.append((key, distance))
+        found.sort(key=lambda kd: kd[1])
+        return found
+
+
+@dataclass
+class _Group:
+    fingerprint: Fingerprint
+    result: Optional[OcrResult] = None
+    # Duplicates seen before the representative's result: (path, note).
+    waiting: List[Tuple[Path, dict]] = field(default_factory=list)
+
+
+class DuplicateFilter:
+    """
+    Sits around the OCR stage of a digest: `units` drops near-duplicate
+    images from the work stream, `documents` adds a Document for each of
+    them once their representative's result is in.
+
+    A representative that fails produces no Document; its duplicates are
+    then returned by `leftovers` to be OCRed on their own. Anything that is
+    not an image path (PDF pages) or cannot be decoded passes through.
+    """
+
+    def __init__(
+        self,
+        distance: int,
+        log,
+        max_cell_diff: int = DEFAULT_MAX_CELL_DIFF,
+        workers: int = 1,
+    ) -> None:
+        self.max_cell_diff = max_cell_diff
+        self.workers = max(workers, 1)
+        self._log = log
+        self._index: HammingIndex[Path] = HammingIndex(distance)
+        self._groups: "OrderedDict[Path, _Group]" = OrderedDict()
+        self._ready: Deque[Document] = deque()
+        self.hashed = 0
+        self.duplicates = 0
+
+    def units(self, units: Iterable) -> Iterator:
+        ex = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="paku-dedup")
+        try:
+            for unit, fut in bounded_map(
+                lambda u: ex.submit(self._fingerprint, u),
+                units,
+                4 * self.workers,
+                ordered=True,
+            ):
+                fp = fut.result()
+                if fp is None or not self._hold(unit, fp):
+                    yield unit
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
+
+    def documents(self, docs: Iterable[Document]) -> Iterator[Document]:
+        for doc in docs:
+            yield doc
+            group = self._groups.get(doc.path)
+            if group is not None and group.result is None and doc.ocr is not None:
+                group.result = doc.ocr
+                for path, note in group.waiting:
+                    yield self._copy(doc.ocr, path, note)
+                group.waiting.clear()
+            while self._ready:
+                yield self._ready.popleft()
+        while self._ready:
+            yield self._ready.popleft()
+
+    def leftovers(self) -> List[Path]:
+        """Duplicates whose representative produced no result."""
+        paths: List[Path] = []
+        for group in self._groups.values():
+            if group.result is None:
+                paths.extend(path for path, _ in group.waiting)
+                group.waiting.clear()
+        return paths
+
+    def _fingerprint(self, unit) -> Optional[Fingerprint]:
+        if not isinstance(unit, Path):
+            return None
+        try:
+            with span("dedup"):
+                return fingerprint(unit)
+        except Exception as exc:  # noqa: BLE001
+            self._log.debug("[dedup] Could not fingerprint %s: %s", unit, exc)
+            return None
+
+    def _hold(self, path: Path, fp: Fingerprint) -> bool:
+        """Index `path`, or file it under a group; True when it is held back."""
+        self.hashed += 1
+        for rep, distance in self._index.near(fp.hash):
+            group = self._groups[rep]
+            cell_diff = fp.cell_diff(group.fingerprint)
+            if cell_diff > self.max_cell_diff:
+                continue
+            self.duplicates += 1
+            note = {"of": str(rep), "distance": distance, "cell_diff": cell_diff}
+            if group.result is None:
+                group.waiting.append((path, note))
+            else:
+                self._ready.append(self._copy(group.result, path, note))
+            return True
+
+        self._index.add(path, fp.hash)
+        self._groups[path] = _Group(fp)
+        self._forget_old()
+        return False
+
+    def _copy(self, result: OcrResult, path: Path, note: dict) -> Document:
+        rep = note["of"]
+        meta = {k: (str(path) if v == rep else v) for k, v in result.meta.items()}
+        meta["near_duplicate"] = note
+        self._log.info(
+            "[dedup] %s: reusing the result of near-duplicate %s (distance %d)",
+            path, rep, note["distance"],
+            extra={"path": str(path)},
+        )
+        DOCUMENTS.inc(status="duplicate")
+        return Document(path=path, ocr=result.model_copy(update={"meta": meta}))
+
+    def _forget_old(self) -> None:
+        # Groups with duplicates waiting on them are kept (moved to the
+        # back) so those duplicates are never lost.
+        checked = 0
+        while len(self._groups) > _KEEP_GROUPS and checked < len(self._groups):
+            checked += 1
+            path, group = next(iter(self._groups.items()))
+            if group.waiting:
+                self._groups.move_to_end(path)
+                continue
+            del self._groups[path]
+            self._index.remove(path)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .pdf import PDF_EXTENSIONS
+
+IMAGE_EXTENSIONS: FrozenSet[str] = frozenset(
+    {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+)
+
+# What digest picks up by default: raster images plus PDFs.
+SUPPORTED_EXTENSIONS: FrozenSet[str] = IMAGE_EXTENSIONS | PDF_EXTENSIONS
+
+SYMLINK_POLICIES = ("skip", "files", "follow")
+
+
+@dataclass
+class DiscoveryOptions:
+    """
+    How to walk an input tree.
+
+    - include   : glob patterns a file must match (any of); empty = all
+    - exclude   : glob patterns for files or directories to skip; a matching
+                  directory is pruned without being scanned
+    - max_depth : how many directory levels below the root to descend
+                  (0 = only files directly in the root; None = unlimited)
+    - symlinks  : 'skip' ignores symlinks, 'files' keeps symlinked files but
+                  does not descend into symlinked directories (default),
+                  'follow' descends into them too, with cycle detection
+    - workers   : threads scanning subtrees concurrently (1 = sequential)
+    - extensions: file suffixes to pick up (images and PDFs by default)
+
+    Patterns containing '/' are matched against the path relative to the
+    root (POSIX separators); other patterns against the entry name.
+    """
+
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    max_depth: Optional[int] = None
+    symlinks: str = "files"
+    workers: int = 1
+    extensions: FrozenSet[str] = field(default=SUPPORTED_EXTENSIONS)
+
+    def __post_init__(self) -> None:
+        if self.symlinks not in SYMLINK_POLICIES:
+            raise ValueError(
+                f"Unknown symlink policy: {self.symlinks!r}. "
+                f"Use one of: {', '.join(SYMLINK_POLICIES)}."
+            )
+        if self.max_depth is not None and self.max_depth < 0:
+            raise ValueError("max_depth must be >= 0")
+        if self.workers < 1:
+            raise ValueError("workers must be >= 1")
+
+
+def _matches(patterns: Sequence[str], name: str, rel: str) -> bool:
+    for pattern in patterns:
+        if fnmatchcase(rel if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+# (directory, path relative to root with trailing '/', depth)
+_DirItem = Tuple[str, str, int]
+
+
+class _Scanner:
+    """Scans one directory at a time; shared by the sequential and parallel walks."""
+
+    def __init__(self, opts: DiscoveryOptions) -> None:
+        self._opts = opts
+        self._exts = {e.lower() for e in opts.extensions}
+        self._seen: Set[Tuple[int, int]] = set()
+        self._seen_lock = threading.Lock()
+
+    def first_visit(self, path: str) -> bool:
+        """Cycle guard for followed symlinks, keyed by (device, inode)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        key = (st.st_dev, st.st_ino)
+        with self._seen_lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+    def scan(self, item: _DirItem) -> Tuple[List[Path], List[_DirItem]]:
+        directory, rel_dir, depth = item
+        opts = self._opts
+        files: List[Path] = []
+        subdirs: List[_DirItem] = []
+
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            return files, subdirs
+
+        with it:
+            for entry in it:
+                name = entry.name
+                rel = rel_dir + name
+                try:
+                    is_link = entry.is_symlink()
+                    if is_link and opts.symlinks == "skip":
+                        continue
+                    follow = not is_link or opts.symlinks == "follow"
+                    is_dir = entry.is_dir(follow_symlinks=follow)
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if opts.max_depth is not None and depth >= opts.max_depth:
+                        continue
+                    if opts.exclude and _matches(opts.exclude, name, rel):
+                        continue
+                    if is_link and not self.first_visit(entry.path):
+                        continue
+                    subdirs.append((entry.path, rel + "/", depth + 1))
+                    continue
+
+                # Cheapest test first: most entries in sidecar-heavy trees
+                # are rejected by extension without any stat call.
+                if os.path.splitext(name)[1].lower() not in self._exts:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if opts.include and not _matches(opts.include, name, rel):
+                    continue
+                if opts.exclude and _matches(opts.exclude, name, rel):
+                    continue
+                files.append(Path(entry.path))
+
+        return files, subdirs
+
+
+def iter_images(root: Path, options: Optional[DiscoveryOptions] = None) -> Iterator[Path]:
+    """
+    Lazily yield supported image and PDF files under `root`, built on
+    os.scandir.
+
+    - If `root` is a file, yields `root`.
+    - If `root` is a directory, walks it according to `options`, yielding
+      matches as soon as their directory is scanned so downstream work can
+      start before the walk finishes.
+    """
+    opts = options or DiscoveryOptions()
+    if root.is_file():
+        yield root
+        return
+    if not root.is_dir():
+        return
+
+    scanner = _Scanner(opts)
+    if opts.symlinks == "follow":
+        scanner.first_visit(str(root))
+    start: _DirItem = (str(root), "", 0)
+
+    if opts.workers == 1:
+        stack = [start]
+        while stack:
+            files, subdirs = scanner.scan(stack.pop())
+            yield from files
+            # Reversed so siblings are visited in scandir order.
+            stack.extend(reversed(subdirs))
+        return
+
+    yield from _walk_parallel(scanner, start, opts.workers)
+
+
+def matches(root: Path, path: Path, options: Optional[DiscoveryOptions] = None) -> bool:
+    """
+    Whether `iter_images(root, options)` would yield `path`, decided from
+    the path alone (no directory scan). Used to filter file-system events.
+    """
+    opts = options or DiscoveryOptions()
+    try:
+        parts = path.relative_to(root).parts
+    except ValueError:
+        return False
+    if not parts:
+        return False
+    if os.path.splitext(parts[-1])[1].lower() not in {e.lower() for e in opts.extensions}:
+        return False
+    if opts.max_depth is not None and len(parts) - 1 > opts.max_depth:
+        return False
+    if opts.symlinks == "skip" and path.is_symlink():
+        return False
+
+    if opts.exclude:
+        for i in range(1, len(parts)):
+            if _matches(opts.exclude, parts[i - 1], "/".join(parts[:i])):
+                return False
+    rel = "/".join(parts)
+    if opts.include and not _matches(opts.include, parts[-1], rel):
+        return False
+    if opts.exclude and _matches(opts.exclude, parts[-1], rel):
+        return False
+    return True
+
+
+_DONE = object()
+
+
+def _walk_parallel(scanner: _Scanner, start: _DirItem, workers: int) -> Iterator[Path]:
+    """
+    Scan directories on `workers` threads. Found files flow through a
+    bounded queue, so a slow consumer throttles the walk instead of letting
+    it buffer the whole tree.
+    """
+    dirs: "queue.Queue[Optional[_DirItem]]" = queue.Queue()
+    found: "queue.Queue[object]" = queue.Queue(maxsize=4096)
+    stop = threading.Event()
+    lock = threading.Lock()
+    pending = [1]  # directories queued or being scanned
+
+    def put_found(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                found.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker() -> None:
+        while True:
+            item = dirs.get()
+            if item is None or stop.is_set():
+                return
+            try:
+                files, subdirs = scanner.scan(item)
+                with lock:
+                    pending[0] += len(subdirs)
+                for d in subdirs:
+                    dirs.put(d)
+                for f in files:
+                    if not put_found(f):
+                        break
+            except Exception as exc:  # noqa: BLE001
+                # Hand the error to the consumer; a dead worker would
+                # otherwise leave it waiting for _DONE forever.
+                put_found(exc)
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    done = pending[0] == 0
+                if done:
+                    put_found(_DONE)
+
+    dirs.put(start)
+    threads = [
+        threading.Thread(target=worker, name=f"discovery-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = found.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item  # type: ignore[misc]
+    finally:
+        stop.set()
+        for _ in threads:
+            dirs.put(None)
+        for t in threads:
+            t.join()
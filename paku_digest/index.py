@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .models import Document
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id         INTEGER PRIMARY KEY,
+    path       TEXT NOT NULL UNIQUE,
+    engine     TEXT,
+    language   TEXT,
+    raw_text   TEXT,
+    pages      INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+
+-- External-content FTS table: the text lives once, in `documents`.
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    raw_text,
+    content='documents',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, raw_text) VALUES (new.id, new.raw_text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, raw_text)
+    VALUES ('delete', old.id, old.raw_text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE OF raw_text ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, raw_text)
+    VALUES ('delete', old.id, old.raw_text);
+    INSERT INTO documents_fts(rowid, raw_text) VALUES (new.id, new.raw_text);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO documents (path, engine, language, raw_text, pages, data, indexed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    engine = excluded.engine,
+    language = excluded.language,
+    raw_text = excluded.raw_text,
+    pages = excluded.pages,
+    data = excluded.data,
+    indexed_at = excluded.indexed_at
+"""
+
+_SEARCH = """
+SELECT d.path, d.engine, snippet(documents_fts, 0, '[', ']', '…', ?), bm25(documents_fts)
+FROM documents_fts
+JOIN documents AS d ON d.id = documents_fts.rowid
+WHERE documents_fts MATCH ?
+ORDER BY rank
+LIMIT ?
+"""
+
+_Row = Tuple[str, Optional[str], Optional[str], Optional[str], int, str, float]
+
+
+def fts5_available() -> bool:
+    """True if the sqlite3 library Python links against has FTS5."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+@dataclass
+class SearchHit:
+    path: str
+    engine: Optional[str]
+    snippet: str
+    score: float  # bm25; lower is a better match
+
+
+class ResultIndex:
+    """
+    SQLite result index with full-text search over `raw_text`.
+
+    One row per document path (re-indexing a path replaces its row), with
+    engine, language and page count as columns, the rest of the document
+    as JSON, and an FTS5 index on the text kept in sync by triggers.
+
+    The database runs in WAL mode, so `search` can query it while a digest
+    is still writing. Rows are buffered and inserted in one transaction
+    every `commit_every` documents or `commit_interval` seconds, which
+    keeps ingestion well ahead of OCR; a crash loses at most the last
+    uncommitted batch.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        commit_every: int = 500,
+        commit_interval: float = 2.0,
+    ) -> None:
+        if commit_every < 1:
+            raise ValueError("commit_every must be >= 1")
+        if not fts5_available():
+            raise RuntimeError(
+                "The result index needs SQLite with FTS5, which this Python's "
+                "sqlite3 module lacks."
+            )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._pending: List[_Row] = []
+        self._last_commit = time.monotonic()
+
+        self._conn = sqlite3.connect(str(path), isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent with NORMAL; only the last
+        # transactions can be lost on power failure.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ---------- writing ----------
+
+    def add(self, doc: Document) -> None:
+        """Queue `doc` for insertion; commits when the batch is due."""
+        data = doc.model_dump(mode="json")
+        ocr = data.get("ocr")
+        text = ocr.pop("raw_text") if ocr is not None else None
+        self._pending.append(
+            (
+                str(doc.path.resolve()),
+                ocr["engine"] if ocr is not None else None,
+                ocr["language"] if ocr is not None else None,
+                text,
+                len(doc.pages),
+                json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+                time.time(),
+            )
+        )
+        if (
+            len(self._pending) >= self._commit_every
+            or time.monotonic() - self._last_commit >= self._commit_interval
+        ):
+            self.commit()
+
+    def tap(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Pass `documents` through unchanged, indexing each on the way."""
+        for doc in documents:
+            self.add(doc)
+            yield doc
+
+    def commit(self) -> None:
+        """Insert all queued documents in one transaction."""
+        self._last_commit = time.monotonic()
+        if not self._pending:
+            return
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(_UPSERT, self._pending)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._pending.clear()
+
+    def close(self) -> None:
+        try:
+            self.commit()
+        finally:
+            self._conn.close()
+
+    def __enter__(self) -> "ResultIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # ---------- reading ----------
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, limit: int = 20, context: int = 12) -> List[SearchHit]:
+        """
+        Best `limit` matches for an FTS5 query (words, "phrases", AND / OR /
+        NOT, prefix*), each with a snippet of about `context` tokens.
+        """
+        try:
+            rows = self._conn.execute(_SEARCH, (context, query, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {query!r}: {e}") from None
+        return [SearchHit(path, engine, snippet, score) for path, engine, snippet, score in rows]
+
+    def get(self, path: Path) -> Optional[Document]:
+        row = self._conn.execute(
+            "SELECT raw_text, data FROM documents WHERE path = ?",
+            (str(path.resolve()),),
+        ).fetchone()
+        if row is None:
+            return None
+        text, data = row
+        data = json.loads(data)
+        if data.get("ocr") is not None:
+            data["ocr"]["raw_text"] = text
+        return Document.model_validate(data)
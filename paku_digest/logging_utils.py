@@ -1,18 +1,206 @@
+"""
+Logger setup.
+
+By default records are handed to a background thread through a queue
+(`PAKU_LOG_ASYNC`, bounded by `PAKU_LOG_QUEUE_SIZE`), so worker threads never wait on stderr or on a
+handler lock; the writer formats them as text or JSON (`PAKU_LOG_FORMAT`).
+
+Per-file records – those logged with a `path` in `extra` – can be thinned
+out below WARNING with `PAKU_LOG_FILE_SAMPLE` (keep one in N) and
+`PAKU_LOG_FILE_RATE` (at most N per second). The next record that is
+written carries the number suppressed since the previous one; so do
+records after the queue overflowed, which only ever drops INFO and below.
+
+Hot-path calls pass lazy %-style arguments, so a disabled level costs a
+level check and nothing else.
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import json
 import logging
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import util as mp_util
+from queue import SimpleQueue
+from typing import Optional, Tuple
+
 from .config import AppConfig
 
+# `extra` fields the JSON formatter emits when a record carries them.
+STRUCTURED_FIELDS = ("path", "engine", "elapsed_ms", "images", "suppressed")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                payload[name] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("[%(asctime)s] [%(levelname)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{text} (+{suppressed} suppressed)" if suppressed else text
+
+
+class FileLogSampler(logging.Filter):
+    """
+    Keep one in `every` per-file records below WARNING and at most
+    `per_second` of them per second (0 = no limit). Other records pass.
+    Counts are kept without a lock, so under heavy contention the
+    suppressed totals are approximate.
+    """
+
+    def __init__(self, every: int = 1, per_second: float = 0.0) -> None:
+        super().__init__()
+        self.every = max(every, 1)
+        self.per_second = per_second
+        self._seen = itertools.count()
+        self._suppressed = 0
+        self._tokens = per_second
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def suppress(self) -> None:
+        self._suppressed += 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and getattr(record, "path", None) is not None:
+            if next(self._seen) % self.every or not self._take_token():
+                self._suppressed += 1
+                return False
+        if self._suppressed:
+            record.suppressed, self._suppressed = self._suppressed, 0
+        return True
+
+    def _take_token(self) -> bool:
+        if not self.per_second:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.per_second, self._tokens + (now - self._refilled) * self.per_second
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Enqueue records for a QueueListener thread without taking the handler
+    lock. Records are not pre-formatted: the writer thread does that. Once
+    `max_queued` records are waiting, records below WARNING are dropped
+    (and counted); WARNING and above are always kept.
+    """
+
+    queue: "SimpleQueue[logging.LogRecord]"
+
+    def __init__(
+        self,
+        log_queue: "SimpleQueue[logging.LogRecord]",
+        sampler: FileLogSampler,
+        max_queued: int,
+    ) -> None:
+        super().__init__(log_queue)
+        self.sampler = sampler
+        self.max_queued = max_queued
+        self.addFilter(sampler)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue is unbounded but lock-free for producers; the size
+        # check is approximate, which is all a log buffer needs.
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.max_queued:
+            self.sampler.suppress()
+            return
+        self.queue.put(record)
+
+
+# (listener, queue handler, writer handler) while logging asynchronously.
+_async: Optional[Tuple[QueueListener, AsyncHandler, logging.Handler]] = None
+_async_lock = threading.Lock()
+
+
+def shutdown_logging() -> None:
+    """
+    Write out queued records, stop the writer thread and log synchronously
+    from then on (idempotent). Runs at exit, also in worker processes.
+    """
+    global _async
+    with _async_lock:
+        if _async is None:
+            return
+        listener, queue_handler, writer = _async
+        _async = None
+    logger = logging.getLogger("paku-digest")
+    logger.removeHandler(queue_handler)
+    listener.stop()  # drains what is queued
+    writer.addFilter(queue_handler.sampler)
+    logger.addHandler(writer)
+
 
 def get_logger(config:AppConfig) -> logging.Logger:
+    global _async
+
     logger = logging.getLogger("paku-digest")
     if logger.handlers:
         return logger
-    
+
     level = getattr(logging, config.log_level.upper(), logging.INFO)
     logger.setLevel(level)
 
     handler = logging.StreamHandler()
-    fmt = "[%(asctime)s] [%(levelname)s] %(message)s"
-    handler.setFormatter(logging.Formatter(fmt))
-    logger.addHandler(handler)
+    handler.setFormatter(JsonFormatter() if config.log_format == "json" else TextFormatter())
+    sampler = FileLogSampler(config.log_file_sample, config.log_file_rate)
+
+    if not config.log_async:
+        handler.addFilter(sampler)
+        logger.addHandler(handler)
+        return logger
+
+    log_queue: "SimpleQueue[logging.LogRecord]" = SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    queue_handler = AsyncHandler(log_queue, sampler, max(config.log_queue_size, 1))
+    listener.start()
+    _async = (listener, queue_handler, handler)
+    logger.addHandler(queue_handler)
+    # Worker processes skip atexit, but run multiprocessing finalizers.
+    atexit.register(shutdown_logging)
+    mp_util.Finalize(None, shutdown_logging, exitpriority=100)
 
     return logger
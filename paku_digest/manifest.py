@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol, Set, TextIO, Tuple
+
+from .cache import hash_file
+
+# (size, mtime_ns) of a file as seen before it was processed.
+FileStamp = Tuple[int, int]
+
+
+class OutputStream(Protocol):
+    """What the manifest needs of the output it keeps in step with."""
+
+    @property
+    def closed(self) -> bool: ...
+
+    def flush(self) -> None: ...
+
+    def fileno(self) -> int: ...
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    run: str
+    sha256: Optional[str] = None
+    output: Optional[dict] = None
+
+
+@dataclass
+class RunPlan:
+    """
+    What a digest run should do, derived from the manifest.
+
+    - run_id       : id recorded on every entry of this run
+    - resumed      : True when continuing the previous run
+    - incremental  : True when unchanged files are skipped
+    - output_end   : byte offset the output file should be truncated to
+                     before appending (resume only)
+    - skip         : predicate telling which discovered paths to skip
+    """
+
+    run_id: str
+    resumed: bool = False
+    incremental: bool = False
+    output_end: Optional[int] = None
+    skip: Callable[[Path], bool] = field(default=lambda p: False)
+
+
+class DigestManifest:
+    """
+    Append-only checkpoint manifest for digest runs over one input root.
+
+    Stored as JSON lines: a {"type": "run"} header whenever a run starts or
+    resumes, then one {"type": "file"} record per processed path with its
+    size, mtime, content hash and a pointer into the run's output file.
+    Size and mtime are taken when the path is planned (before OCR), so a
+    file rewritten while it was being processed is seen as changed next
+    time. Hashing runs on a background thread that writes the records in
+    the order they were made; a file that moved while being hashed gets
+    no hash and is simply redone by the next incremental run.
+
+    Writes go through a buffered file handle and are fsync'd in batches
+    (every `fsync_every` records or `fsync_interval` seconds), so the
+    manifest never becomes the bottleneck; a crash can only lose the last
+    unsynced batch, which the next resume simply redoes. A torn final line
+    is ignored when loading.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = 256,
+        fsync_interval: float = 2.0,
+    ) -> None:
+        self.path = path
+        self._fsync_every = fsync_every
+        self._fsync_interval = fsync_interval
+        self._fh: Optional[TextIO] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._error: Optional[BaseException] = None
+        self._stamps: Dict[str, FileStamp] = {}
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._run_id: Optional[str] = None
+        self._output: Optional[OutputStream] = None
+
+    @classmethod
+    def for_input(cls, manifest_dir: Path, input_path: Path) -> "DigestManifest":
+        """Manifest dedicated to one (resolved) input root."""
+        root = str(input_path.resolve())
+        digest = hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+        return cls(manifest_dir / f"digest-{digest}.jsonl")
+
+    # ---------- reading ----------
+
+    def _records(self) -> List[dict]:
+        if not self.path.exists():
+            return []
+        records: List[dict] = []
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn write from a crash; everything before it is intact.
+                    continue
+        return records
+
+    def runs(self, records: Optional[List[dict]] = None) -> List[dict]:
+        """Run headers in order; resumed runs appear once per resume."""
+        records = self._records() if records is None else records
+        return [r for r in records if r.get("type") == "run"]
+
+    def entries(self, records: Optional[List[dict]] = None) -> List[ManifestEntry]:
+        records = self._records() if records is None else records
+        return [
+            ManifestEntry(
+                path=r["path"],
+                size=r["size"],
+                mtime_ns=r["mtime_ns"],
+                run=r["run"],
+                sha256=r.get("sha256"),
+                output=r.get("output"),
+            )
+            for r in records
+            if r.get("type") == "file"
+        ]
+
+    # ---------- planning ----------
+
+    def plan(
+        self,
+        resume: bool,
+        incremental: bool,
+        out: Optional[Path],
+        fmt: str,
+        log,
+    ) -> RunPlan:
+        """
+        Decide which paths to skip:
+
+        - resume      : skip paths already recorded by the last run, and
+                        continue that run's output file where it stopped
+        - incremental : skip paths whose size and mtime match the latest
+                        record from earlier runs, or whose mtime moved but
+                        whose content hash did not
+
+        The predicate also remembers each path's size and mtime for
+        `record()`, so call it before the path is processed.
+        """
+        records = self._records()
+        runs = self.runs(records)
+        entries = self.entries(records)
+        del records
+        last_run = runs[-1] if runs else None
+        out_key = str(out.resolve()) if out else None
+
+        resumed = False
+        run_id = _new_run_id()
+        finished: Set[str] = set()
+        output_end: Optional[int] = None
+        baseline_runs: Optional[Set[str]] = None
+
+        if resume and last_run is not None:
+            if last_run.get("out") != out_key or last_run.get("format") != fmt:
+                raise ValueError(
+                    "Cannot resume: the last run wrote "
+                    f"{last_run.get('out')!r} as {last_run.get('format')!r}, "
+                    f"not {out_key!r} as {fmt!r}."
+                )
+            resumed = True
+            run_id = last_run["run"]
+            incremental = incremental or bool(last_run.get("incremental"))
+            ends = [0]
+            for e in entries:
+                if e.run == run_id:
+                    finished.add(e.path)
+                    if e.output and e.output.get("end") is not None:
+                        ends.append(int(e.output["end"]))
+            output_end = max(ends)
+            baseline_runs = {r["run"] for r in runs if r["run"] != run_id}
+            log.info(
+                f"[manifest] Resuming run {run_id}: {len(finished)} files already done"
+            )
+        elif resume:
+            log.info("[manifest] Nothing to resume; starting a new run")
+
+        latest: Dict[str, ManifestEntry] = {}
+        if incremental:
+            for e in entries:
+                if baseline_runs is None or e.run in baseline_runs:
+                    latest[e.path] = e
+
+        def skip(path: Path) -> bool:
+            key = str(path.resolve())
+            if key in finished:
+                return True
+            try:
+                st = path.stat()
+            except OSError:
+                return False
+            self._stamps[key] = (st.st_size, st.st_mtime_ns)
+            prev = latest.get(key) if incremental else None
+            if prev is None or st.st_size != prev.size:
+                return False
+            if st.st_mtime_ns == prev.mtime_ns:
+                skipped = True
+            elif prev.sha256 is None:
+                return False
+            else:
+                # Touched but maybe not modified: settle it by content.
+                try:
+                    skipped = hash_file(path) == prev.sha256
+                except OSError:
+                    return False
+            if skipped:
+                del self._stamps[key]
+            return skipped
+
+        return RunPlan(
+            run_id=run_id,
+            resumed=resumed,
+            incremental=incremental,
+            output_end=output_end,
+            skip=skip,
+        )
+
+    # ---------- writing ----------
+
+    def begin_run(
+        self,
+        plan: RunPlan,
+        out: Optional[Path],
+        fmt: str,
+        output_stream: Optional[OutputStream] = None,
+    ) -> None:
+        """
+        Open the manifest for appending and write the run header.
+
+        If `output_stream` is given it is fsync'd before every manifest
+        sync, so a record never points past data that is durably written.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("a", encoding="utf-8")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="manifest")
+        self._error = None
+        self._run_id = plan.run_id
+        self._output = output_stream
+        self._append(
+            {
+                "type": "run",
+                "run": plan.run_id,
+                "resumed": plan.resumed,
+                "started": time.time(),
+                "out": str(out.resolve()) if out else None,
+                "format": fmt,
+                "incremental": plan.incremental,
+            }
+        )
+        self.sync()
+
+    def record(
+        self,
+        path: Path,
+        output: Optional[dict] = None,
+        stamp: Optional[FileStamp] = None,
+    ) -> None:
+        """
+        Record a processed path; hashing and writing happen on the
+        manifest's writer thread, fsync in batches.
+
+        `stamp` is the file's (size, mtime_ns) from before it was
+        processed; without it, what `plan().skip` saw is used, then a stat
+        made now. A path that no longer exists is not recorded.
+        """
+        key = str(path.resolve())
+        planned = self._stamps.pop(key, None)
+        stamp = stamp or planned
+        if stamp is None:
+            try:
+                st = path.stat()
+            except OSError:
+                return
+            stamp = (st.st_size, st.st_mtime_ns)
+        entry = {
+            "type": "file",
+            "run": self._run_id,
+            "path": key,
+            "size": stamp[0],
+            "mtime_ns": stamp[1],
+            "sha256": None,
+            "output": output,
+        }
+        self._submit(self._write_entry, path, entry)
+
+    def _write_entry(self, path: Path, entry: dict) -> None:
+        try:
+            digest = hash_file(path)
+            st = path.stat()
+        except OSError:
+            digest = None
+        else:
+            if (st.st_size, st.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+                digest = None  # hashed a newer version than was processed
+        entry["sha256"] = digest
+        self._append(entry)
+        self._pending += 1
+        if (
+            self._pending >= self._fsync_every
+            or time.monotonic() - self._last_sync >= self._fsync_interval
+        ):
+            self._sync()
+
+    def _submit(self, fn: Callable[..., None], *args: object) -> None:
+        if self._writer is None:
+            raise RuntimeError("DigestManifest.begin_run() must be called first")
+        if self._error is not None:
+            raise self._error
+        self._writer.submit(fn, *args).add_done_callback(self._check)
+
+    def _check(self, fut: "Future[None]") -> None:
+        exc = fut.exception()
+        if exc is not None and self._error is None:
+            self._error = exc
+
+    def _append(self, record: dict) -> None:
+        if self._fh is None:
+            raise RuntimeError("DigestManifest.begin_run() must be called first")
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def sync(self) -> None:
+        """Write and fsync every record made so far."""
+        if self._writer is None:
+            self._sync()
+            return
+        self._writer.submit(self._sync).result()
+        if self._error is not None:
+            raise self._error
+
+    def _sync(self) -> None:
+        if self._fh is None:
+            return
+        if self._output is not None and not self._output.closed:
+            self._output.flush()
+            try:
+                os.fsync(self._output.fileno())
+            except (OSError, ValueError):
+                pass  # not a real file (e.g. a pipe)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._fh is None:
+            return
+        try:
+            self._sync()
+        finally:
+            self._fh.close()
+            self._fh = None
+            self._output = None
+            self._stamps.clear()
+        if self._error is not None:
+            raise self._error
+
+
+def truncate_output(out: Path, end: int, log) -> None:
+    """Cut a resumed output file back to the last recorded document."""
+    if not out.exists():
+        return
+    size = out.stat().st_size
+    if size < end:
+        log.warning(
+            f"[manifest] {out} is shorter ({size} bytes) than recorded ({end}); "
+            "appending after its current end"
+        )
+        return
+    with out.open("r+b") as f:
+        f.truncate(end)
+
+
+def _new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
@@ -0,0 +1,391 @@
+"""
+In-process metrics and stage tracing.
+
+- `REGISTRY` holds counters and histograms (with labels) and renders them
+  in the Prometheus text exposition format, for a file dump
+  (`--metrics-out`, e.g. picked up by node_exporter's textfile collector)
+  or the `/metrics` endpoint of `serve`.
+- `span(stage, **attrs)` times a block: the duration always goes into the
+  `paku_stage_seconds` histogram, and, while `TRACER` is enabled, also
+  into a per-run trace written as Chrome trace events (`--trace-out`;
+  open it in Perfetto or chrome://tracing).
+
+Worker processes have their own registry and tracer; the digest pipeline
+ships their `take()` snapshots back with each result chunk and `merge`s
+them into the parent's.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Seconds; spans everything from a cache hit to a slow remote model call.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]) -> None:  # noqa: A002
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def take(self) -> dict:
+        """Values recorded since the last `take`, resetting them."""
+        raise NotImplementedError
+
+    def merge(self, values: dict) -> None:
+        """Add values returned by another process's `take`."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter per label combination."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:  # noqa: A002
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+    def take(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for k, v in values.items():
+                self._values[k] = self._values.get(k, 0.0) + v
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label combination."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)  # first bucket with value <= bound
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1][0] if entry else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def take(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, (counts, total) in values.items():
+                mine, my_total = self._values.setdefault(
+                    key, ([0] * (len(self.buckets) + 1), [0.0])
+                )
+                for i, n in enumerate(counts):
+                    mine[i] += n
+                my_total[0] += total[0]
+
+
+class MetricsRegistry:
+    """Named counters and histograms, created on first use."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:  # noqa: A002
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Write `render()` to `path` atomically (safe for textfile collectors)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def take(self) -> Dict[str, dict]:
+        """Values recorded since the last `take`, resetting them (worker side)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.take() for m in metrics}
+
+    def merge(self, snapshot: Dict[str, dict]) -> None:
+        """Add a worker's `take()` snapshot; its metrics must exist here too."""
+        for name, values in snapshot.items():
+            with self._lock:
+                metric = self._metrics.get(name)
+            if metric is not None and values:
+                metric.merge(values)
+
+
+class Tracer:
+    """
+    Collects finished spans as Chrome trace "complete" events while
+    enabled. Disabled by default, so spans cost one histogram update.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._events: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, duration: float, attrs: dict) -> None:
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": attrs,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def take(self) -> List[dict]:
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def extend(self, events: Iterable[dict]) -> None:
+        with self._lock:
+            self._events.extend(events)
+
+    def write(self, path: Path) -> int:
+        """Write (and clear) the collected spans as a Chrome trace; returns their count."""
+        events = sorted(self.take(), key=lambda e: e["ts"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str),
+            encoding="utf-8",
+        )
+        return len(events)
+
+
+REGISTRY = MetricsRegistry()
+TRACER = Tracer()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "paku_stage_seconds",
+    "Wall time per pipeline stage (discovery, dedup, engine_init, render, decode, ocr, export).",
+    ("stage",),
+)
+DOCUMENTS = REGISTRY.counter(
+    "paku_documents_total", "Documents produced, by outcome.", ("status",)
+)
+ENGINE_SECONDS = REGISTRY.histogram(
+    "paku_engine_call_seconds",
+    "Latency of OCR engine calls per engine or routing strategy (extract or batch).",
+    ("engine", "call"),
+)
+ENGINE_IMAGES = REGISTRY.counter(
+    "paku_engine_images_total", "Images sent to OCR engines.", ("engine",)
+)
+ENGINE_ERRORS = REGISTRY.counter(
+    "paku_engine_errors_total", "Failed OCR engine calls.", ("engine",)
+)
+CACHE_EVENTS = REGISTRY.counter(
+    "paku_cache_events_total", "OCR result cache events (hit, miss, write, eviction).", ("event",)
+)
+
+
+@contextmanager
+def trace(name: str, **attrs: object) -> Iterator[None]:
+    """Record the block in the trace only (no-op while tracing is off)."""
+    if not TRACER.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    wall = time.time()
+    try:
+        yield
+    finally:
+        TRACER.record(name, wall, time.perf_counter() - start, attrs)
+
+
+# Innermost open span per thread id, so the sampling profiler can
+# attribute samples to a stage. Single dict operations are atomic.
+_active_stages: Dict[int, str] = {}
+
+
+def current_stage(thread_id: int) -> Optional[str]:
+    """The stage thread `thread_id` is in, if it is inside a span."""
+    return _active_stages.get(thread_id)
+
+
+@contextmanager
+def span(stage: str, **attrs: object) -> Iterator[None]:
+    """Time the block as `stage` (histogram, plus trace when enabled)."""
+    tid = threading.get_ident()
+    outer = _active_stages.get(tid)
+    _active_stages[tid] = stage
+    start = time.perf_counter()
+    wall = time.time()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if outer is None:
+            _active_stages.pop(tid, None)
+        else:
+            _active_stages[tid] = outer
+        STAGE_SECONDS.observe(duration, stage=stage)
+        if TRACER.enabled:
+            TRACER.record(stage, wall, duration, attrs)
+
+
+def timed_iter(items: Iterable[T], stage: str) -> Iterator[T]:
+    """
+    Yield from `items`, attributing the time spent producing each item to
+    `stage`, e.g. the directory walk behind a lazy discovery iterator.
+    """
+    it = iter(items)
+    while True:
+        with span(stage):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def telemetry_snapshot() -> Tuple[Dict[str, dict], List[dict]]:
+    """Metrics and spans recorded in this process since the last call."""
+    return REGISTRY.take(), TRACER.take()
+
+
+def merge_telemetry(snapshot: Tuple[Dict[str, dict], List[dict]]) -> None:
+    metrics, events = snapshot
+    REGISTRY.merge(metrics)
+    TRACER.extend(events)
@@ -1,9 +1,35 @@
 from __future__ import annotations
 
+import numbers
+import operator
+from array import array
 from pathlib import Path
-from typing import List, Literal, Optional
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+    overload,
+)
 
-from pydantic import BaseModel, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    GetCoreSchemaHandler,
+    GetJsonSchemaHandler,
+    SerializerFunctionWrapHandler,
+    ValidatorFunctionWrapHandler,
+)
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import core_schema
 
 
 class BoundingBox(BaseModel):
@@ -12,6 +38,12 @@ class BoundingBox(BaseModel):
     width: int
     height: int
 
+    def __eq__(self, other: object) -> bool:
+        # Read-only views handed out by BlockArray equal the boxes they show.
+        if isinstance(other, BoundingBox):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
 
 class OcrBlock(BaseModel):
     text:str
@@ -19,15 +51,317 @@ class OcrBlock(BaseModel):
     bbox: Optional[BoundingBox] = None
     type: Literal["line", "word", "paragraph"] = "line"
 
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, OcrBlock):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
+
+class _BoxView(BoundingBox):
+    model_config = ConfigDict(frozen=True)
+
+
+class _BlockView(OcrBlock):
+    """A block read out of a BlockArray; frozen, as writes could not reach it."""
+
+    model_config = ConfigDict(frozen=True)
+
+
+BLOCK_TYPES = ("line", "word", "paragraph")
+_TYPE_CODES = {t: i for i, t in enumerate(BLOCK_TYPES)}
+
+
+class BlockArray(Sequence[OcrBlock]):
+    """
+    Optional compact, column-oriented storage for the blocks of one
+    OcrResult.
+
+    Instead of one OcrBlock + BoundingBox model pair per block, texts live
+    in a list, confidences in an `array('d')`, boxes in a flat `array('q')`
+    of (x, y, width, height) and types / bbox presence in byte arrays.
+    Indexing and iteration return read-only OcrBlock views built on demand
+    (without re-validation), so code reading `OcrResult.blocks` keeps
+    working, and it serializes to the same JSON as a list of OcrBlock.
+
+    Opt-in: engines with many blocks fill one with `add` (or build one from
+    OcrBlocks / plain dicts, e.g. cached JSON) and pass `as_blocks()` to
+    OcrResult, which keeps it as is instead of validating one model per
+    block. `add` applies the same checks as OcrBlock.
+    """
+
+    __slots__ = ("_texts", "_confidences", "_boxes", "_has_bbox", "_types")
+
+    def __init__(self, blocks: Iterable[Any] = ()) -> None:
+        self._texts: List[str] = []
+        self._confidences = array("d")
+        self._boxes = array("q")
+        self._has_bbox = bytearray()
+        self._types = bytearray()
+        for block in blocks:
+            self._append_any(block)
+
+    # ---------- filling ----------
+
+    def add(
+        self,
+        text: str,
+        confidence: float,
+        bbox: Optional[Sequence[int]] = None,
+        type: str = "line",
+    ) -> None:
+        """Add a block from raw values; `bbox` is (x, y, width, height) or None."""
+        if not isinstance(text, str):
+            raise TypeError(f"block text must be a string, got {text!r}")
+        if isinstance(confidence, bool) or not isinstance(confidence, numbers.Real):
+            raise TypeError(f"confidence must be a number, got {confidence!r}")
+        confidence = float(confidence)
+        if not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+        code = _TYPE_CODES.get(type)
+        if code is None:
+            raise ValueError(f"block type must be one of {BLOCK_TYPES}, got {type!r}")
+        box = None if bbox is None else tuple(_as_int(v) for v in bbox)
+        if box is not None and len(box) != 4:
+            raise ValueError(f"bbox must be (x, y, width, height), got {bbox!r}")
+
+        self._texts.append(text)
+        self._confidences.append(confidence)
+        if box is None:
+            self._boxes.extend((0, 0, 0, 0))
+            self._has_bbox.append(0)
+        else:
+            self._boxes.extend(box)
+            self._has_bbox.append(1)
+        self._types.append(code)
+
+    def append(self, block: OcrBlock) -> None:
+        """List-compatible append of an OcrBlock."""
+        box = block.bbox
+        bbox = None if box is None else (box.x, box.y, box.width, box.height)
+        self.add(block.text, block.confidence, bbox, block.type)
+
+    def _append_any(self, block: Any) -> None:
+        if isinstance(block, OcrBlock):
+            self.append(block)
+            return
+        if isinstance(block, dict):
+            box = block.get("bbox")
+            if isinstance(box, BoundingBox):
+                bbox = (box.x, box.y, box.width, box.height)
+            elif box is not None:
+                bbox = (box["x"], box["y"], box["width"], box["height"])
+            else:
+                bbox = None
+            self.add(block["text"], block["confidence"], bbox, block.get("type", "line"))
+            return
+        raise TypeError(f"Cannot store {type(block).__name__} as an OCR block")
+
+    def map_boxes(
+        self, fn: Callable[[Tuple[int, int, int, int]], Tuple[int, int, int, int]]
+    ) -> "BlockArray":
+        """A copy with every present bbox replaced by `fn((x, y, w, h))`."""
+        out = BlockArray()
+        out._texts = list(self._texts)
+        out._confidences = array("d", self._confidences)
+        out._has_bbox = bytearray(self._has_bbox)
+        out._types = bytearray(self._types)
+        boxes = array("q")
+        for i, present in enumerate(self._has_bbox):
+            x, y, w, h = self._boxes[4 * i : 4 * i + 4]
+            boxes.extend(fn((x, y, w, h)) if present else (x, y, w, h))
+        out._boxes = boxes
+        return out
+
+    # ---------- columns ----------
+
+    @property
+    def texts(self) -> Sequence[str]:
+        return self._texts
+
+    @property
+    def confidences(self) -> Sequence[float]:
+        return self._confidences
+
+    def bbox(self, index: int) -> Optional[BoundingBox]:
+        if not self._has_bbox[index]:
+            return None
+        x, y, width, height = self._boxes[4 * index : 4 * index + 4]
+        return _BoxView.model_construct(x=x, y=y, width=width, height=height)
+
+    # ---------- sequence protocol ----------
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @overload
+    def __getitem__(self, index: int) -> OcrBlock: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "BlockArray": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return BlockArray(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("block index out of range")
+        return _BlockView.model_construct(
+            text=self._texts[index],
+            confidence=self._confidences[index],
+            bbox=self.bbox(index),
+            type=BLOCK_TYPES[self._types[index]],
+        )
+
+    def __iter__(self) -> Iterator[OcrBlock]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, BlockArray):
+            return (
+                self._texts == other._texts
+                and self._confidences == other._confidences
+                and self._boxes == other._boxes
+                and self._has_bbox == other._has_bbox
+                and self._types == other._types
+            )
+        if isinstance(other, (list, tuple)):
+            return self == BlockArray(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"BlockArray(<{len(self)} blocks>)"
+
+    def __reduce__(self):
+        return (
+            _restore_blocks,
+            (self._texts, self._confidences, self._boxes, self._has_bbox, self._types),
+        )
+
+    # ---------- pydantic integration ----------
+
+    def as_blocks(self) -> List[OcrBlock]:
+        """
+        This array, typed as the `OcrResult.blocks` field it is meant for.
+        OcrResult stores a BlockArray as is (it supports the read-only part
+        of the list interface plus `append`).
+        """
+        return cast(List[OcrBlock], self)
+
+    def to_list(self) -> List[dict]:
+        """The blocks as plain dicts, shaped like `OcrBlock.model_dump()`."""
+        out: List[dict] = []
+        boxes = self._boxes
+        for i, text in enumerate(self._texts):
+            bbox = None
+            if self._has_bbox[i]:
+                x, y, width, height = boxes[4 * i : 4 * i + 4]
+                bbox = {"x": x, "y": y, "width": width, "height": height}
+            out.append(
+                {
+                    "text": text,
+                    "confidence": self._confidences[i],
+                    "bbox": bbox,
+                    "type": BLOCK_TYPES[self._types[i]],
+                }
+            )
+        return out
+
+
+def map_block_boxes(
+    blocks: Sequence[OcrBlock],
+    fn: Callable[[Tuple[int, int, int, int]], Tuple[int, int, int, int]],
+) -> List[OcrBlock]:
+    """`blocks` with every present bbox replaced by `fn((x, y, w, h))`."""
+    if isinstance(blocks, BlockArray):
+        return blocks.map_boxes(fn).as_blocks()
+    out: List[OcrBlock] = []
+    for block in blocks:
+        box = block.bbox
+        if box is not None:
+            x, y, width, height = fn((box.x, box.y, box.width, box.height))
+            box = BoundingBox(x=x, y=y, width=width, height=height)
+        out.append(OcrBlock(text=block.text, confidence=block.confidence, bbox=box, type=block.type))
+    return out
+
+
+def _as_int(value: Any) -> int:
+    # What an `int` field accepts: integers and integral floats.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    try:
+        return operator.index(value)
+    except TypeError:
+        raise TypeError(f"bbox values must be integers, got {value!r}") from None
+
+
+def _restore_blocks(texts, confidences, boxes, has_bbox, types) -> BlockArray:
+    blocks = BlockArray()
+    blocks._texts = texts
+    blocks._confidences = confidences
+    blocks._boxes = boxes
+    blocks._has_bbox = has_bbox
+    blocks._types = types
+    return blocks
+
+
+def _keep_block_array(value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+    if isinstance(value, BlockArray):
+        return value  # already checked block by block in BlockArray.add
+    return handler(value)
+
+
+def _dump_block_array(value: Any, handler: SerializerFunctionWrapHandler) -> Any:
+    if isinstance(value, BlockArray):
+        return value.to_list()
+    return handler(value)
+
+
+class _AcceptsBlockArray:
+    """
+    Field marker: a BlockArray passes validation and serialization as is,
+    anything else is handled as the annotated List[OcrBlock]. The JSON
+    schema is that list's in either mode.
+    """
+
+    def __get_pydantic_core_schema__(
+        self, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        schema = handler(source)
+        return core_schema.no_info_wrap_validator_function(
+            _keep_block_array,
+            schema,
+            serialization=core_schema.wrap_serializer_function_ser_schema(
+                _dump_block_array, schema=schema
+            ),
+        )
+
+    def __get_pydantic_json_schema__(
+        self, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
+    ) -> JsonSchemaValue:
+        return handler(schema["schema"])  # type: ignore[typeddict-item]
+
 
 class OcrResult(BaseModel):
     engine: str
     raw_text: str
-    blocks: List[OcrBlock] = Field(default_factory=list)
+    # A list of OcrBlock, or a BlockArray (see BlockArray.as_blocks), which
+    # is kept as is and serializes to the same JSON.
+    blocks: Annotated[List[OcrBlock], _AcceptsBlockArray()] = Field(default_factory=list)
     language: Optional[str] = None
     meta: dict = Field(default_factory=dict)
 
 
+class Page(BaseModel):
+    number: int = Field(ge=1)
+    ocr: Optional[OcrResult] = None
+    error: Optional[str] = None
+
+
 class Document(BaseModel):
     path: Path
     ocr: Optional[OcrResult] = None
+    # Multi-page sources (PDFs): one entry per page, in page order. `ocr`
+    # then holds the pages' text joined by form feeds.
+    pages: List[Page] = Field(default_factory=list)
@@ -1,4 +1,5 @@
-from .base import OCREngine
+from .base import InputError, OCREngine
+from .registry import EngineRegistry, EngineSpec
 from .stub import StubOCREngine
 
-__all__ = ["OCREngine", "StubOCREngine"]
\ No newline at end of file
+__all__ = ["InputError", "OCREngine", "EngineRegistry", "EngineSpec", "StubOCREngine"]
\ No newline at end of file
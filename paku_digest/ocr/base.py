@@ -2,13 +2,49 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Union
 
 from ..models import OcrResult
 
+if TYPE_CHECKING:
+    from ..config import AppConfig
+
+
+class InputError(Exception):
+    """
+    The input itself is unusable (missing, unreadable or undecodable),
+    whatever engine gets it. Routing neither fails over nor counts it
+    against the engine's health.
+    """
+
+
+class PartialBatchError(RuntimeError):
+    """
+    Some images of a batch failed on their own while the others were
+    OCR'd. `outcomes` has one entry per input, in order: its OcrResult, or
+    the exception that image failed with.
+    """
+
+    def __init__(self, outcomes: List[Union[OcrResult, Exception]]) -> None:
+        self.outcomes = outcomes
+        failed = [o for o in outcomes if isinstance(o, Exception)]
+        super().__init__(f"{len(failed)} of {len(outcomes)} images failed: {failed[0]}")
+
 
 class OCREngine(ABC):
     """Base interface for all OCR engines used by paku-digest."""
 
+    @classmethod
+    def availability(cls, config: "AppConfig") -> Optional[str]:
+        """
+        Cheap pre-construction check used by the engine registry.
+
+        Return None if the engine can be built with this config, or a
+        human-readable reason why not. Must not import heavy dependencies
+        or load models.
+        """
+        return None
+
     @abstractmethod
     def name(self) -> str:
         """Unique engine name (e.g. 'stub', 'paddle', 'chandra-api')."""
@@ -19,6 +55,41 @@ class OCREngine(ABC):
         """Run OCR on a single image file and return a unified OcrResult."""
         raise NotImplementedError
 
+    def extract_batch(self, paths: Sequence[Path]) -> List[OcrResult]:
+        """
+        Run OCR on several image files, returning one OcrResult per path in
+        the same order.
+
+        The default simply loops over `extract`; engines that can amortize
+        model invocation across inputs should override it.
+        """
+        return [self.extract(p) for p in paths]
+
+    def accepts_images(self) -> bool:
+        """
+        Whether `extract_image` uses the decoded pixels it is given.
+
+        When True, the digest pipeline decodes and preprocesses each image
+        once (see `paku_digest.preprocess`) and calls `extract_image`
+        instead of `extract`.
+        """
+        return False
+
+    def extract_image(self, image: Any, path: Path) -> OcrResult:
+        """
+        Run OCR on an already decoded image (a numpy array, BGR or
+        grayscale). `path` is the file it came from, for metadata.
+
+        The default ignores `image` and reads the file via `extract`.
+        """
+        return self.extract(path)
+
+    def extract_image_batch(
+        self, images: Sequence[Any], paths: Sequence[Path]
+    ) -> List[OcrResult]:
+        """Batched counterpart of `extract_image`; one result per image."""
+        return [self.extract_image(i, p) for i, p in zip(images, paths)]
+
     def kind(self) -> str:
         """
         Engine kind of routing: 'light' or 'heavy'.
@@ -30,4 +101,17 @@ class OCREngine(ABC):
     
     def is_healthy(self) -> bool:
         """Best-effort health indicator for routing."""
-        return True
\ No newline at end of file
+        return True
+
+    def cacheable(self) -> bool:
+        """
+        Whether results may be reused from the content-addressed result cache.
+
+        Engines whose output depends on anything other than the image
+        contents and `cache_params()` should return False.
+        """
+        return True
+
+    def cache_params(self) -> dict:
+        """Engine settings that affect the output; part of the cache key."""
+        return {}
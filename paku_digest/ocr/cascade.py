@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from ..models import BlockArray, OcrResult
+
+
+@dataclass(frozen=True)
+class CascadePolicy:
+    """
+    When a light engine's result is good enough to skip the heavy engine.
+
+    - min_confidence : escalate when the mean block confidence (weighted by
+                       text length) is below this; results without blocks
+                       carry no confidence and are judged on text alone
+    - min_chars      : escalate when the stripped raw_text is shorter than
+                       this (1 = escalate only on empty text)
+    """
+
+    min_confidence: float = 0.8
+    min_chars: int = 1
+
+    def confidence(self, result: OcrResult) -> Optional[float]:
+        blocks = result.blocks
+        if isinstance(blocks, BlockArray):
+            # Read the columns directly instead of materializing block views.
+            pairs: Iterable[Tuple[str, float]] = zip(blocks.texts, blocks.confidences)
+        else:
+            pairs = ((b.text, b.confidence) for b in blocks)
+        total = 0
+        weighted = 0.0
+        for text, conf in pairs:
+            weight = max(1, len(text))
+            total += weight
+            weighted += conf * weight
+        return weighted / total if total else None
+
+    def escalation_reason(self, result: OcrResult) -> Optional[str]:
+        """Why `result` should be redone by the heavy engine, or None."""
+        if len((result.raw_text or "").strip()) < self.min_chars:
+            return "empty_text" if not (result.raw_text or "").strip() else "short_text"
+        conf = self.confidence(result)
+        if conf is not None and conf < self.min_confidence:
+            return "low_confidence"
+        return None
+
+
+def annotate(result: OcrResult, info: dict) -> OcrResult:
+    """Copy of `result` with the cascade decision recorded in meta["cascade"]."""
+    return result.model_copy(update={"meta": {**result.meta, "cascade": info}})
@@ -1,65 +1,261 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import importlib.util
+import mimetypes
+import threading
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Any, Coroutine, List, Optional, Sequence, TypeVar
 
 from .base import OCREngine
 from ..config import AppConfig
 from ..models import OcrResult
 
+T = TypeVar("T")
+
+OCR_PROMPT = (
+    "Transcribe all text visible in the image exactly as written. "
+    "Return only the transcription, without commentary."
+)
+
+# Marker the model is asked to put between transcriptions when several
+# images are packed into one request.
+IMAGE_SEPARATOR = "<<<IMAGE>>>"
+
+BATCH_PROMPT = (
+    "Transcribe all text visible in each of the following {count} images, "
+    "in order, exactly as written. Put a line containing only "
+    f"{IMAGE_SEPARATOR} between the transcriptions of consecutive images. "
+    "Return only the transcriptions, without commentary."
+)
+
 
 class ChandraAPIOCREngine(OCREngine):
     """
-    Placeholder for Chandra OCR via API.
+    Chandra OCR via an OpenAI-compatible chat completions API.
 
-    This is designed to work with any OpenAI-compatible endpoint
-    (e.g., Chandra, vLLM, llamafile server, OpenAI-style gateway, etc.)
-    but is *not configured* until the user sets:
+    Works with any OpenAI-compatible endpoint (Chandra, vLLM, llamafile
+    server, OpenAI-style gateway, etc.) once the user sets:
 
         PAKU_CHANDRA_API_URL
         PAKU_CHANDRA_API_KEY
 
     in the .env file.
 
-    For now, it simply raises a clear RuntimeError. Later we will fill in:
-    - HTTP request (async or sync)
-    - model selection & OCR prompt
-    - response parsing into OcrResult
+    Requests are issued by an asyncio `httpx.AsyncClient` running on a
+    private event loop thread owned by the engine. All callers share its
+    keep-alive connection pool, and a semaphore caps in-flight requests at
+    PAKU_CHANDRA_MAX_INFLIGHT. `aextract` / `aextract_batch` can be awaited
+    from any event loop; `extract` / `extract_batch` are blocking wrappers
+    so the existing thread-based pipelines keep working unchanged.
     """
 
-    def __init__(self, config: AppConfig, logger) -> None:
-        self._config = config
-        self._logger = logger
-
+    @classmethod
+    def availability(cls, config: AppConfig) -> Optional[str]:
         if not (config.chandra_api_url and config.chandra_api_key):
-            raise RuntimeError(
+            return (
                 "ChandraAPIOCREngine not configured.\n"
                 "Missing PAKU_CHANDRA_API_URL or PAKU_CHANDRA_API_KEY in .env.\n"
                 "Example:\n"
                 "    PAKU_CHANDRA_API_URL=http://localhost:8000/v1/\n"
                 "    PAKU_CHANDRA_API_KEY=yourkey\n"
             )
+        if importlib.util.find_spec("httpx") is None:
+            return (
+                "httpx is not installed. "
+                "Install it via the 'ocr' extra or requirements-ocr.txt "
+                "e.g. `pip install -e .[ocr]`."
+            )
+        return None
+
+    def __init__(self, config: AppConfig, logger) -> None:
+        self._config = config
+        self._logger = logger
 
-        # When configured:
-        # self._endpoint = config.chandra_api_url.rstrip("/")
-        # self._api_key = config.chandra_api_key
+        reason = self.availability(config)
+        if reason is not None:
+            raise RuntimeError(reason)
+
+        # availability() has checked that the URL is set.
+        self._endpoint = (config.chandra_api_url or "").rstrip("/")
+        self._api_key = config.chandra_api_key
+        self._model = config.chandra_model
+        self._max_inflight = config.chandra_max_inflight
+        self._images_per_request = config.chandra_images_per_request
+
+        # Started lazily on first use, so registering the engine is free.
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Any = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
 
     def name(self) -> str:
         return "chandra-api"
 
     def kind(self) -> str:
         return "heavy"
-    
-    def extract(self, path: Path) -> OcrResult:
-        """
-        Placeholder implementation: raises a clear message.
 
-        Once implemented, this method will:
-        - send the image as base64 or multipart/form-data
-        - receive structured OCR text
-        - create and return OcrResult
-        """
-        raise RuntimeError(
-            "ChandraAPIOCREngine.extract() called but the engine is not implemented yet.\n"
-            "This is a placeholder. When API configuration and server are ready, "
-            "the OCR request logic will be added here."
+    def cache_params(self) -> dict:
+        return {"endpoint": self._endpoint, "model": self._model}
+
+    # ---------- event loop / client lifecycle ----------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever,
+                name="chandra-api-loop",
+                daemon=True,
+            )
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    async def _open(self) -> None:
+        import httpx  # type: ignore[import]
+
+        self._client = httpx.AsyncClient(
+            base_url=self._endpoint,
+            headers={"Authorization": f"Bearer {self._api_key}"},
+            timeout=httpx.Timeout(self._config.chandra_timeout),
+            limits=httpx.Limits(
+                max_connections=self._max_inflight,
+                max_keepalive_connections=self._max_inflight,
+            ),
         )
+        self._semaphore = asyncio.Semaphore(self._max_inflight)
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def close(self) -> None:
+        """Close pooled connections and stop the engine's event loop."""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join()
+        loop.close()
+
+    # ---------- async API ----------
+
+    async def aextract(self, path: Path) -> OcrResult:
+        """Awaitable OCR of a single image, usable from any event loop."""
+        return await asyncio.wrap_future(self._submit(self._extract_one(path)))
+
+    async def aextract_batch(self, paths: Sequence[Path]) -> List[OcrResult]:
+        """
+        Awaitable batched OCR. Images are packed up to
+        PAKU_CHANDRA_IMAGES_PER_REQUEST per request and the requests run
+        concurrently, bounded by the in-flight limit.
+        """
+        return await asyncio.wrap_future(self._submit(self._extract_many(list(paths))))
+
+    async def _extract_one(self, path: Path) -> OcrResult:
+        return (await self._extract_group([path]))[0]
+
+    async def _extract_many(self, paths: List[Path]) -> List[OcrResult]:
+        size = max(1, self._images_per_request)
+        groups = [paths[i : i + size] for i in range(0, len(paths), size)]
+        results = await asyncio.gather(*(self._extract_group(g) for g in groups))
+        return [r for group in results for r in group]
+
+    async def _extract_group(self, paths: List[Path]) -> List[OcrResult]:
+        texts = await self._complete(paths)
+
+        if len(paths) > 1 and len(texts) != len(paths):
+            # The model did not honour the separator; fall back to one
+            # image per request for this group.
+            self._logger.warning(
+                f"[chandra-api] Expected {len(paths)} transcriptions, got "
+                f"{len(texts)}; retrying images individually"
+            )
+            singles = await asyncio.gather(*(self._complete([p]) for p in paths))
+            texts = [t[0] for t in singles]
+
+        return [
+            OcrResult(
+                engine=self.name(),
+                raw_text=text,
+                blocks=[],
+                language=None,
+                meta={"source": str(path), "model": self._model},
+            )
+            for path, text in zip(paths, texts)
+        ]
+
+    async def _complete(self, paths: List[Path]) -> List[str]:
+        """Send one chat completion carrying `paths` and split the answer."""
+        content: List[dict] = [
+            {
+                "type": "text",
+                "text": OCR_PROMPT if len(paths) == 1 else BATCH_PROMPT.format(count=len(paths)),
+            }
+        ]
+        # Read and encode off the loop thread so file I/O never stalls it.
+        urls = await asyncio.gather(*(asyncio.to_thread(_data_url, p) for p in paths))
+        for url in urls:
+            content.append({"type": "image_url", "image_url": {"url": url}})
+
+        payload = {
+            "model": self._model,
+            "messages": [{"role": "user", "content": content}],
+            "temperature": 0,
+        }
+
+        assert self._client is not None and self._semaphore is not None
+        async with self._semaphore:
+            self._logger.info(
+                "[chandra-api] OCR on %d image(s) starting at %s", len(paths), paths[0],
+                extra={"path": paths[0], "engine": "chandra-api", "images": len(paths)},
+            )
+            response = await self._client.post("/chat/completions", json=payload)
+
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"[chandra-api] Request failed with HTTP {response.status_code}: "
+                f"{response.text[:200]}"
+            )
+
+        data = response.json()
+        try:
+            text = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as exc:
+            raise RuntimeError(f"[chandra-api] Unexpected response shape: {data!r}") from exc
+
+        if len(paths) == 1:
+            return [text.strip()]
+        return [part.strip() for part in text.split(IMAGE_SEPARATOR)]
+
+    # ---------- sync wrappers ----------
+
+    def extract(self, path: Path) -> OcrResult:
+        return self._submit(self._extract_one(path)).result()
+
+    def extract_batch(self, paths: Sequence[Path]) -> List[OcrResult]:
+        return self._submit(self._extract_many(list(paths))).result()
+
+
+def _data_url(path: Path) -> str:
+    mime = mimetypes.guess_type(path.name)[0] or "image/png"
+    encoded = base64.b64encode(path.read_bytes()).decode("ascii")
+    return f"data:{mime};base64,{encoded}"
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class EngineHealth:
+    """
+    Live statistics and circuit breaker for one engine.
+
+    Tracks an exponentially weighted moving average (EWMA) of latency and
+    of the failure rate, the number of calls currently in flight and the
+    breaker state:
+
+    - closed    : calls flow normally
+    - open      : `failure_threshold` consecutive failures; calls are
+                  refused until `cooldown_s` has passed
+    - half_open : after the cooldown a single probe call is let through;
+                  success closes the breaker, failure re-opens it
+
+    All methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        cooldown_s: float = 30.0,
+        alpha: float = 0.2,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._cooldown_s = cooldown_s
+        self._alpha = alpha
+        self._lock = threading.Lock()
+
+        self.ewma_latency_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.inflight = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None  # wall clock, survives reloads
+        self.last_call_at: Optional[float] = None
+        self._probing = False
+
+    # ---------- breaker ----------
+
+    def _current_state(self, now: float) -> str:
+        if self.state == OPEN and self.opened_at is not None:
+            if now - self.opened_at >= self._cooldown_s:
+                return HALF_OPEN
+        return self.state
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """Whether a call could be admitted right now (no side effects)."""
+        with self._lock:
+            state = self._current_state(time.time() if now is None else now)
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def acquire(self) -> bool:
+        """
+        Admit a call: counts it as in flight and, when half-open, claims the
+        single probe slot. Returns False if the breaker refuses the call.
+        """
+        with self._lock:
+            state = self._current_state(time.time())
+            if state == OPEN:
+                return False
+            if state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+                self.state = HALF_OPEN
+            self.inflight += 1
+            self.last_call_at = time.time()
+            return True
+
+    def release(self, ok: bool, latency_ms: float) -> None:
+        """Record the outcome of a call admitted by `acquire`."""
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+            self.calls += 1
+            a = self._alpha
+            if self.ewma_latency_ms is None:
+                self.ewma_latency_ms = latency_ms
+            else:
+                self.ewma_latency_ms += a * (latency_ms - self.ewma_latency_ms)
+            self.error_rate += a * ((0.0 if ok else 1.0) - self.error_rate)
+
+            was_probe = self._probing
+            self._probing = False
+            if ok:
+                self.consecutive_failures = 0
+                self.state = CLOSED
+                self.opened_at = None
+                return
+
+            self.errors += 1
+            self.consecutive_failures += 1
+            if was_probe or self.consecutive_failures >= self._failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def cancel(self) -> None:
+        """
+        Release a call admitted by `acquire` without recording an outcome
+        (the input was at fault, not the engine). A probe slot is freed.
+        """
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+            self._probing = False
+
+    # ---------- ranking ----------
+
+    def degraded(self, latency_budget_ms: float, now: Optional[float] = None) -> bool:
+        """
+        Whether the engine is currently failing often or slower than the
+        budget (0 = no budget). An engine that has not been called for a
+        cooldown period is not considered degraded, so it gets re-sampled
+        instead of being starved forever on stale numbers.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.last_call_at is None or now - self.last_call_at >= self._cooldown_s:
+                return False
+            if self.error_rate >= 0.5:
+                return True
+            return bool(
+                latency_budget_ms
+                and self.ewma_latency_ms is not None
+                and self.ewma_latency_ms > latency_budget_ms
+            )
+
+    def load_score(self) -> float:
+        """
+        Expected cost of one more call: EWMA latency scaled by the calls
+        already in flight and inflated by the failure rate. Engines without
+        samples score 0 so they get tried.
+        """
+        with self._lock:
+            latency = self.ewma_latency_ms or 0.0
+            return latency * (self.inflight + 1) / max(1e-3, 1.0 - self.error_rate)
+
+    def merge(self, data: dict) -> None:
+        """
+        Fold in a snapshot taken elsewhere (another process's router, or
+        the persisted file) whose `calls` / `errors` are counted since its
+        last report. Counters add up, the averages move towards the other's
+        as if its calls had been made here, and the breaker follows
+        whichever side saw the more recent call.
+        """
+        calls = int(data.get("calls", 0))
+        with self._lock:
+            self.calls += calls
+            self.errors += int(data.get("errors", 0))
+            weight = 1.0 - (1.0 - self._alpha) ** calls
+            latency = data.get("ewma_latency_ms")
+            if latency is not None:
+                if self.ewma_latency_ms is None:
+                    self.ewma_latency_ms = latency
+                else:
+                    self.ewma_latency_ms += weight * (latency - self.ewma_latency_ms)
+            self.error_rate += weight * (float(data.get("error_rate", 0.0)) - self.error_rate)
+
+            last = data.get("last_call_at")
+            if last is not None and (self.last_call_at is None or last >= self.last_call_at):
+                self.last_call_at = last
+                self.consecutive_failures = int(data.get("consecutive_failures", 0))
+                self.opened_at = data.get("opened_at")
+                self.state = OPEN if self.opened_at is not None else CLOSED
+
+    # ---------- persistence ----------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ewma_latency_ms": self.ewma_latency_ms,
+                "error_rate": self.error_rate,
+                "inflight": self.inflight,
+                "calls": self.calls,
+                "errors": self.errors,
+                "consecutive_failures": self.consecutive_failures,
+                "state": self._current_state(time.time()),
+                "opened_at": self.opened_at,
+                "last_call_at": self.last_call_at,
+            }
+
+    def restore(self, data: dict) -> None:
+        with self._lock:
+            self.ewma_latency_ms = data.get("ewma_latency_ms")
+            self.error_rate = float(data.get("error_rate", 0.0))
+            self.calls = int(data.get("calls", 0))
+            self.errors = int(data.get("errors", 0))
+            self.consecutive_failures = int(data.get("consecutive_failures", 0))
+            self.opened_at = data.get("opened_at")
+            self.last_call_at = data.get("last_call_at")
+            # A probe in flight when the stats were saved never finished.
+            self.state = OPEN if self.opened_at is not None else CLOSED
+
+
+def load_health(path: Path) -> Dict[str, dict]:
+    """Persisted per-engine stats, or {} if missing or unreadable."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    engines = data.get("engines") if isinstance(data, dict) else None
+    return engines if isinstance(engines, dict) else {}
+
+
+def save_health(path: Path, engines: Dict[str, dict]) -> None:
+    """Write per-engine stats atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(
+        json.dumps({"updated": time.time(), "engines": engines}, indent=2),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
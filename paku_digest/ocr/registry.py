@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+from ..config import AppConfig
+from ..metrics import span
+from .base import OCREngine
+
+# Entry point group third-party packages use to contribute OCR engines:
+#
+#     [project.entry-points."paku_digest.ocr_engines"]
+#     my-engine = "my_package.engine:SPEC"
+#
+# where SPEC is an EngineSpec. Loading the entry point should be cheap:
+# keep heavy imports inside the engine constructor.
+ENTRY_POINT_GROUP = "paku_digest.ocr_engines"
+
+
+@dataclass(frozen=True)
+class EngineSpec:
+    """
+    Static description of an OCR engine, known without constructing it.
+
+    - name     : engine name, as returned by `OCREngine.name()`
+    - kind     : 'light' | 'heavy', as returned by `OCREngine.kind()`
+    - factory  : callable `(config, logger) -> OCREngine`, usually the class
+    - probe    : cheap availability check returning None or a reason string
+                 (defaults to `factory.availability` when present)
+    """
+
+    name: str
+    kind: str
+    factory: Callable[[AppConfig, object], OCREngine]
+    probe: Optional[Callable[[AppConfig], Optional[str]]] = None
+    source: str = "builtin"
+
+    def unavailable_reason(self, config: AppConfig) -> Optional[str]:
+        probe = self.probe or getattr(self.factory, "availability", None)
+        if probe is None:
+            return None
+        return probe(config)
+
+    @property
+    def type_name(self) -> str:
+        return getattr(self.factory, "__name__", type(self.factory).__name__)
+
+
+def builtin_specs() -> List[EngineSpec]:
+    from .chandra_api import ChandraAPIOCREngine
+    from .paddle import PaddleOCREngine
+    from .stub import StubOCREngine
+
+    return [
+        EngineSpec(name="stub", kind="light", factory=StubOCREngine),
+        EngineSpec(name="paddle", kind="heavy", factory=PaddleOCREngine),
+        EngineSpec(name="chandra-api", kind="heavy", factory=ChandraAPIOCREngine),
+    ]
+
+
+def plugin_specs(logger) -> List[EngineSpec]:
+    """Load EngineSpecs advertised through the `paku_digest.ocr_engines` group."""
+    specs: List[EngineSpec] = []
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            spec = ep.load()
+            if callable(spec) and not isinstance(spec, EngineSpec):
+                spec = spec()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[registry] Failed to load OCR engine plugin {ep.value!r}: {exc}")
+            continue
+        if not isinstance(spec, EngineSpec):
+            logger.warning(
+                f"[registry] Plugin {ep.value!r} did not provide an EngineSpec; skipping."
+            )
+            continue
+        specs.append(
+            EngineSpec(
+                name=spec.name,
+                kind=spec.kind,
+                factory=spec.factory,
+                probe=spec.probe,
+                source=f"plugin:{ep.value}",
+            )
+        )
+    return specs
+
+
+class EngineRegistry(Mapping[str, OCREngine]):
+    """
+    Lazy OCR engine registry.
+
+    Engines are registered as EngineSpecs; listing names, kinds or
+    availability only runs the cheap probes. An engine is constructed the
+    first time it is looked up (`registry[name]`), once, and then reused.
+    Engines whose constructor fails are remembered as unavailable.
+    """
+
+    def __init__(self, config: AppConfig, logger, specs: List[EngineSpec]) -> None:
+        self._config = config
+        self._logger = logger
+        self._specs: Dict[str, EngineSpec] = {}
+        self._unavailable: Dict[str, str] = {}
+        self._engines: Dict[str, OCREngine] = {}
+        self._lock = threading.Lock()
+
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: EngineSpec) -> None:
+        if spec.name in self._specs:
+            self._logger.warning(
+                f"[registry] OCR engine {spec.name!r} from {spec.source} ignored: "
+                f"already registered by {self._specs[spec.name].source}."
+            )
+            return
+        self._specs[spec.name] = spec
+        reason = spec.unavailable_reason(self._config)
+        if reason is not None:
+            self._unavailable[spec.name] = reason
+
+    # ---------- metadata (never constructs engines) ----------
+
+    def specs(self) -> List[EngineSpec]:
+        return list(self._specs.values())
+
+    def spec(self, name: str) -> EngineSpec:
+        return self._specs[name]
+
+    def kind_of(self, name: str) -> str:
+        return self._specs[name].kind
+
+    def unavailable(self) -> Dict[str, str]:
+        """Registered engines that cannot be used, with the reason."""
+        return dict(self._unavailable)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._engines
+
+    def loaded(self) -> Dict[str, OCREngine]:
+        """Engines constructed so far."""
+        return dict(self._engines)
+
+    # ---------- Mapping interface ----------
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self._specs if name not in self._unavailable)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs and name not in self._unavailable
+
+    def __getitem__(self, name: str) -> OCREngine:
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        if name not in self:
+            raise KeyError(name)
+
+        with self._lock:
+            engine = self._engines.get(name)
+            if engine is not None:
+                return engine
+
+            spec = self._specs[name]
+            try:
+                with span("engine_init", engine=name):
+                    engine = spec.factory(self._config, self._logger)
+            except RuntimeError as e:
+                self._logger.info(f"[registry] {spec.type_name} not available: {e}")
+                self._unavailable[name] = str(e)
+                raise KeyError(name) from e
+
+            self._engines[name] = engine
+            return engine
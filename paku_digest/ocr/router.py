@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar, Union
 
-from .base import OCREngine
+from .base import InputError, OCREngine, PartialBatchError
+from .cascade import CascadePolicy, annotate
+from .health import EngineHealth, load_health, save_health
+from ..cache import cached_extract, cached_extract_batch
+from ..models import OcrResult
+
+T = TypeVar("T")
+
+STRATEGIES = ("light", "heavy", "auto", "cascade")
 
 
 @dataclass
@@ -15,58 +26,385 @@ class EngineRouter:
     - 'light'  → prefer light engines
     - 'heavy'  → prefer heavy engines
     - 'auto'   → prefer heavy if healthy, fallback to light
+    - 'cascade'→ per image, run a light engine first and escalate to a
+                 heavy one only when `cascade` (a CascadePolicy) says the
+                 light result is not good enough
+
+    `engines` may be a plain dict or a lazy EngineRegistry; with a registry
+    kinds come from the engine specs, so only the selected engine is built.
+
+    The router keeps live per-engine statistics (`EngineHealth`: EWMA
+    latency, error rate, in-flight calls and a circuit breaker). `route()`
+    returns an engine that picks per call: engines whose breaker is open are
+    skipped, degraded ones (failing or over `latency_budget_ms`) rank after
+    healthy ones, then the strategy's preferred kind wins, then the lowest
+    expected load. A failed call fails over to the next candidate.
     """
 
-    engines: Dict[str, OCREngine]
+    engines: Mapping[str, OCREngine]
+    failure_threshold: int = 5
+    cooldown_s: float = 30.0
+    latency_budget_ms: float = 0.0
+    stats_path: Optional[Path] = None
+    cascade: CascadePolicy = field(default_factory=CascadePolicy)
+    health: Dict[str, EngineHealth] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._health_lock = threading.Lock()
+        # (calls, errors) per engine already reported by take_stats / written
+        # by save_stats, so each only passes on what is new.
+        self._taken: Dict[str, Tuple[int, int]] = {}
+        self._saved: Dict[str, Tuple[int, int]] = {}
+        if self.stats_path is not None:
+            for name, data in load_health(self.stats_path).items():
+                h = self.health_of(name)
+                h.restore(data)
+                self._taken[name] = self._saved[name] = (h.calls, h.errors)
+
+    def _kind_of(self, name: str) -> str:
+        kind_of = getattr(self.engines, "kind_of", None)
+        if kind_of is not None:
+            return kind_of(name)
+        return self.engines[name].kind()
+
+    def health_of(self, name: str) -> EngineHealth:
+        with self._health_lock:
+            h = self.health.get(name)
+            if h is None:
+                h = self.health[name] = self._new_health()
+            return h
+
+    def _new_health(self) -> EngineHealth:
+        return EngineHealth(failure_threshold=self.failure_threshold, cooldown_s=self.cooldown_s)
 
-    def _select_by_kind(self, kind: str) -> OCREngine | None:
+    def _build(self, name: str) -> OCREngine | None:
+        try:
+            engine = self.engines[name]
+        except KeyError:
+            # Failed to construct; the registry now reports it unavailable.
+            return None
+        return engine if engine.is_healthy() else None
+
+    def candidates(self, strategy: str, kind: Optional[str] = None) -> List[str]:
         """
-        Return the first healthy engine of the given kind, or None.
-        kind: 'light' | 'heavy'
+        Engine names admissible for `strategy`, best first, optionally only
+        those of `kind`. Engines whose breaker is open are left out.
         """
-        candidates = [
-            e
-            for e in self.engines.values()
-            if e.kind() == kind and e.is_healthy()
-        ]
-        if not candidates:
-            return None
-        return candidates[0]
+        strategy = strategy.lower()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy!r}")
+        preferred = "light" if strategy == "light" else "heavy"
+
+        ranked = []
+        for name in list(self.engines):
+            if kind is not None and self._kind_of(name) != kind:
+                continue
+            h = self.health_of(name)
+            if not h.available():
+                continue
+            ranked.append(
+                (
+                    h.degraded(self.latency_budget_ms),
+                    self._kind_of(name) != preferred,
+                    h.load_score(),
+                    name,
+                )
+            )
+        ranked.sort(key=lambda r: r[:3])
+        return [r[3] for r in ranked]
 
     def select(self, strategy: str) -> OCREngine:
         """
-        Select an engine based on a routing strategy:
+        Select a single engine based on a routing strategy (the current best
+        choice; use `route` to re-decide per call):
         - 'light'
         - 'heavy'
         - 'auto'
+        - 'cascade' (best heavy engine; use `route` to cascade per image)
         """
         strategy = strategy.lower()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy!r}")
 
-        if strategy == "light":
-            engine = self._select_by_kind("light")
-            if engine is not None:
-                return engine
-            engine = self._select_by_kind("heavy")
+        for name in self.candidates(strategy):
+            engine = self._build(name)
             if engine is not None:
                 return engine
-            raise RuntimeError("No OCR engines available for strategy 'light'.")
+        raise RuntimeError(f"No OCR engines available for strategy {strategy!r}.")
 
-        if strategy == "heavy":
-            engine = self._select_by_kind("heavy")
-            if engine is not None:
-                return engine
-            engine = self._select_by_kind("light")
-            if engine is not None:
-                return engine
-            raise RuntimeError("No OCR engines available for strategy 'heavy'.")
-
-        if strategy == "auto":
-            heavy = self._select_by_kind("heavy")
-            if heavy is not None:
-                return heavy
-            light = self._select_by_kind("light")
-            if light is not None:
-                return light
-            raise RuntimeError("No OCR engines available for strategy 'auto'.")
-
-        raise ValueError(f"Unknown routing strategy: {strategy!r}")
+    def warm_up(self, strategy: str) -> List[str]:
+        """
+        Build every engine `strategy` may route to, so model start-up
+        happens now rather than on the first call. Returns the names of the
+        engines that loaded; RuntimeError if none did.
+        """
+        loaded = [name for name in self.candidates(strategy) if self._build(name) is not None]
+        if not loaded:
+            raise RuntimeError(f"No OCR engines available for strategy {strategy!r}.")
+        return loaded
+
+    def route(self, strategy: str, cache=None, preprocessor=None) -> "RoutedEngine":
+        """An engine that re-selects per call using the live statistics."""
+        strategy = strategy.lower()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy!r}")
+        return RoutedEngine(self, strategy, cache, preprocessor)
+
+    def call(
+        self,
+        strategy: str,
+        fn: Callable[[OCREngine], T],
+        kind: Optional[str] = None,
+    ) -> T:
+        """
+        Run `fn(engine)` on the best admissible engine (of `kind`, if
+        given), recording latency and outcome; on failure, fail over to the
+        next candidate. An `InputError` (bad file) is raised straight away:
+        no other engine would do better, and no engine is charged for it.
+        """
+        last_error: Optional[Exception] = None
+        for name in self.candidates(strategy, kind):
+            engine = self._build(name)
+            if engine is None:
+                continue
+            h = self.health_of(name)
+            if not h.acquire():
+                continue
+            start = perf_counter()
+            try:
+                result = fn(engine)
+            except InputError:
+                h.cancel()
+                raise
+            except Exception as exc:  # noqa: BLE001
+                h.release(False, (perf_counter() - start) * 1000.0)
+                last_error = exc
+                continue
+            h.release(True, (perf_counter() - start) * 1000.0)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        what = f"{kind} engines" if kind else "OCR engines"
+        raise RuntimeError(f"No {what} available for strategy {strategy!r}.")
+
+    # ---------- stats ----------
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-engine statistics snapshot, keyed by engine name."""
+        with self._health_lock:
+            items = list(self.health.items())
+        return {name: h.snapshot() for name, h in items}
+
+    def _since(self, marks: Dict[str, Tuple[int, int]]) -> Dict[str, dict]:
+        """Snapshots with `calls` / `errors` counted since `marks`, which advance."""
+        out: Dict[str, dict] = {}
+        for name, snap in self.stats().items():
+            calls, errors = marks.get(name, (0, 0))
+            if snap["calls"] == calls and not snap["opened_at"]:
+                continue
+            marks[name] = (snap["calls"], snap["errors"])
+            out[name] = {**snap, "calls": snap["calls"] - calls, "errors": snap["errors"] - errors}
+        return out
+
+    def take_stats(self) -> Dict[str, dict]:
+        """
+        What this router learned since the last call, for `merge_stats` in
+        another process (e.g. the parent of a process pool).
+        """
+        return self._since(self._taken)
+
+    def merge_stats(self, stats: Dict[str, dict]) -> None:
+        """Fold in another router's `take_stats()`."""
+        for name, data in stats.items():
+            self.health_of(name).merge(data)
+
+    def save_stats(self) -> None:
+        """
+        Persist statistics so later runs (and `engines`) can see them. What
+        this router learned since loading (or its last save) is merged into
+        the file as it is now, so concurrent runs add up instead of
+        overwriting each other.
+        """
+        if self.stats_path is None:
+            return
+        new = self._since(self._saved)
+        if not new:
+            return
+        merged: Dict[str, EngineHealth] = {}
+        for name, data in load_health(self.stats_path).items():
+            merged[name] = self._new_health()
+            merged[name].restore(data)
+        for name, data in new.items():
+            merged.setdefault(name, self._new_health()).merge(data)
+        save_health(self.stats_path, {n: h.snapshot() for n, h in merged.items()})
+
+
+class RoutedEngine(OCREngine):
+    """
+    Proxy engine that asks the router for the best engine on every call.
+
+    Results are cached per concrete engine (the proxy itself is not
+    cacheable, since different calls may be served by different engines).
+    With the 'cascade' strategy every result records in meta["cascade"]
+    which engine produced it and whether (and why) it was escalated.
+
+    A `preprocessor` is applied per concrete engine; its decoded-image cache
+    lets an escalation or failover reuse the pixels of the first attempt.
+    """
+
+    def __init__(
+        self,
+        router: EngineRouter,
+        strategy: str,
+        cache=None,
+        preprocessor=None,
+    ) -> None:
+        self._router = router
+        self._strategy = strategy
+        self._cache = cache
+        self._preprocessor = preprocessor
+
+    def name(self) -> str:
+        return self._strategy
+
+    def kind(self) -> str:
+        return "light" if self._strategy == "light" else "heavy"
+
+    def cacheable(self) -> bool:
+        return False
+
+    def warm_up(self) -> List[str]:
+        """Build the engines this strategy may use; see `EngineRouter.warm_up`."""
+        return self._router.warm_up(self._strategy)
+
+    def extract(self, path: Path) -> OcrResult:
+        if self._strategy == "cascade":
+            outcome = self._cascade([path])[0]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return self._router.call(
+            self._strategy,
+            lambda engine: cached_extract(engine, path, self._cache, self._preprocessor),
+        )
+
+    def extract_batch(self, paths: Sequence[Path]) -> List[OcrResult]:
+        if self._strategy == "cascade":
+            outcomes = self._cascade(list(paths))
+            results = [o for o in outcomes if isinstance(o, OcrResult)]
+            if len(results) != len(outcomes):
+                raise PartialBatchError(outcomes)
+            return results
+        return self._router.call(
+            self._strategy,
+            lambda engine: cached_extract_batch(
+                engine, list(paths), self._cache, self._preprocessor
+            ),
+        )
+
+    def _run(self, kind: str, paths: List[Path]) -> List[OcrResult]:
+        return self._router.call(
+            "cascade",
+            lambda engine: cached_extract_batch(
+                engine, paths, self._cache, self._preprocessor
+            ),
+            kind=kind,
+        )
+
+    def _attempt(self, kind: str, paths: List[Path]) -> List[Union[OcrResult, Exception]]:
+        """
+        One batched call to an engine of `kind`. If it fails, the images are
+        retried one at a time, so a single bad image only fails itself; its
+        slot then holds the exception. Input errors are raised as is.
+        """
+        try:
+            return list(self._run(kind, paths))
+        except InputError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            if len(paths) == 1:
+                return [exc]
+
+        outcomes: List[Union[OcrResult, Exception]] = []
+        for path in paths:
+            try:
+                outcomes.append(self._run(kind, [path])[0])
+            except InputError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                outcomes.append(exc)
+        return outcomes
+
+    def _cascade(self, paths: List[Path]) -> List[Union[OcrResult, Exception]]:
+        """
+        Light engine first, heavy engine for what it was unsure of or failed
+        on. An image neither engine could handle holds the heavy engine's
+        exception in its slot, like `_attempt`.
+        """
+        policy = self._router.cascade
+
+        light = self._attempt("light", paths)
+        results: List[Union[OcrResult, Exception]] = []
+        escalate: List[int] = []
+        reasons: dict = {}
+        for i, r in enumerate(light):
+            if isinstance(r, Exception):
+                reason: Optional[str] = "light_failed"
+            else:
+                reason = policy.escalation_reason(r)
+                if reason is None:
+                    info = {
+                        "engine": r.engine,
+                        "escalated": False,
+                        "confidence": policy.confidence(r),
+                    }
+                    results.append(annotate(r, info))
+                    continue
+            escalate.append(i)
+            reasons[i] = reason
+            results.append(r)  # replaced below
+
+        if not escalate:
+            return results
+
+        heavy = self._attempt("heavy", [paths[i] for i in escalate])
+        for i, h in zip(escalate, heavy):
+            lr = light[i]
+            if isinstance(h, Exception):
+                if isinstance(lr, Exception):
+                    # Neither engine could handle this image.
+                    results[i] = h
+                    continue
+                # Keep the light result rather than losing the image.
+                results[i] = annotate(
+                    lr,
+                    {
+                        "engine": lr.engine,
+                        "escalated": False,
+                        "reason": reasons[i],
+                        "heavy_error": str(h),
+                    },
+                )
+            elif isinstance(lr, Exception):
+                results[i] = annotate(
+                    h,
+                    {
+                        "engine": h.engine,
+                        "escalated": True,
+                        "reason": reasons[i],
+                        "light_error": str(lr),
+                    },
+                )
+            else:
+                results[i] = annotate(
+                    h,
+                    {
+                        "engine": h.engine,
+                        "escalated": True,
+                        "reason": reasons[i],
+                        "light_engine": lr.engine,
+                        "light_confidence": policy.confidence(lr),
+                    },
+                )
+        return results
@@ -17,8 +17,12 @@ class StubOCREngine(OCREngine):
     def name(self) -> str:
         return "stub"
 
+    def cacheable(self) -> bool:
+        # Output is derived from the file name, not its contents.
+        return False
+
     def extract(self, path: Path) -> OcrResult:
-        self._logger.info(f"[stub] OCR on {path}")
+        self._logger.info("[stub] OCR on %s", path, extra={"path": path, "engine": "stub"})
         return OcrResult(
             engine=self.name(),
             raw_text=f"[stub text for {path.name}]",
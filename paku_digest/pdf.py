@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, FrozenSet, Iterator, Optional, Tuple
+
+from .metrics import span
+
+PDF_EXTENSIONS: FrozenSet[str] = frozenset({".pdf"})
+
+# PDFium is not thread-safe, even across documents: every call into it goes
+# through this lock. Rendering therefore runs one page at a time per
+# process (use `--executor process` to render in parallel), while OCR of
+# already rendered pages proceeds in parallel.
+_PDFIUM_LOCK = threading.Lock()
+
+# Open documents, so the pages of one PDF do not each re-parse it. Keyed by
+# path, size and mtime (a rewritten file is opened afresh); only touched
+# under _PDFIUM_LOCK. Handles inherited across a fork are not reused.
+_OPEN_DOCS = 4
+_docs: "OrderedDict[Tuple[str, int, int], Any]" = OrderedDict()
+_docs_pid = os.getpid()
+
+
+def is_pdf(path: Path) -> bool:
+    return path.suffix.lower() in PDF_EXTENSIONS
+
+
+def pdf_unavailable() -> Optional[str]:
+    """None if PDFs can be rasterized, otherwise the reason why not."""
+    for module in ("pypdfium2", "PIL"):
+        if importlib.util.find_spec(module) is None:
+            return (
+                "PDF support needs pypdfium2 and Pillow. "
+                "Install them via the 'pdf' extra, e.g. `pip install -e .[pdf]`."
+            )
+    return None
+
+
+@dataclass(frozen=True)
+class PageRef:
+    """
+    One page of a PDF, to be rasterized when its task runs.
+
+    Cheap to create and to pickle, so a large PDF can be fanned out into
+    page tasks without rendering anything up front.
+    """
+
+    path: Path
+    index: int  # 0-based
+    count: int  # pages in the document
+    dpi: int
+
+    @property
+    def number(self) -> int:
+        return self.index + 1
+
+    @property
+    def label(self) -> str:
+        """Stable identifier used as the page's source in OcrResult.meta."""
+        return f"{self.path}#page={self.number}"
+
+
+def _document(path: Path) -> Any:
+    """The open PdfDocument for `path`; call with _PDFIUM_LOCK held."""
+    global _docs_pid
+    import pypdfium2 as pdfium  # type: ignore[import]
+
+    if _docs_pid != os.getpid():
+        _docs.clear()
+        _docs_pid = os.getpid()
+
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    pdf = _docs.get(key)
+    if pdf is not None:
+        _docs.move_to_end(key)
+        return pdf
+
+    pdf = pdfium.PdfDocument(str(path))
+    _docs[key] = pdf
+    while len(_docs) > _OPEN_DOCS:
+        _, old = _docs.popitem(last=False)
+        old.close()
+    return pdf
+
+
+def close_documents() -> None:
+    """Close every cached PdfDocument of this process."""
+    with _PDFIUM_LOCK:
+        if _docs_pid == os.getpid():
+            for pdf in _docs.values():
+                pdf.close()
+        _docs.clear()
+
+
+def page_count(path: Path) -> int:
+    """Number of pages, read from the document structure (nothing is rendered)."""
+    with _PDFIUM_LOCK:
+        return len(_document(path))
+
+
+def render_page(ref: PageRef, out: Path) -> None:
+    """Rasterize `ref` at its DPI and write it to `out` as PNG."""
+    with span("render", page=ref.number):
+        with _PDFIUM_LOCK:
+            page = _document(ref.path)[ref.index]
+            try:
+                bitmap = page.render(scale=ref.dpi / 72)
+                image = bitmap.to_pil()
+            finally:
+                page.close()
+
+        # Encoding happens outside the lock; Pillow does not touch PDFium.
+        image.save(out, format="PNG")
+
+
+@contextmanager
+def rendered_page(ref: PageRef, tmp_root: Path) -> Iterator[Path]:
+    """
+    Render `ref` to a temporary PNG under `tmp_root` for the duration of the
+    block, so every engine (and the result cache) can treat it as an image
+    file. The file is named after the PDF and page number.
+    """
+    tmp_root.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=tmp_root) as tmp:
+        out = Path(tmp) / f"{ref.path.stem}.page{ref.number}.png"
+        render_page(ref, out)
+        yield out
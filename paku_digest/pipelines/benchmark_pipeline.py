@@ -1,15 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import os
+import platform
+import statistics
+import sys
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
 from time import perf_counter
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
+from ..cache import OcrResultCache, cached_extract
 from ..context import AppContext
+from ..discovery import IMAGE_EXTENSIONS, DiscoveryOptions
 from ..ocr.base import OCREngine
 from .digest_pipeline import discover_images
 
 
+BENCHMARK_SCHEMA = "paku-digest/benchmark"
+# Bump when a field is renamed, removed or changes meaning; adding fields
+# is backwards compatible and keeps the version.
+BENCHMARK_SCHEMA_VERSION = 1
+
+
 @dataclass
 class EngineRunStats:
     name: str
@@ -19,48 +33,160 @@ class EngineRunStats:
     avg_ms: float
     ok_count: int
     error_count: int
+    cache_hits: int = 0
+    cache_misses: int = 0
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    throughput_ips: float = 0.0
+    peak_rss_bytes: Optional[int] = None
+    peak_rss_scope: Optional[str] = None
+    rss_baseline_bytes: Optional[int] = None
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "min": ordered[0] if ordered else 0.0,
+        "max": ordered[-1] if ordered else 0.0,
+        "mean": statistics.fmean(ordered) if ordered else 0.0,
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+    }
+
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset the kernel's peak-RSS high-water mark (Linux only) to the current
+    RSS, so the next reading covers a single engine's load and run on top
+    of what is already resident. Returns False when unsupported.
+    """
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_bytes(field_name: str) -> Optional[int]:
+    try:
+        for line in _PROC_STATUS.read_text().splitlines():
+            if line.startswith(field_name + ":"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, in bytes, if known."""
+    peak = _proc_status_bytes("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _warm_up(engine: OCREngine, paths: List[Path], warmup: int, log) -> None:
+    """Untimed calls so lazy model loading and JIT/caches don't skew timings."""
+    for i in range(warmup):
+        p = paths[i % len(paths)]
+        try:
+            engine.extract(p)
+        except Exception as exc:  # noqa: BLE001
+            log.warning(f"[benchmark] Warm-up of '{engine.name()}' on {p} failed: {exc}")
 
 
 def _benchmark_one_engine(
-    engine: OCREngine,
+    build: Callable[[], OCREngine],
     paths: List[Path],
     log,
+    cache: Optional[OcrResultCache] = None,
+    warmup: int = 1,
+    repeat: int = 1,
 ) -> EngineRunStats:
+    """
+    Build the engine with `build()` and time it. The engine is built after
+    the peak-RSS reset, so an "engine"-scoped peak includes its model load;
+    `rss_baseline_bytes` is what was resident before (earlier engines stay
+    loaded).
+    """
     runs: List[dict] = []
+    latencies: List[float] = []
     total_ms = 0.0
     ok_count = 0
     error_count = 0
 
-    for p in paths:
-        log.info(f"[benchmark] Engine '{engine.name()}' on {p}")
-        start = perf_counter()
-        error: Optional[str] = None
-        ok = True
+    rss_scope = "engine" if _reset_peak_rss() else "process"
+    rss_baseline = _proc_status_bytes("VmRSS") if rss_scope == "engine" else None
+    engine = build()
+    _warm_up(engine, paths, warmup, log)
 
-        try:
-            engine.extract(p)
-        except Exception as exc:  # noqa: BLE001
-            ok = False
-            error = str(exc)
-            log.error(f"[benchmark] Error with engine '{engine.name()}' on {p}: {exc}")
-        elapsed_ms = (perf_counter() - start) * 1000.0
-
-        total_ms += elapsed_ms
-        if ok:
-            ok_count += 1
-        else:
-            error_count += 1
-
-        runs.append(
-            {
-                "path": str(p),
-                "elapsed_ms": elapsed_ms,
-                "ok": ok,
-                "error": error,
-            }
-        )
+    before = cache.stats() if cache is not None else None
+    wall_start = perf_counter()
+
+    for iteration in range(repeat):
+        for p in paths:
+            log.info(
+                "[benchmark] Engine '%s' on %s", engine.name(), p,
+                extra={"path": p, "engine": engine.name()},
+            )
+            start = perf_counter()
+            error: Optional[str] = None
+            ok = True
+
+            try:
+                cached_extract(engine, p, cache)
+            except Exception as exc:  # noqa: BLE001
+                ok = False
+                error = str(exc)
+                log.error(f"[benchmark] Error with engine '{engine.name()}' on {p}: {exc}")
+            elapsed_ms = (perf_counter() - start) * 1000.0
+
+            total_ms += elapsed_ms
+            if ok:
+                ok_count += 1
+                latencies.append(elapsed_ms)
+            else:
+                error_count += 1
+
+            runs.append(
+                {
+                    "path": str(p),
+                    "repeat": iteration,
+                    "elapsed_ms": elapsed_ms,
+                    "ok": ok,
+                    "error": error,
+                }
+            )
 
-    avg_ms = total_ms / len(paths) if paths else 0.0
+    wall_s = perf_counter() - wall_start
+    avg_ms = total_ms / len(runs) if runs else 0.0
+
+    cache_hits = cache_misses = 0
+    if cache is not None and before is not None:
+        after = cache.stats()
+        cache_hits = after.hits - before.hits
+        cache_misses = after.misses - before.misses
 
     return EngineRunStats(
         name=engine.name(),
@@ -70,67 +196,109 @@ def _benchmark_one_engine(
         avg_ms=avg_ms,
         ok_count=ok_count,
         error_count=error_count,
+        cache_hits=cache_hits,
+        cache_misses=cache_misses,
+        latency_ms=_latency_summary(latencies),
+        throughput_ips=ok_count / wall_s if wall_s > 0 else 0.0,
+        peak_rss_bytes=_peak_rss_bytes(),
+        peak_rss_scope=rss_scope,
+        rss_baseline_bytes=rss_baseline,
     )
 
 
+def _report(input_path: Path, num_images: int, settings: dict, engines: List[dict]) -> dict:
+    return {
+        "schema": BENCHMARK_SCHEMA,
+        "schema_version": BENCHMARK_SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": settings,
+        "input_root": str(input_path),
+        "num_images": num_images,
+        "engines": engines,
+    }
+
+
 def run_benchmark(
     input_path: Path,
     engine_names: Optional[List[str]] = None,
+    use_cache: bool = False,
+    discovery: Optional[DiscoveryOptions] = None,
+    warmup: int = 1,
+    repeat: int = 1,
 ) -> dict:
     """
     Benchmark pipeline:
 
-    - discovers images under input_path
-    - runs each selected engine on all images
-    - records per-image timings and aggregate stats
-    - returns a JSON-serializable dict
+    - discovers images under input_path (filtered by `discovery`; PDFs
+      are left out, as engines time single images)
+    - per selected engine, makes `warmup` untimed calls, then runs it over
+      all images `repeat` times (through the result cache only when
+      `use_cache` is set, so timings measure real inference)
+    - records per-image timings plus latency percentiles, stddev,
+      throughput and peak RSS
+    - returns a JSON-serializable dict following BENCHMARK_SCHEMA /
+      BENCHMARK_SCHEMA_VERSION
     """
+    if warmup < 0:
+        raise ValueError("warmup must be >= 0")
+    if repeat < 1:
+        raise ValueError("repeat must be >= 1")
+
     ctx = AppContext.instance()
     log = ctx.logger
+    settings = {"warmup": warmup, "repeat": repeat, "cache": use_cache}
 
-    paths = discover_images(input_path)
+    discovery = replace(discovery or DiscoveryOptions(), extensions=IMAGE_EXTENSIONS)
+    paths = discover_images(input_path, discovery)
     if not paths:
         log.warning(f"[benchmark] No images found under {input_path}")
-        return {
-            "input_root": str(input_path),
-            "num_images": 0,
-            "engines": [],
-        }
-
-    # Select engines
-    engines: Dict[str, OCREngine] = ctx.list_ocr_engines()
-    if engine_names:
-        # Filter to requested names only
-        engines = {
-            name: eng
-            for name, eng in engines.items()
-            if name in engine_names
-        }
-
-    if not engines:
-        raise RuntimeError(
-            "No OCR engines available for benchmark "
-            f"(requested: {engine_names!r})."
-        )
+        return _report(input_path, 0, settings, [])
+
+    # Select engines; each is only constructed when its turn comes, so its
+    # peak RSS covers its own model load.
+    names = [n for n in ctx.list_ocr_engines() if not engine_names or n in engine_names]
+    cache = ctx.result_cache if use_cache else None
 
     engine_stats: List[dict] = []
-    for name, engine in engines.items():
-        stats = _benchmark_one_engine(engine, paths, log)
+    for name in names:
+        try:
+            stats = _benchmark_one_engine(
+                partial(ctx.get_ocr, name), paths, log, cache, warmup, repeat
+            )
+        except ValueError as exc:
+            log.warning(f"[benchmark] Skipping engine '{name}': {exc}")
+            continue
         engine_stats.append(
             {
                 "name": stats.name,
                 "kind": stats.kind,
                 "total_ms": stats.total_ms,
                 "avg_ms": stats.avg_ms,
+                "latency_ms": stats.latency_ms,
+                "throughput_ips": stats.throughput_ips,
+                "peak_rss_bytes": stats.peak_rss_bytes,
+                "peak_rss_scope": stats.peak_rss_scope,
+                "rss_baseline_bytes": stats.rss_baseline_bytes,
                 "ok_count": stats.ok_count,
                 "error_count": stats.error_count,
+                "cache_hits": stats.cache_hits,
+                "cache_misses": stats.cache_misses,
                 "runs": stats.runs,
             }
         )
 
-    result = {
-        "input_root": str(input_path),
-        "num_images": len(paths),
-        "engines": engine_stats,
-    }
-    return result
+    if not engine_stats:
+        raise RuntimeError(
+            "No OCR engines available for benchmark "
+            f"(requested: {engine_names!r})."
+        )
+
+    if cache is not None:
+        cache.flush_stats()
+
+    return _report(input_path, len(paths), settings, engine_stats)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from difflib import SequenceMatcher
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..similarity import SIMILARITY_METRICS, score_pairs
+from ..store import ResultStore, is_result_store
 
 
 @dataclass
@@ -58,63 +63,142 @@ def _extract_text(doc: Optional[dict]) -> Optional[str]:
     return str(text)
 
 
-def _similarity(a: str, b: str) -> float:
-    if not a and not b:
-        return 1.0
-    if not a or not b:
-        return 0.0
-    return SequenceMatcher(None, a, b).ratio()
+class _JsonSide:
+    """One side of a comparison backed by a digest JSON array."""
 
+    def __init__(self, path: Path) -> None:
+        self._docs = _load_documents(path)
 
-def run_compare(left: Path, right: Path) -> dict:
-    """
-    Compare two digest JSON outputs.
+    def paths(self) -> Iterable[str]:
+        return self._docs.keys()
 
-    For each path in the union of both sides:
-    - extract OCR raw_text
-    - compute exact equality
-    - compute similarity ratio [0, 1]
-    - mark missing on left/right
+    def __contains__(self, path: str) -> bool:
+        return path in self._docs
 
-    Returns a JSON-serializable dict with:
-    - summary (counts, averages)
-    - per_path results
+    def text(self, path: str) -> Optional[str]:
+        return _extract_text(self._docs.get(path))
+
+    def close(self) -> None:
+        pass
+
+
+class _StoreSide:
+    """
+    One side of a comparison backed by a binary result store: paths come
+    from the index and each text is decoded from the mapping only when its
+    path is compared, so no document JSON is parsed.
     """
-    left_docs = _load_documents(left)
-    right_docs = _load_documents(right)
 
-    all_paths = sorted(set(left_docs.keys()) | set(right_docs.keys()))
+    def __init__(self, path: Path) -> None:
+        self._store = ResultStore(path)
+
+    def paths(self) -> Iterable[str]:
+        return self._store.paths()
+
+    def __contains__(self, path: str) -> bool:
+        return self._store.find(path) is not None
+
+    def text(self, path: str) -> Optional[str]:
+        index = self._store.find(path)
+        return None if index is None else self._store.text(index)
+
+    def close(self) -> None:
+        self._store.close()
+
+
+def _open_side(path: Path) -> Union[_JsonSide, _StoreSide]:
+    return _StoreSide(path) if is_result_store(path) else _JsonSide(path)
 
-    results: List[CompareResult] = []
 
-    for p in all_paths:
-        ldoc = left_docs.get(p)
-        rdoc = right_docs.get(p)
+# Pairs per worker task: large enough to amortize pickling the texts,
+# small enough to keep all workers busy when a few pages are very long.
+_CHUNK_SIZE = 64
 
-        ltext = _extract_text(ldoc)
-        rtext = _extract_text(rdoc)
 
-        left_missing = ldoc is None
-        right_missing = rdoc is None
+def _score_all(pairs: List[Tuple[str, str]], metric: str, workers: int) -> List[float]:
+    """Score pairs in order, on a process pool when `workers` > 1."""
+    if workers <= 1 or len(pairs) <= _CHUNK_SIZE:
+        return score_pairs(pairs, metric)
 
-        if ltext is None and rtext is None:
-            sim = 1.0
-            exact = True
-        else:
-            sim = _similarity(ltext or "", rtext or "")
-            exact = (ltext == rtext)
+    chunks = [pairs[i : i + _CHUNK_SIZE] for i in range(0, len(pairs), _CHUNK_SIZE)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as ex:
+        scores: List[float] = []
+        for chunk_scores in ex.map(partial(score_pairs, metric=metric), chunks):
+            scores.extend(chunk_scores)
+    return scores
+
+
+def _collect(
+    left: Union[_JsonSide, _StoreSide], right: Union[_JsonSide, _StoreSide]
+) -> List[CompareResult]:
+    """Texts for every path in the union of both sides, similarity unscored."""
+    results: List[CompareResult] = []
+    for p in sorted(set(left.paths()) | set(right.paths())):
+        left_missing = p not in left
+        right_missing = p not in right
+        ltext = None if left_missing else left.text(p)
+        rtext = None if right_missing else right.text(p)
 
         results.append(
             CompareResult(
                 path=p,
                 left_text=ltext,
                 right_text=rtext,
-                exact_equal=exact,
-                similarity=sim,
+                exact_equal=ltext == rtext,
+                similarity=1.0,
                 left_missing=left_missing,
                 right_missing=right_missing,
             )
         )
+    return results
+
+
+def run_compare(
+    left: Path,
+    right: Path,
+    metric: str = "ratio",
+    workers: int = 1,
+) -> dict:
+    """
+    Compare two digest outputs, each either a JSON array or a binary
+    result store (`digest --format bin`).
+
+    For each path in the union of both sides:
+    - extract OCR raw_text
+    - compute exact equality
+    - compute similarity [0, 1] with `metric` (ratio | cer | wer, see
+      `similarity.similarity`), spread over `workers` processes
+    - mark missing on left/right
+
+    Returns a JSON-serializable dict with:
+    - summary (counts, averages)
+    - per_path results
+    """
+    if metric not in SIMILARITY_METRICS:
+        raise ValueError(
+            f"Unknown similarity metric: {metric!r}. "
+            f"Use one of: {', '.join(SIMILARITY_METRICS)}."
+        )
+
+    left_side = _open_side(left)
+    try:
+        right_side = _open_side(right)
+        try:
+            results = _collect(left_side, right_side)
+        finally:
+            right_side.close()
+    finally:
+        left_side.close()
+
+    # Indices into `results` still needing a similarity score.
+    to_score = [i for i, r in enumerate(results) if not r.exact_equal]
+    pairs = [(results[i].left_text or "", results[i].right_text or "") for i in to_score]
+
+    for i, sim in zip(to_score, _score_all(pairs, metric, workers)):
+        results[i].similarity = sim
 
     # Summary statistics
     total = len(results)
@@ -129,6 +213,7 @@ def run_compare(left: Path, right: Path) -> dict:
     return {
         "left_source": str(left),
         "right_source": str(right),
+        "metric": metric,
         "total_paths": total,
         "exact_equal_count": exact_count,
         "avg_similarity": avg_similarity,
@@ -1,86 +1,748 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
 from pathlib import Path
-from typing import List
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from ..cache import CacheStats, OcrResultCache, cached_extract, cached_extract_batch
 from ..context import AppContext
-from ..models import Document
+from ..dedup import DuplicateFilter, pillow_available
+from ..discovery import DiscoveryOptions, iter_images
+from ..metrics import DOCUMENTS, TRACER, merge_telemetry, telemetry_snapshot, timed_iter
+from ..models import Document, OcrResult, Page
+from ..ocr.base import PartialBatchError
+from ..pdf import (
+    PageRef,
+    close_documents,
+    is_pdf,
+    page_count,
+    pdf_unavailable,
+    rendered_page,
+)
+from ..preprocess import DecodedImageCache, PreprocessOptions, Preprocessor
+from ..profiling import PROFILER, Profile
+from ..scheduler import bounded_map
 
+# A unit of OCR work: an image file, or one page of a PDF.
+Unit = Union[Path, PageRef]
 
-def discover_images(root: Path) -> List[Path]:
+
+def discover_images(root: Path, options: Optional[DiscoveryOptions] = None) -> List[Path]:
     """
     Discover supported image files starting from a file or directory.
 
     - If `root` is a file, returns [root].
-    - If `root` is a directory, recursively scans for image extensions.
+    - If `root` is a directory, scans it according to `options` (see
+      `iter_images`, which yields the same paths lazily).
     """
-    if root.is_file():
-        return [root]
+    return list(iter_images(root, options))
+
+
+def _describe(unit: Unit) -> str:
+    return unit.label if isinstance(unit, PageRef) else str(unit)
+
 
-    exts = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
-    return [p for p in root.rglob("*") if p.suffix.lower() in exts]
+def _page_rebind(result: OcrResult, ref: PageRef, rendered: Path) -> OcrResult:
+    """Point meta at the PDF page instead of its temporary rendering."""
+    meta = {k: (ref.label if v == str(rendered) else v) for k, v in result.meta.items()}
+    meta["page"] = ref.number
+    return result.model_copy(update={"meta": meta})
 
 
-def _process_one(path: Path, engine, log) -> Document:
+def _extract_units(
+    units: List[Unit],
+    engine,
+    cache: Optional[OcrResultCache],
+    preprocessor: Optional[Preprocessor],
+) -> List[Union[OcrResult, Exception]]:
     """
-    Process a single image with the given engine and return a Document.
-    Isolated so it can be used both sequentially and in parallel.
+    OCR images and PDF pages alike. Pages are rasterized only now, inside
+    the task, into temporary PNGs that live until the engine is done, so
+    only in-flight pages ever exist.
+
+    A batch whose engine reports per-image failures (PartialBatchError)
+    holds each failed image's exception in its slot.
     """
-    log.info(f"[digest] Processing {Path} with engine '{engine.name()}")
-    ocr_result = engine.extract(path)
-    return Document(path=path, ocr=ocr_result)
+    with ExitStack() as stack:
+        files: List[Path] = []
+        for unit in units:
+            if isinstance(unit, PageRef):
+                pages_dir = AppContext.instance().config.pages_dir
+                unit = stack.enter_context(rendered_page(unit, pages_dir))
+            files.append(unit)
 
+        results: List[Union[OcrResult, Exception]]
+        if len(files) == 1:
+            results = [cached_extract(engine, files[0], cache, preprocessor)]
+        else:
+            try:
+                results = list(cached_extract_batch(engine, files, cache, preprocessor))
+            except PartialBatchError as exc:
+                results = exc.outcomes
 
-def run_digest(
+        return [
+            _page_rebind(r, u, f) if isinstance(u, PageRef) and isinstance(r, OcrResult) else r
+            for u, f, r in zip(units, files, results)
+        ]
+
+
+def _to_document(unit: Unit, result: OcrResult) -> Document:
+    if isinstance(unit, PageRef):
+        # A one-page fragment, merged per PDF by _Assembler.
+        return Document(path=unit.path, pages=[Page(number=unit.number, ocr=result)])
+    return Document(path=unit, ocr=result)
+
+
+def _process_one(
+    unit: Unit,
+    engine,
+    log,
+    cache: Optional[OcrResultCache] = None,
+    preprocessor: Optional[Preprocessor] = None,
+) -> Document:
+    """
+    Process a single image (or PDF page) with the given engine and return
+    a Document. Isolated so it can be used both sequentially and in
+    parallel.
+    """
+    started = time.perf_counter()
+    ocr_result = _extract_units([unit], engine, cache, preprocessor)[0]
+    if isinstance(ocr_result, Exception):
+        raise ocr_result
+    if log.isEnabledFor(logging.INFO):
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        name = _describe(unit)
+        log.info(
+            "[digest] Processed %s with engine '%s' in %.1f ms",
+            name, ocr_result.engine, elapsed_ms,
+            extra={"path": name, "engine": ocr_result.engine, "elapsed_ms": elapsed_ms},
+        )
+    return _to_document(unit, ocr_result)
+
+
+# (unit, document, error): exactly one of document / error is set.
+Outcome = Tuple[Unit, Optional[Document], Optional[str]]
+
+
+def _process_guarded(
+    unit: Unit,
+    engine,
+    log,
+    cache: Optional[OcrResultCache],
+    preprocessor: Optional[Preprocessor] = None,
+) -> Outcome:
+    try:
+        return unit, _process_one(unit, engine, log, cache, preprocessor), None
+    except Exception as exc:  # noqa: BLE001
+        return unit, None, str(exc)
+
+
+def _process_batch(
+    units: List[Unit],
+    engine,
+    log,
+    cache: Optional[OcrResultCache] = None,
+    preprocessor: Optional[Preprocessor] = None,
+) -> List[Outcome]:
+    """
+    Process a batch of images / PDF pages with a single `extract_batch`
+    call.
+
+    If the batched call fails, the batch is retried one unit at a time so
+    a single bad file only fails itself (decoded images are reused from the
+    preprocessor's cache).
+    """
+    if len(units) == 1:
+        return [_process_guarded(units[0], engine, log, cache, preprocessor)]
+
+    log.info(
+        "[digest] Processing batch of %d images with engine '%s'", len(units), engine.name(),
+        extra={"engine": engine.name(), "images": len(units)},
+    )
+    try:
+        results = _extract_units(units, engine, cache, preprocessor)
+    except Exception as exc:  # noqa: BLE001
+        log.warning(
+            f"[digest] Batch starting at {_describe(units[0])} failed ({exc}); "
+            "retrying images one by one"
+        )
+        return [_process_guarded(u, engine, log, cache, preprocessor) for u in units]
+
+    return [
+        (u, _to_document(u, r), None) if isinstance(r, OcrResult) else (u, None, str(r))
+        for u, r in zip(units, results)
+    ]
+
+
+class _Assembler:
+    """
+    Turns outcomes into Documents. Image outcomes pass straight through;
+    page outcomes are held (text only, never pixels) until every page of
+    their PDF is in, then emitted as one Document with `pages` in order.
+    A failed page is kept with its error so the PDF is still emitted.
+    """
+
+    def __init__(self, log) -> None:
+        self._log = log
+        self._pending: Dict[Path, Dict[int, Page]] = {}
+
+    def emit(self, outcomes: Iterable[Outcome]) -> Iterator[Document]:
+        for unit, doc, error in outcomes:
+            if not isinstance(unit, PageRef):
+                if doc is None:
+                    self._log.error(f"[digest] Error processing {unit}: {error}")
+                    DOCUMENTS.inc(status="error")
+                    continue
+                DOCUMENTS.inc(status="ok")
+                yield doc
+                continue
+
+            if doc is None:
+                self._log.error(f"[digest] Error processing {unit.label}: {error}")
+                page = Page(number=unit.number, error=error)
+            else:
+                page = doc.pages[0]
+
+            pages = self._pending.setdefault(unit.path, {})
+            pages[unit.index] = page
+            if len(pages) == unit.count:
+                del self._pending[unit.path]
+                ordered = [pages[i] for i in range(unit.count)]
+                failed = sum(1 for p in ordered if p.ocr is None)
+                status = "ok" if not failed else "error" if failed == unit.count else "partial"
+                DOCUMENTS.inc(status=status)
+                yield _pdf_document(unit.path, ordered)
+
+
+def _pdf_document(path: Path, pages: List[Page]) -> Document:
+    """A PDF's Document: per-page results plus their text joined by form feeds."""
+    done = [p.ocr for p in pages if p.ocr is not None]
+    engines = sorted({r.engine for r in done})
+    ocr = OcrResult(
+        engine=engines[0] if len(engines) == 1 else ",".join(engines),
+        raw_text="\f".join(p.ocr.raw_text if p.ocr is not None else "" for p in pages),
+        language=next((r.language for r in done if r.language), None),
+        meta={
+            "source": str(path),
+            "pages": len(pages),
+            "failed_pages": [p.number for p in pages if p.ocr is None],
+        },
+    )
+    return Document(path=path, ocr=ocr, pages=pages)
+
+
+def _expand_pdfs(paths: Iterable[Path], dpi: int, log) -> Iterator[Unit]:
+    """
+    Replace each PDF by one PageRef per page, lazily: only the page count is
+    read here, rendering happens in the worker that OCRs the page.
+    """
+    for p in paths:
+        if not is_pdf(p):
+            yield p
+            continue
+
+        reason = pdf_unavailable()
+        if reason is not None:
+            log.error(f"[digest] Skipping {p}: {reason}")
+            continue
+        try:
+            count = page_count(p)
+        except Exception as exc:  # noqa: BLE001
+            log.error(f"[digest] Error opening PDF {p}: {exc}")
+            continue
+        if count == 0:
+            log.warning(f"[digest] Skipping {p}: PDF has no pages")
+            continue
+
+        for index in range(count):
+            yield PageRef(path=p, index=index, count=count, dpi=dpi)
+
+
+# Per-process state for the process executor, set once by _init_worker so
+# the engine (and its model) is built in each worker instead of pickled
+# along with every task.
+_worker_engine = None
+_worker_cache: Optional[OcrResultCache] = None
+_worker_log = None
+_worker_preprocessor: Optional[Preprocessor] = None
+
+
+def _init_worker(
+    engine_key: str,
+    use_cache: bool,
+    preprocess: PreprocessOptions,
+    trace: bool = False,
+    profile_interval_s: Optional[float] = None,
+) -> None:
+    global _worker_engine, _worker_cache, _worker_log, _worker_preprocessor
+
+    TRACER.enabled = trace
+    if profile_interval_s is not None:
+        PROFILER.start(profile_interval_s)
+    ctx = AppContext.instance()
+    _worker_preprocessor = _build_preprocessor(preprocess, ctx.config.decode_cache_mb)
+    _worker_engine = ctx.resolve_engine(
+        engine_key, use_cache=use_cache, preprocessor=_worker_preprocessor
+    )
+    _worker_cache = ctx.result_cache if use_cache else None
+    _worker_log = ctx.logger
+
+
+def _process_chunk_in_worker(
+    units: List[Unit],
+    batched: bool,
+) -> Tuple[List[Outcome], CacheStats, tuple, Optional[Profile], Dict[str, dict]]:
+    """
+    Process a chunk of images / PDF pages inside a worker process, as one
+    engine batch when `batched` is set.
+
+    Errors are captured per unit so one bad file does not fail the chunk;
+    cache counters, metrics, trace spans, profile samples and what the
+    worker's router learned about the engines are handed back so the
+    parent can report (and persist) them.
+    """
+    if batched:
+        results = _process_batch(
+            units, _worker_engine, _worker_log, _worker_cache, _worker_preprocessor
+        )
+    else:
+        results = [
+            _process_guarded(
+                u, _worker_engine, _worker_log, _worker_cache, _worker_preprocessor
+            )
+            for u in units
+        ]
+
+    stats = _worker_cache.take_stats() if _worker_cache is not None else CacheStats()
+    profile = PROFILER.take() if PROFILER.running else None
+    routing = AppContext.instance().router.take_stats()
+    return results, stats, telemetry_snapshot(), profile, routing
+
+
+def _chunked(units: Iterable[Unit], size: int) -> Iterator[List[Unit]]:
+    it = iter(units)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Paths per task when the process executor is not batching: small chunks
+# amortize IPC without delaying the first results much. The total is not
+# known up front since discovery is streamed.
+_PROCESS_CHUNK_SIZE = 8
+
+
+def _iter_process_pool(
+    units: Iterable[Unit],
+    engine_key: str,
+    max_workers: int,
+    batch_size: int,
+    cache: Optional[OcrResultCache],
+    preprocess: PreprocessOptions,
+    log,
+    max_in_flight: int,
+    ordered: bool = False,
+) -> Iterator[Document]:
+    batched = batch_size > 1
+    chunk_size = batch_size if batched else _PROCESS_CHUNK_SIZE
+    # Workers route with routers of their own; their stats land here.
+    router = AppContext.instance().router
+
+    # "spawn" keeps workers from inheriting the parent's threads and locks
+    # (and any half-initialized engine state) through fork.
+    ex = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(
+            engine_key,
+            cache is not None,
+            preprocess,
+            TRACER.enabled,
+            PROFILER.interval_s if PROFILER.running else None,
+        ),
+    )
+    try:
+        assembler = _Assembler(log)
+        for chunk, fut in bounded_map(
+            lambda chunk: ex.submit(_process_chunk_in_worker, chunk, batched),
+            _chunked(units, chunk_size),
+            max_in_flight,
+            ordered,
+        ):
+            try:
+                results, stats, telemetry, profile, routing = fut.result()
+            except BrokenProcessPool as exc:
+                raise RuntimeError(
+                    f"[digest] Process pool failed (engine {engine_key!r}): {exc}"
+                ) from exc
+            except Exception as exc:  # noqa: BLE001
+                log.error(
+                    f"[digest] Error processing chunk starting at {_describe(chunk[0])}: {exc}"
+                )
+                # Keep the chunk's pages so their PDFs are still emitted.
+                results = [(u, None, str(exc)) for u in chunk if isinstance(u, PageRef)]
+                yield from assembler.emit(results)
+                continue
+
+            if cache is not None:
+                cache.add_stats(stats)
+            merge_telemetry(telemetry)
+            PROFILER.merge(profile)
+            router.merge_stats(routing)
+            yield from assembler.emit(results)
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def _build_preprocessor(options: PreprocessOptions, decode_cache_mb: int) -> Preprocessor:
+    """A per-run preprocessor; its decoded-image cache lives as long as it."""
+    decoded = None
+    if decode_cache_mb > 0:
+        decoded = DecodedImageCache(max_bytes=decode_cache_mb * 1024 * 1024)
+    return Preprocessor(options, cache=decoded)
+
+
+def _report_cache(cache: Optional[OcrResultCache], log) -> None:
+    if cache is None:
+        return
+    stats = cache.stats()
+    log.info(f"[digest] Cache hits={stats.hits} misses={stats.misses}")
+    cache.flush_stats()
+
+
+def _filter_skipped(
+    paths: Iterable[Path],
+    skip: Optional[Callable[[Path], bool]],
+    counts: List[int],
+) -> Iterator[Path]:
+    """Drop skipped paths lazily; counts = [discovered, skipped]."""
+    for p in paths:
+        counts[0] += 1
+        if skip is not None and skip(p):
+            counts[1] += 1
+            continue
+        yield p
+
+
+def iter_digest(
     input_path: Path,
     ocr_engine_name: str | None = None,
     workers: int | None = None,
-) -> List[Document]:
+    use_cache: bool = True,
+    executor: str | None = None,
+    batch_size: int = 1,
+    skip: Optional[Callable[[Path], bool]] = None,
+    discovery: Optional[DiscoveryOptions] = None,
+    preprocess: Optional[PreprocessOptions] = None,
+    pdf_dpi: int | None = None,
+    max_in_flight: int = 0,
+    ordered: bool = False,
+    dedup_distance: int | None = None,
+) -> Iterator[Document]:
     """
-    Main digest pipeline v2:
+    Streaming digest pipeline:
 
     - resolves the OCR engine (name or strategy)
-    - discovers input images
-    - processes them sequentially or in parallel (ThreadPool)
-    - returns a list of Document models
+    - discovers input images and PDFs lazily (`discovery` controls filters,
+      depth, symlinks and walker threads), so OCR starts on the first match
+      instead of waiting for the whole tree to be listed
+    - splits each PDF into pages that are rasterized at `pdf_dpi` (defaults
+      to PAKU_PDF_DPI) inside the task that OCRs them, so pages spread over
+      the workers like images and a long PDF is never held in memory; its
+      pages come back as one Document with per-page results
+    - processes them sequentially or in parallel, either on a ThreadPool
+      sharing one engine or on a ProcessPool with one engine per worker
+      (`executor`, defaults to PAKU_EXECUTOR), reusing cached OCR results
+      when `use_cache` is set
+    - with `batch_size` > 1, groups paths into batches handed to
+      `engine.extract_batch` so engines can amortize model invocation
+    - drops discovered paths for which `skip(path)` is true (used by
+      resumable / incremental runs)
+    - for engines that accept decoded images, decodes each image once and
+      applies `preprocess` (downscale / grayscale / deskew; defaults to the
+      PAKU_PREPROCESS_* settings), keeping decoded images in a bounded
+      per-run cache (PAKU_DECODE_CACHE_MB) for retries and escalations
+    - yields each Document as soon as it completes, so callers can write
+      it out and drop it instead of holding the whole run in memory
+    - keeps at most `max_in_flight` tasks queued or finished-but-unread
+      (defaults to PAKU_MAX_IN_FLIGHT, or 4 per worker), so huge inputs
+      are never submitted up front and a slow consumer holds back OCR
+    - with `ordered`, yields Documents in discovery order instead of
+      completion order (finished results wait within that same budget)
+    - with `dedup_distance` set, fingerprints images ahead of OCR and only
+      OCRs the first of each group of near-duplicates (dHash within that
+      many bits, confirmed on a thumbnail); the others follow right after
+      it with a copy of its result, marked in `meta["near_duplicate"]`
     """
     ctx = AppContext.instance()
     cfg = ctx.config
     log = ctx.logger
 
     key = ocr_engine_name or cfg.default_ocr  # engine name or strategy
-    engine = ctx.resolve_engine(key)
+    cache = ctx.result_cache if use_cache else None
 
-    paths = discover_images(input_path)
-    if not paths:
-        log.warning(f"[digest] No images found under {input_path}")
-        return []
+    mode = (executor or cfg.executor).lower()
+    if mode not in {"thread", "process"}:
+        raise ValueError(f"Unknown executor: {executor!r}. Use 'thread' or 'process'.")
 
     max_workers = workers or cfg.max_workers
     if max_workers < 1:
         max_workers = 1
+    if batch_size < 1:
+        batch_size = 1
+
+    preprocess, dpi = _resolve_inputs(cfg, preprocess, pdf_dpi)
+
+    counts = [0, 0]
+    found = timed_iter(iter_images(input_path, discovery), "discovery")
+    paths = _filter_skipped(found, skip, counts)
+    units = _expand_pdfs(paths, dpi, log)
+
+    dedup: Optional[DuplicateFilter] = None
+    if dedup_distance is not None:
+        if pillow_available():
+            dedup = DuplicateFilter(dedup_distance, log, workers=max_workers)
+            units = dedup.units(units)
+        else:
+            log.warning(
+                "[digest] Near-duplicate detection needs Pillow. Install it via the "
+                "'dedup' extra, e.g. `pip install -e .[dedup]`; OCRing every image."
+            )
+
+    def run(units: Iterable[Unit]) -> Iterator[Document]:
+        return _run_units(
+            units,
+            key,
+            mode,
+            max_workers,
+            batch_size,
+            cache,
+            preprocess,
+            ctx,
+            log,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
+        )
+
+    try:
+        if dedup is None:
+            yield from run(units)
+        else:
+            yield from dedup.documents(run(units))
+            leftovers = dedup.leftovers()
+            if leftovers:
+                log.info(
+                    f"[digest] OCRing {len(leftovers)} near-duplicates of images that failed"
+                )
+                yield from run(leftovers)
+    finally:
+        if dedup is not None:
+            log.info(
+                f"[digest] Near-duplicates: {dedup.duplicates} of {dedup.hashed} "
+                "images reused another image's result"
+            )
+        close_documents()
+        _report_cache(cache, log)
+        ctx.router.save_stats()
+        discovered, skipped = counts
+        if discovered == 0:
+            log.warning(f"[digest] No images found under {input_path}")
+        elif skip is not None:
+            log.info(f"[digest] Skipped {skipped} of {discovered} files")
+
+
+def _resolve_inputs(
+    cfg, preprocess: Optional[PreprocessOptions], pdf_dpi: int | None
+) -> Tuple[PreprocessOptions, int]:
+    """Preprocessing options and PDF DPI, defaulting to the config."""
+    if preprocess is None:
+        preprocess = PreprocessOptions(
+            max_side=cfg.preprocess_max_side,
+            grayscale=cfg.preprocess_grayscale,
+            deskew=cfg.preprocess_deskew,
+        )
+
+    dpi = pdf_dpi or cfg.pdf_dpi
+    if dpi < 1:
+        raise ValueError("pdf_dpi must be >= 1")
+    return preprocess, dpi
+
+
+def digest_files(
+    paths: Iterable[Path],
+    ocr_engine_name: str | None = None,
+    workers: int | None = None,
+    use_cache: bool = True,
+    batch_size: int = 1,
+    preprocess: Optional[PreprocessOptions] = None,
+    pdf_dpi: int | None = None,
+) -> Iterator[Document]:
+    """
+    Digest an explicit set of files in this process, e.g. each batch that
+    `watch` picks up.
+
+    Engines are resolved through the AppContext registry, which keeps them
+    loaded, so every call after the first runs on warm engines. Work stays
+    in-process (a ThreadPool when `workers` > 1), and a file that fails is
+    logged and dropped instead of ending the iteration.
+    """
+    ctx = AppContext.instance()
+    cfg = ctx.config
+    log = ctx.logger
+
+    key = ocr_engine_name or cfg.default_ocr
+    cache = ctx.result_cache if use_cache else None
+    preprocess, dpi = _resolve_inputs(cfg, preprocess, pdf_dpi)
+    units = _expand_pdfs(paths, dpi, log)
+
+    try:
+        yield from _run_units(
+            units,
+            key,
+            "thread",
+            max(1, workers or cfg.max_workers),
+            max(1, batch_size),
+            cache,
+            preprocess,
+            ctx,
+            log,
+            strict=False,
+        )
+    finally:
+        close_documents()
+        ctx.router.save_stats()
+
+
+def _run_units(
+    units: Iterable[Unit],
+    key: str,
+    mode: str,
+    max_workers: int,
+    batch_size: int,
+    cache: Optional[OcrResultCache],
+    preprocess: PreprocessOptions,
+    ctx: AppContext,
+    log,
+    strict: bool = True,
+    max_in_flight: int = 0,
+    ordered: bool = False,
+) -> Iterator[Document]:
+    """
+    OCR `units` with the given execution settings. With `strict`, an error
+    on an image in the sequential, unbatched path propagates (as it always
+    has for `digest`); otherwise it is logged and the image skipped.
+
+    The parallel paths keep at most `max_in_flight` tasks (images,
+    batches or process chunks) submitted and not yet consumed; 0 means
+    PAKU_MAX_IN_FLIGHT, or 4 per worker when that is 0 too. With
+    `ordered`, documents come out in input order.
+    """
+    in_flight = max_in_flight or ctx.config.max_in_flight or 4 * max_workers
+    # Workers resolve the key themselves; a bad one must fail here, not
+    # as a crashed pool.
+    ctx.check_engine_key(key)
+
+    # Parallel path using ProcessPoolExecutor: engines live in the workers.
+    if mode == "process" and max_workers > 1:
+        log.info(f"[digest] Running with {max_workers} worker processes")
+        yield from _iter_process_pool(
+            units, key, max_workers, batch_size, cache, preprocess, log, in_flight, ordered
+        )
+        return
+
+    pre = _build_preprocessor(preprocess, ctx.config.decode_cache_mb)
+    engine = ctx.resolve_engine(key, use_cache=cache is not None, preprocessor=pre)
+    assembler = _Assembler(log)
 
     # Sequential path
     if max_workers == 1:
-        docs: list[Document] = []
-        for p in paths:
-            docs.append(_process_one(p, engine, log))
-        return docs
+        if batch_size == 1:
+            for u in units:
+                if isinstance(u, PageRef) or not strict:
+                    # A failed page must not take the rest of its PDF down.
+                    yield from assembler.emit([_process_guarded(u, engine, log, cache, pre)])
+                else:
+                    try:
+                        doc = _process_one(u, engine, log, cache, pre)
+                    except Exception:
+                        DOCUMENTS.inc(status="error")
+                        raise
+                    DOCUMENTS.inc(status="ok")
+                    yield doc
+        else:
+            for batch in _chunked(units, batch_size):
+                yield from assembler.emit(_process_batch(batch, engine, log, cache, pre))
+        return
 
     # Parallel path using ThreadPoolExecutor
-    log.info(f"[digest] Running with {max_workers} workers over {len(paths)} files")
+    log.info(f"[digest] Running with {max_workers} workers")
+
+    ex = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        if batch_size > 1:
+            for _, fut in bounded_map(
+                lambda batch: ex.submit(_process_batch, batch, engine, log, cache, pre),
+                _chunked(units, batch_size),
+                in_flight,
+                ordered,
+            ):
+                yield from assembler.emit(fut.result())
+            return
+
+        for _, fut in bounded_map(
+            lambda u: ex.submit(_process_guarded, u, engine, log, cache, pre),
+            units,
+            in_flight,
+            ordered,
+        ):
+            yield from assembler.emit([fut.result()])
+    finally:
+        # On early close (consumer stopped iterating) skip queued work.
+        ex.shutdown(wait=True, cancel_futures=True)
 
-    docs: list[Document] = []
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        future_map = {ex.submit(_process_one, p, engine, log): p for p in paths}
-        for fut in as_completed(future_map):
-            p = future_map[fut]
-            try:
-                doc = fut.result()
-            except Exception as exc:  # noqa: BLE001
-                log.error(f"[digest] Error processing {p}: {exc}")
-                continue
-            docs.append(doc)
 
-    return docs
+def run_digest(
+    input_path: Path,
+    ocr_engine_name: str | None = None,
+    workers: int | None = None,
+    use_cache: bool = True,
+    executor: str | None = None,
+    batch_size: int = 1,
+    skip: Optional[Callable[[Path], bool]] = None,
+    discovery: Optional[DiscoveryOptions] = None,
+    preprocess: Optional[PreprocessOptions] = None,
+    pdf_dpi: int | None = None,
+    max_in_flight: int = 0,
+    ordered: bool = False,
+    dedup_distance: int | None = None,
+) -> List[Document]:
+    """
+    Main digest pipeline v2: collects `iter_digest` into a list of
+    Document models. Prefer `iter_digest` for large inputs.
+    """
+    return list(
+        iter_digest(
+            input_path=input_path,
+            ocr_engine_name=ocr_engine_name,
+            workers=workers,
+            use_cache=use_cache,
+            executor=executor,
+            batch_size=batch_size,
+            skip=skip,
+            discovery=discovery,
+            preprocess=preprocess,
+            pdf_dpi=pdf_dpi,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
+            dedup_distance=dedup_distance,
+        )
+    )
@@ -1,75 +1,168 @@
 from __future__ import annotations
 
+import csv
 import json
 from io import StringIO
 from pathlib import Path
-from typing import Iterable, Literal
+from typing import Callable, Iterable, Literal, Optional, TextIO
 
 from ..models import Document
+from ..metrics import span
 
 ExportFormat = Literal["json", "jsonl", "txt", "csv"]
 
+EXPORT_FORMATS = ("json", "jsonl", "txt", "csv")
 
-def export_documents_to_string(
-    documents: Iterable[Document],
-    fmt: ExportFormat,
-) -> str:
+
+class DocumentWriter:
     """
-    Render a collection of Document models into a text representation
-    in the given format.
+    Incremental writer that renders Documents one at a time onto a text
+    stream, in the given format.
+
+    Output is byte-identical to `export_documents_to_string` for the same
+    documents, but nothing is buffered beyond the current document, so
+    memory stays flat and everything written so far is on the stream if the
+    process dies mid-run. For `json` the closing bracket is only written by
+    `close()`, so a crashed run leaves a truncated (but recoverable) array.
 
     Supported formats:
-    - json   : pretty JSON array
+    - json   : pretty JSON array (streamed element by element)
     - jsonl  : one JSON object per line
     - txt    : one line per document (anime title/url per line style)
     - csv    : tabular export (one row per document)
     """
-    docs_list = list(documents)
-
-    # ---------- JSON ----------
-    if fmt == "json":
-        payload = [d.model_dump(mode="json") for d in docs_list]
-        return json.dumps(payload, ensure_ascii=False, indent=2)
-
-    # ---------- JSONL ----------
-    if fmt == "jsonl":
-        lines = []
-        for d in docs_list:
-            payload = d.model_dump(mode="json")
-            lines.append(json.dumps(payload, ensure_ascii=False))
-        return "\n".join(lines) + ("\n" if lines else "")
-
-    # ---------- TXT ----------
-    if fmt == "txt":
-        lines = []
-        for d in docs_list:
+
+    def __init__(
+        self,
+        stream: TextIO,
+        fmt: ExportFormat,
+        flush: bool = True,
+        write_header: bool = True,
+    ) -> None:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unsupported export format: {fmt!r}. "
+                f"Use one of: {', '.join(EXPORT_FORMATS)}."
+            )
+        self._stream = stream
+        self._fmt = fmt
+        self._flush = flush
+        self._count = 0
+        self._closed = False
+        self._csv = csv.writer(stream)  # only used for csv
+
+        if fmt == "csv":
+            # Skipped when appending to an existing export (resumed runs).
+            if write_header:
+                self._csv.writerow(["path", "engine", "language", "raw_text"])
+
+    @property
+    def count(self) -> int:
+        """Number of documents written so far."""
+        return self._count
+
+    def write(self, doc: Document) -> None:
+        fmt = self._fmt
+
+        # ---------- JSON ----------
+        if fmt == "json":
+            payload = json.dumps(doc.model_dump(mode="json"), ensure_ascii=False, indent=2)
+            prefix = "[\n" if self._count == 0 else ",\n"
+            self._stream.write(prefix + "  " + payload.replace("\n", "\n  "))
+
+        # ---------- JSONL ----------
+        elif fmt == "jsonl":
+            record = doc.model_dump(mode="json")
+            self._stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        # ---------- TXT ----------
+        elif fmt == "txt":
             raw_text = ""
-            if d.ocr and d.ocr.raw_text is not None:
-                raw_text = str(d.ocr.raw_text)
+            if doc.ocr and doc.ocr.raw_text is not None:
+                raw_text = str(doc.ocr.raw_text)
             raw_text = " ".join(raw_text.split())
             if raw_text:
-                lines.append(raw_text)
-        return "\n".join(lines) + ("\n" if lines else "")
+                self._stream.write(raw_text + "\n")
+
+        # ---------- CSV ----------
+        else:
+            engine = doc.ocr.engine if doc.ocr is not None else ""
+            language = (
+                doc.ocr.language
+                if (doc.ocr is not None and doc.ocr.language is not None)
+                else ""
+            )
+            raw_text = ""
+            if doc.ocr and doc.ocr.raw_text is not None:
+                raw_text = str(doc.ocr.raw_text)
+            self._csv.writerow([str(doc.path), engine, language, raw_text])
 
-    # ---------- CSV ----------
-    if fmt == "csv":
-        import csv
+        self._count += 1
+        if self._flush:
+            self._stream.flush()
 
-        buf = StringIO()
-        writer = csv.writer(buf)
+    def close(self) -> None:
+        """Write any trailing syntax (the JSON array terminator)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._fmt == "json":
+            self._stream.write("[]" if self._count == 0 else "\n]")
+        self._stream.flush()
 
-        header = ["path", "engine", "language", "raw_text"]
-        writer.writerow(header)
+    def __enter__(self) -> "DocumentWriter":
+        return self
 
-        for d in docs_list:
-            engine = d.ocr.engine if d.ocr is not None else ""
-            language = d.ocr.language if (d.ocr is not None and d.ocr.language is not None) else ""
-            raw_text = ""
-            if d.ocr and d.ocr.raw_text is not None:
-                raw_text = str(d.ocr.raw_text)
-            writer.writerow([str(d.path), engine, language, raw_text])
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-        return buf.getvalue()
+
+def write_documents(
+    documents: Iterable[Document],
+    fmt: ExportFormat,
+    stream: TextIO,
+    flush: bool = True,
+    write_header: bool = True,
+    on_write: Optional[Callable[[Document, Optional[int], Optional[int]], None]] = None,
+) -> int:
+    """
+    Stream documents onto `stream` as they are produced.
+
+    `on_write(doc, start, end)` is called after each document with the
+    stream offsets it occupies (None when the stream is not seekable),
+    e.g. to checkpoint progress in a manifest.
+    Returns the number of documents written.
+    """
+    seekable = on_write is not None and stream.seekable()
+    with DocumentWriter(stream, fmt=fmt, flush=flush, write_header=write_header) as writer:
+        for doc in documents:
+            start = stream.tell() if seekable else None
+            with span("export"):
+                writer.write(doc)
+            if on_write is not None:
+                end = stream.tell() if seekable else None
+                on_write(doc, start, end)
+    return writer.count
+
+
+def open_export_file(out_path: Path, fmt: ExportFormat, append: bool = False) -> TextIO:
+    """Open an export target with the newline handling its format needs."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    newline = "" if fmt == "csv" else None
+    return out_path.open("a" if append else "w", encoding="utf-8", newline=newline)
+
+
+def export_documents_to_string(
+    documents: Iterable[Document],
+    fmt: ExportFormat,
+) -> str:
+    """
+    Render a collection of Document models into a text representation
+    in the given format (see `DocumentWriter` for the formats).
+    """
+    buf = StringIO()
+    write_documents(documents, fmt=fmt, stream=buf, flush=False)
+    return buf.getvalue()
 
 
 def export_documents_to_file(
@@ -78,8 +171,8 @@ def export_documents_to_file(
     out_path: Path,
 ) -> None:
     """
-    Export documents into a file in the given format.
+    Export documents into a file in the given format, writing each
+    document as soon as it is produced.
     """
-    text = export_documents_to_string(documents, fmt=fmt)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(text, encoding="utf-8")
+    with open_export_file(out_path, fmt) as f:
+        write_documents(documents, fmt=fmt, stream=f)
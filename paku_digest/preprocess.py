@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import importlib.util
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .metrics import span
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """
+    Transforms applied to every image before it reaches an engine.
+
+    - max_side  : downscale so the longer side is at most this many pixels
+                  (0 = keep the original resolution); never upscales
+    - grayscale : convert to a single luminance channel
+    - deskew    : estimate the dominant text angle and rotate it level
+    """
+
+    max_side: int = 0
+    grayscale: bool = False
+    deskew: bool = False
+
+    def __post_init__(self) -> None:
+        if self.max_side < 0:
+            raise ValueError("max_side must be >= 0")
+
+    @property
+    def active(self) -> bool:
+        """Whether any transform is enabled (otherwise images go undecoded)."""
+        return bool(self.max_side or self.grayscale or self.deskew)
+
+    def cache_params(self) -> dict:
+        """Part of the result cache key when an engine gets decoded pixels."""
+        return asdict(self)
+
+
+@dataclass
+class PreparedImage:
+    """A decoded, preprocessed image plus what was done to it."""
+
+    pixels: Any  # numpy array, HxW (grayscale) or HxWx3 (BGR)
+    original_size: Tuple[int, int]  # (width, height) before preprocessing
+    scale: float = 1.0
+    deskew_angle: float = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return int(getattr(self.pixels, "nbytes", 0))
+
+    def to_original(self, box: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """
+        Map an (x, y, width, height) box from the preprocessed pixels back to
+        the original image: undo the deskew rotation (the bounding box of
+        the rotated corners), then the downscale, clamped to the image.
+        """
+        x, y, width, height = box
+        corners = [(x, y), (x + width, y), (x, y + height), (x + width, y + height)]
+        if self.deskew_angle:
+            # Rotated about the center of the (same-size) downscaled image;
+            # OpenCV's angle is counter-clockwise with y pointing down.
+            rows, cols = self.pixels.shape[:2]
+            cx, cy = cols / 2, rows / 2
+            rad = math.radians(-self.deskew_angle)
+            a, b = math.cos(rad), math.sin(rad)
+            corners = [
+                (a * (px - cx) + b * (py - cy) + cx, -b * (px - cx) + a * (py - cy) + cy)
+                for px, py in corners
+            ]
+        orig_w, orig_h = self.original_size
+        xs = [min(max(px / self.scale, 0.0), orig_w) for px, _ in corners]
+        ys = [min(max(py / self.scale, 0.0), orig_h) for _, py in corners]
+        left, top = round(min(xs)), round(min(ys))
+        return left, top, round(max(xs)) - left, round(max(ys)) - top
+
+    def info(self) -> dict:
+        """Summary recorded in OcrResult.meta["preprocess"]."""
+        height, width = self.pixels.shape[:2]
+        return {
+            "original_size": list(self.original_size),
+            "size": [int(width), int(height)],
+            "scale": self.scale,
+            "grayscale": self.pixels.ndim == 2,
+            "deskew_angle": self.deskew_angle,
+        }
+
+
+class DecodedImageCache:
+    """
+    Bounded, thread-safe LRU of PreparedImage objects for one run.
+
+    Keyed by path, size and mtime, so a file rewritten mid-run is decoded
+    again. An image larger than the whole budget is never kept.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, PreparedImage]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(path: Path) -> tuple:
+        st = path.stat()
+        return (str(path), st.st_size, st.st_mtime_ns)
+
+    def get(self, key: tuple) -> Optional[PreparedImage]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: tuple, image: PreparedImage) -> None:
+        size = image.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def usage(self) -> Tuple[int, int]:
+        """Return (entry_count, total_bytes)."""
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+def opencv_available() -> bool:
+    return importlib.util.find_spec("cv2") is not None
+
+
+class Preprocessor:
+    """
+    Decodes each image once per run and applies `options`.
+
+    Engines that accept decoded pixels (`OCREngine.accepts_images`) are fed
+    from here, so a cascade escalation, a failover to another engine or a
+    batch retry reuses the decoded image from `cache` instead of reading
+    and decoding the file again.
+    """
+
+    def __init__(
+        self,
+        options: PreprocessOptions,
+        cache: Optional[DecodedImageCache] = None,
+    ) -> None:
+        self.options = options
+        self.cache = cache
+
+    def applies_to(self, engine) -> bool:
+        # With every transform off, engines read the file themselves, as
+        # they would without a preprocessor (and with the same cache keys).
+        return self.options.active and engine.accepts_images() and opencv_available()
+
+    def cache_params(self) -> dict:
+        return self.options.cache_params()
+
+    def load(self, path: Path) -> PreparedImage:
+        key = None
+        if self.cache is not None:
+            key = DecodedImageCache.key_for(path)
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+
+        with span("decode"):
+            image = prepare(path, self.options)
+        if self.cache is not None and key is not None:
+            self.cache.put(key, image)
+        return image
+
+
+def prepare(path: Path, options: PreprocessOptions) -> PreparedImage:
+    """Decode `path` with OpenCV and apply `options`."""
+    import cv2  # type: ignore[import]
+    import numpy as np
+
+    # imdecode (rather than imread) handles non-ASCII paths on Windows.
+    data = np.fromfile(str(path), dtype=np.uint8)
+    pixels = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    if pixels is None:
+        raise RuntimeError(f"[preprocess] Could not decode image: {path}")
+
+    height, width = pixels.shape[:2]
+    image = PreparedImage(pixels=pixels, original_size=(width, height))
+
+    if options.max_side:
+        image.pixels, image.scale = downscale(image.pixels, options.max_side)
+    if options.grayscale:
+        image.pixels = cv2.cvtColor(image.pixels, cv2.COLOR_BGR2GRAY)
+    if options.deskew:
+        image.pixels, image.deskew_angle = deskew(image.pixels)
+    return image
+
+
+def downscale(pixels: Any, max_side: int) -> Tuple[Any, float]:
+    """Shrink so the longer side is `max_side`; returns (pixels, scale)."""
+    import cv2  # type: ignore[import]
+
+    height, width = pixels.shape[:2]
+    longest = max(height, width)
+    if longest <= max_side:
+        return pixels, 1.0
+
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(pixels, size, interpolation=cv2.INTER_AREA), scale
+
+
+# Angles below this are left alone: rotating resamples the whole image.
+_MIN_DESKEW_DEG = 0.1
+
+
+def deskew(pixels: Any) -> Tuple[Any, float]:
+    """
+    Rotate text to horizontal; returns (pixels, applied rotation in degrees,
+    counter-clockwise positive).
+
+    The angle is that of the minimum-area rectangle around the dark
+    (Otsu-thresholded) pixels, so it assumes dark text on a light page and
+    corrects at most 45 degrees either way.
+    """
+    import cv2  # type: ignore[import]
+
+    gray = pixels if pixels.ndim == 2 else cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    points = cv2.findNonZero(mask)
+    if points is None or len(points) < 2:
+        return pixels, 0.0
+
+    angle = float(cv2.minAreaRect(points)[-1])
+    # minAreaRect reports the angle of an arbitrary rectangle side; fold it
+    # into (-45, 45] so the nearest horizontal is the one corrected.
+    while angle > 45:
+        angle -= 90
+    while angle <= -45:
+        angle += 90
+    if abs(angle) < _MIN_DESKEW_DEG:
+        return pixels, 0.0
+
+    height, width = pixels.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    rotated = cv2.warpAffine(
+        pixels,
+        matrix,
+        (width, height),
+        flags=cv2.INTER_CUBIC,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+    return rotated, angle
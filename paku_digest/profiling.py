@@ -0,0 +1,296 @@
+"""
+Low-overhead sampling CPU profiler (`digest --profile`, `benchmark --profile`).
+
+A background thread snapshots the Python stack of every other thread
+(`sys._current_frames()`) every `interval_s` and counts each stack,
+tagged with the pipeline stage (see `metrics.span`) the thread was in,
+or "other" outside any stage.
+Threads blocked in a wait (idle pool workers, a consumer waiting on
+futures) are left out, so the profile shows where CPU time goes. At the
+default 100 Hz the cost is a fraction of a percent of a core, which keeps
+it usable on production runs; native code (e.g. model inference) shows up
+under the Python frame that called it.
+
+Process-pool workers run their own sampler and hand their samples back
+with each result chunk, like metrics.
+
+A profile is written as:
+
+- `<prefix>.pstats`: a `pstats` file (`python -m pstats`, snakeviz, ...).
+  Times are sample counts times the interval; call counts are sample counts.
+- `<prefix>.collapsed`: collapsed stacks (`stage;outer;...;inner count`)
+  for flamegraph.pl, speedscope or inferno.
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .metrics import current_stage
+
+DEFAULT_INTERVAL_S = 0.01
+
+# (filename, first line, qualified name) – the key pstats uses, too.
+FrameKey = Tuple[str, int, str]
+Stack = Tuple[FrameKey, ...]  # outermost frame first
+
+# Innermost frames of threads that are blocked rather than running. Stack
+# samples are instantaneous while CPU clocks cover a whole interval, so a
+# thread that just went back to waiting is recognized by these.
+_IDLE_LEAVES = {
+    ("thread.py", "_worker"),  # ThreadPoolExecutor worker in SimpleQueue.get
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("connection.py", "wait"),
+    ("connection.py", "_recv"),
+    ("synchronize.py", "__enter__"),
+    ("popen_fork.py", "poll"),
+}
+
+
+def _frame_key(code) -> FrameKey:
+    return (code.co_filename, code.co_firstlineno, getattr(code, "co_qualname", code.co_name))
+
+
+def _is_idle(leaf: FrameKey) -> bool:
+    return (os.path.basename(leaf[0]), leaf[2].rsplit(".", 1)[-1]) in _IDLE_LEAVES
+
+
+def _cpu_time(thread_id: int) -> Optional[float]:
+    """CPU seconds used by a thread of this process, where the OS tells."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def label(key: FrameKey) -> str:
+    """`name (dir/file.py:line)`, as shown in summaries and flamegraphs."""
+    filename, line, name = key
+    parts = Path(filename).parts
+    return f"{name} ({'/'.join(parts[-2:])}:{line})"
+
+
+@dataclass
+class Profile:
+    """Stack samples, possibly from several processes."""
+
+    interval_s: float = DEFAULT_INTERVAL_S
+    samples: Counter = field(default_factory=Counter)  # (stage, stack) -> count
+    duration_s: float = 0.0
+    pids: Set[int] = field(default_factory=set)
+
+    @property
+    def total(self) -> int:
+        return sum(self.samples.values())
+
+    # ---------- output ----------
+
+    def write_collapsed(self, path: Path) -> None:
+        lines: Counter = Counter()
+        for (stage, stack), count in self.samples.items():
+            frames = [stage] + [label(k).replace(";", ":") for k in stack]
+            lines[";".join(frames)] += count
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sorted(lines.items())),
+            encoding="utf-8",
+        )
+
+    def to_pstats(self) -> Dict[FrameKey, tuple]:
+        """`pstats` raw data: key -> (cc, nc, tt, ct, callers)."""
+        dt = self.interval_s
+        self_n: Counter = Counter()
+        total_n: Counter = Counter()
+        edges: Dict[FrameKey, Dict[FrameKey, List[float]]] = {}
+        for (_, stack), count in self.samples.items():
+            self_n[stack[-1]] += count
+            for key in set(stack):  # recursion counts once per sample
+                total_n[key] += count
+            for caller, callee in set(zip(stack, stack[1:])):
+                edge = edges.setdefault(callee, {}).setdefault(caller, [0, 0, 0.0, 0.0])
+                edge[0] += count
+                edge[1] += count
+                edge[3] += count * dt
+                if callee == stack[-1]:
+                    edge[2] += count * dt
+        return {
+            key: (
+                n,
+                n,
+                self_n[key] * dt,
+                n * dt,
+                {c: tuple(v) for c, v in edges.get(key, {}).items()},
+            )
+            for key, n in total_n.items()
+        }
+
+    def write_pstats(self, path: Path) -> None:
+        # The same marshalled dict pstats.Stats.dump_stats writes.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            marshal.dump(self.to_pstats(), f)
+
+    def summary(self, top: int = 15) -> str:
+        """Top-N functions by own (self) samples, with the stage they ran in."""
+        total = self.total
+        head = (
+            f"[profile] {total} samples at {self.interval_s * 1000:g} ms over "
+            f"{self.duration_s:.1f}s in {max(len(self.pids), 1)} process(es)"
+        )
+        if not total:
+            return head + "; nothing was running."
+
+        self_n: Counter = Counter()
+        total_n: Counter = Counter()
+        stages: Dict[FrameKey, Counter] = {}
+        for (stage, stack), count in self.samples.items():
+            self_n[stack[-1]] += count
+            stages.setdefault(stack[-1], Counter())[stage] += count
+            for key in set(stack):
+                total_n[key] += count
+
+        lines = [head, f"{'self%':>7} {'total%':>7}  {'stage':<16} function"]
+        for key, n in self_n.most_common(top):
+            stage, in_stage = stages[key].most_common(1)[0]
+            if in_stage < n:
+                stage = f"{stage} {100 * in_stage / n:.0f}%"
+            lines.append(
+                f"{100 * n / total:6.1f}% {100 * total_n[key] / total:6.1f}%  "
+                f"{stage:<16} {label(key)}"
+            )
+
+        by_stage: Counter = Counter()
+        for (stage, _), count in self.samples.items():
+            by_stage[stage] += count
+        lines.append(
+            "by stage: "
+            + ", ".join(f"{s} {100 * n / total:.0f}%" for s, n in by_stage.most_common())
+        )
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a daemon thread while running."""
+
+    def __init__(self) -> None:
+        self.interval_s = DEFAULT_INTERVAL_S
+        self._samples: Counter = Counter()
+        self._pids: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval_s: float = DEFAULT_INTERVAL_S) -> None:
+        if self.running:
+            return
+        self.interval_s = interval_s
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="paku-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        """Stop sampling and return everything not yet taken."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        profile = self.take()
+        profile.duration_s = time.perf_counter() - self._started
+        return profile
+
+    def take(self) -> Profile:
+        """Samples collected since the last `take` (worker side)."""
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+            pids, self._pids = self._pids | {os.getpid()}, set()
+        return Profile(interval_s=self.interval_s, samples=samples, pids=pids)
+
+    def merge(self, profile: Optional[Profile]) -> None:
+        """Add samples a worker process sent back."""
+        if profile is None:
+            return
+        with self._lock:
+            self._samples.update(profile.samples)
+            self._pids |= profile.pids
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        keys: Dict[object, FrameKey] = {}
+        cpu: Dict[int, Optional[float]] = {}
+        while not self._stop.wait(self.interval_s):
+            tick: List[Tuple[str, Stack]] = []
+            frames = sys._current_frames()
+            frames.pop(me, None)
+            for tid, frame in frames.items():
+                # A thread counts when it used CPU since the last tick;
+                # blocked in a wait or lock (even in C code) it does not.
+                used, now = cpu.get(tid), _cpu_time(tid)
+                cpu[tid] = now
+                if now is not None and (used is None or now == used):
+                    continue
+                stack = self._stack(frame, keys)
+                if _is_idle(stack[-1]):
+                    continue
+                tick.append((current_stage(tid) or "other", stack))
+            for tid in cpu.keys() - frames.keys():  # exited threads
+                del cpu[tid]
+            del frames
+            with self._lock:
+                self._samples.update(tick)
+
+    @staticmethod
+    def _stack(frame, keys: Dict[object, FrameKey]) -> Stack:
+        stack: List[FrameKey] = []
+        while frame is not None:
+            code = frame.f_code
+            key = keys.get(code)
+            if key is None:
+                key = keys[code] = _frame_key(code)
+            stack.append(key)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+PROFILER = SamplingProfiler()
+
+
+@contextmanager
+def profile_session(
+    prefix: Path,
+    interval_s: float = DEFAULT_INTERVAL_S,
+    top: int = 15,
+    report: Optional[Callable[[str], None]] = None,
+) -> Iterator[None]:
+    """
+    Profile the block, including process-pool workers started inside it,
+    and write `<prefix>.pstats` and `<prefix>.collapsed` afterwards.
+    `report` receives the top-`top` summary.
+    """
+    PROFILER.start(interval_s)
+    try:
+        yield
+    finally:
+        profile = PROFILER.stop()
+        profile.write_pstats(prefix.with_name(prefix.name + ".pstats"))
+        profile.write_collapsed(prefix.with_name(prefix.name + ".collapsed"))
+        if report is not None:
+            report(profile.summary(top))
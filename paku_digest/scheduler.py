@@ -0,0 +1,83 @@
+"""
+Bounded task scheduling for the parallel digest paths.
+
+`bounded_map` feeds an executor from a (lazy) iterator while keeping at
+most `max_in_flight` tasks submitted but not yet handed to the consumer,
+so neither the input nor the futures are ever materialized in full, and
+a slow consumer (e.g. an output sink) holds back submission instead of
+letting finished results pile up.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Deque, Dict, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def bounded_map(
+    submit: Callable[[T], Future],
+    items: Iterable[T],
+    max_in_flight: int,
+    ordered: bool = False,
+) -> Iterator[Tuple[T, Future]]:
+    """
+    Submit `submit(item)` for each item, keeping at most `max_in_flight`
+    tasks between submission and being yielded, and yield each
+    `(item, future)` once the future is done.
+
+    - Items are pulled from `items` only when there is room, so a lazy
+      iterator is consumed at the pace of the work.
+    - Nothing new is submitted while the consumer holds on to a yielded
+      result beyond the in-flight budget: that is the backpressure.
+    - With `ordered`, results are yielded in input order. Finished results
+      wait in a reorder buffer that counts against `max_in_flight`, so a
+      slow head item stalls submission instead of growing the buffer.
+
+    Closing the iterator early cancels the tasks that have not started.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be >= 1")
+
+    source = iter(items)
+    exhausted = False
+    pending: Dict[Future, Tuple[int, T]] = {}
+    finished: Deque[Tuple[T, Future]] = deque()  # unordered: done, not yet yielded
+    reorder: Dict[int, Tuple[T, Future]] = {}  # ordered: done, waiting for their turn
+    submitted = 0
+    next_out = 0
+
+    try:
+        while True:
+            held = len(finished) + len(reorder)
+            while not exhausted and len(pending) + held < max_in_flight:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[submit(item)] = (submitted, item)
+                submitted += 1
+
+            if ordered and next_out in reorder:
+                yield reorder.pop(next_out)
+                next_out += 1
+                continue
+            if finished:
+                yield finished.popleft()
+                continue
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                index, item = pending.pop(fut)
+                if ordered:
+                    reorder[index] = (item, fut)
+                else:
+                    finished.append((item, fut))
+    finally:
+        for fut in pending:
+            fut.cancel()
@@ -0,0 +1,495 @@
+"""
+Local HTTP OCR service (`paku-digest serve`).
+
+Endpoints:
+
+    POST /ocr      image in the request body (raw bytes, or multipart/form-data
+                   with one file field); responds with OcrResult JSON
+    GET  /healthz  liveness: 200 while the process serves requests
+    GET  /readyz   readiness: 200 once the engine is loaded, 503 before
+    GET  /metrics  Prometheus metrics (requests, batch sizes, engine latency)
+
+Concurrent uploads are collected by a `MicroBatcher` into micro-batches
+(at most `max_batch` images, waiting at most `max_wait_ms` after the first
+one) and each batch is OCR'd with a single `extract_batch` call, so a
+busy service gets batch-level throughput while a lone request waits no
+longer than the batching window.
+
+Built on the standard library's ThreadingHTTPServer: one thread per
+connection, all of them feeding the shared batcher.
+"""
+
+from __future__ import annotations
+
+import json
+import mimetypes
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar, Union
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import OcrResultCache, cached_extract, cached_extract_batch
+from .context import AppContext
+from .metrics import REGISTRY
+from .models import OcrResult
+from .ocr.base import OCREngine, PartialBatchError
+from .ocr.router import RoutedEngine
+from .preprocess import PreprocessOptions, Preprocessor
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class QueueFullError(RuntimeError):
+    """The batcher's queue is at capacity; the caller should back off."""
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Groups items submitted from many threads into batches for `handler`.
+
+    A collector thread takes the first waiting item, then keeps adding
+    items until it has `max_batch` of them or `max_wait_s` has passed
+    since the first, and calls `handler(batch)`. The handler returns one
+    result (or Exception) per item, which resolves that item's Future.
+    `max_queue` bounds the items waiting for a batch; `submit` raises
+    QueueFullError beyond it instead of letting latency grow unbounded.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], List[Union[R, BaseException]]],
+        max_batch: int = 8,
+        max_wait_s: float = 0.01,
+        max_queue: int = 256,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        if max_wait_s < 0:
+            raise ValueError("max_wait_s must be >= 0")
+        self._handler = handler
+        self._max_batch = max_batch
+        self._max_wait_s = max_wait_s
+        self._queue: "queue.Queue[Optional[Tuple[T, Future]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="paku-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: T) -> "Future[R]":
+        fut: "Future[R]" = Future()
+        try:
+            self._queue.put_nowait((item, fut))
+        except queue.Full:
+            raise QueueFullError("Too many requests waiting for OCR") from None
+        return fut
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "largest_batch": self.largest_batch,
+                "queued": self._queue.qsize(),
+            }
+
+    def _collect(self) -> Tuple[List[Tuple[T, Future]], bool]:
+        """Next batch, and whether close() was requested meanwhile."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self._max_wait_s
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            batch, closing = self._collect()
+            if batch:
+                self._dispatch(batch)
+            if closing:
+                return
+
+    def _dispatch(self, batch: List[Tuple[T, Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self._handler(items)
+        except BaseException as exc:  # noqa: BLE001
+            results = [exc] * len(items)
+        if len(results) != len(items):
+            short = RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+            results = [short] * len(items)
+        with self._lock:
+            self.batches += 1
+            self.items += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+        for (_, fut), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+
+@dataclass
+class Upload:
+    data: bytes
+    name: str  # client-side file name, or "upload" + extension
+    suffix: str  # extension the engines see, e.g. ".png"
+
+
+class OcrService:
+    """
+    The engine side of the service: warms up the engine once, then OCRs
+    micro-batches of uploads. Each batch is written to a temporary
+    directory under the workdir so engines and the result cache see
+    ordinary files; identical uploads are served from the cache.
+    """
+
+    def __init__(
+        self,
+        ocr_engine_name: str | None = None,
+        use_cache: bool = True,
+        preprocess: Optional[PreprocessOptions] = None,
+        max_batch: int = 8,
+        max_wait_ms: float = 10.0,
+        max_queue: int = 256,
+    ) -> None:
+        ctx = AppContext.instance()
+        cfg = ctx.config
+        self._ctx = ctx
+        self._key = ocr_engine_name or cfg.default_ocr
+        self._cache: Optional[OcrResultCache] = ctx.result_cache if use_cache else None
+        if preprocess is None:
+            preprocess = PreprocessOptions(
+                max_side=cfg.preprocess_max_side,
+                grayscale=cfg.preprocess_grayscale,
+                deskew=cfg.preprocess_deskew,
+            )
+        # No decoded-image cache: every upload is a new temporary file, so
+        # entries would only be hit by the rare per-image batch retry.
+        self._preprocessor = Preprocessor(preprocess)
+        self._uploads_dir = cfg.workdir / ".paku-cache" / "uploads"
+        self._engine: Optional[OCREngine] = None
+        self.ready = threading.Event()
+        self.batcher: MicroBatcher[Upload, OcrResult] = MicroBatcher(
+            self._ocr_batch,
+            max_batch=max_batch,
+            max_wait_s=max_wait_ms / 1000,
+            max_queue=max_queue,
+        )
+
+    @property
+    def engine_name(self) -> str:
+        return self._key
+
+    def start(self) -> None:
+        """Load the engine (model start-up happens here), then accept work."""
+        log = self._ctx.logger
+        started = time.perf_counter()
+        engine = self._ctx.resolve_engine(
+            self._key, use_cache=self._cache is not None, preprocessor=self._preprocessor
+        )
+        if isinstance(engine, RoutedEngine):
+            # A strategy only builds a proxy; load the engines behind it.
+            loaded = engine.warm_up()
+            log.info(f"[serve] Strategy '{self._key}' loaded: {', '.join(loaded)}")
+        self._engine = engine
+        self.batcher.start()
+        self.ready.set()
+        log.info(f"[serve] Engine '{self._key}' ready in {time.perf_counter() - started:.2f}s")
+
+    def close(self) -> None:
+        self.ready.clear()
+        self.batcher.close()
+        self._ctx.router.save_stats()
+        if self._cache is not None:
+            self._cache.flush_stats()
+
+    def submit(self, upload: Upload) -> "Future[OcrResult]":
+        return self.batcher.submit(upload)
+
+    def _ocr_batch(self, uploads: List[Upload]) -> List[Union[OcrResult, BaseException]]:
+        engine, cache, pre = self._engine, self._cache, self._preprocessor
+        if engine is None:
+            raise RuntimeError("OcrService.start() must be called first")
+        log = self._ctx.logger
+        self._uploads_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self._uploads_dir) as tmp:
+            files: List[Path] = []
+            for i, upload in enumerate(uploads):
+                f = Path(tmp) / f"{i}{upload.suffix}"
+                f.write_bytes(upload.data)
+                files.append(f)
+
+            log.debug(f"[serve] OCR batch of {len(files)} with engine '{engine.name()}'")
+            SERVE_BATCH_SIZE.observe(len(files))
+            try:
+                if len(files) == 1:
+                    results: List[Union[OcrResult, BaseException]] = [
+                        cached_extract(engine, files[0], cache, pre)
+                    ]
+                else:
+                    results = list(cached_extract_batch(engine, files, cache, pre))
+            except PartialBatchError as exc:
+                results = list(exc.outcomes)
+            except Exception as exc:  # noqa: BLE001
+                if len(files) == 1:
+                    return [exc]
+                log.warning(f"[serve] Batch of {len(files)} failed ({exc}); retrying one by one")
+                results = []
+                for f in files:
+                    try:
+                        results.append(cached_extract(engine, f, cache, pre))
+                    except Exception as item_exc:  # noqa: BLE001
+                        results.append(item_exc)
+
+            return [
+                _rebind(r, f, u.name) if isinstance(r, OcrResult) else r
+                for r, f, u in zip(results, files, uploads)
+            ]
+
+
+def _rebind(result: OcrResult, tmp: Path, name: str) -> OcrResult:
+    """Point meta at the upload's name instead of its temporary file."""
+    meta = {k: (name if v == str(tmp) else v) for k, v in result.meta.items()}
+    return result.model_copy(update={"meta": meta})
+
+
+def _suffix_for(name: Optional[str], content_type: Optional[str]) -> str:
+    if name and Path(name).suffix:
+        return Path(name).suffix.lower()
+    if content_type:
+        guessed = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if guessed:
+            return guessed
+    return ".png"
+
+
+class _HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_upload(body: bytes, content_type: str, name: Optional[str]) -> Upload:
+    if not body:
+        raise _HttpError(HTTPStatus.BAD_REQUEST, "Empty request body; send an image.")
+
+    if content_type.lower().startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        for part in message.iter_parts():
+            filename = part.get_filename()
+            if filename is None and part.get_param("name", header="content-disposition") != "file":
+                continue
+            data = part.get_payload(decode=True)
+            if not isinstance(data, bytes) or not data:
+                break
+            filename = filename or name
+            return Upload(
+                data=data,
+                name=filename or "upload",
+                suffix=_suffix_for(filename, part.get_content_type()),
+            )
+        raise _HttpError(
+            HTTPStatus.BAD_REQUEST, "Multipart upload has no file (use a 'file' field)."
+        )
+
+    suffix = _suffix_for(name, content_type)
+    return Upload(data=body, name=name or f"upload{suffix}", suffix=suffix)
+
+
+_ENDPOINTS = ("/ocr", "/healthz", "/readyz", "/metrics")
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "paku_http_requests_total", "HTTP requests answered by `serve`.", ("endpoint", "code")
+)
+OCR_REQUEST_SECONDS = REGISTRY.histogram(
+    "paku_http_ocr_seconds", "Time from receiving a POST /ocr to its response."
+)
+SERVE_BATCH_SIZE = REGISTRY.histogram(
+    "paku_serve_batch_size",
+    "Uploads per micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+def make_handler(
+    service: OcrService,
+    max_upload_bytes: int,
+    request_timeout_s: float,
+    log,
+) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "paku-digest"
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            log.debug(f"[serve] {self.address_string()} {format % args}")
+
+        def _send_json(self, status: HTTPStatus, payload: object) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self._count(status)
+
+        def _count(self, status: HTTPStatus) -> None:
+            path = urlsplit(self.path).path
+            endpoint = path if path in _ENDPOINTS else "other"
+            HTTP_REQUESTS.inc(endpoint=endpoint, code=str(int(status)))
+
+        def do_GET(self) -> None:  # noqa: N802
+            path = urlsplit(self.path).path
+            if path == "/metrics":
+                body = REGISTRY.render().encode("utf-8")
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                self._count(HTTPStatus.OK)
+            elif path == "/healthz":
+                self._send_json(HTTPStatus.OK, {"status": "ok"})
+            elif path == "/readyz":
+                ready = service.ready.is_set()
+                self._send_json(
+                    HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE,
+                    {
+                        "ready": ready,
+                        "engine": service.engine_name,
+                        "batching": service.batcher.stats(),
+                    },
+                )
+            else:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {path}"})
+
+        def do_POST(self) -> None:  # noqa: N802
+            started = time.perf_counter()
+            try:
+                self._handle_ocr()
+            finally:
+                if urlsplit(self.path).path == "/ocr":
+                    OCR_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+        def _handle_ocr(self) -> None:
+            url = urlsplit(self.path)
+            try:
+                if url.path != "/ocr":
+                    raise _HttpError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+                if not service.ready.is_set():
+                    raise _HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Engine is still loading.")
+
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > max_upload_bytes:
+                    self.close_connection = True
+                    raise _HttpError(
+                        HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        f"Upload exceeds {max_upload_bytes} bytes.",
+                    )
+                body = self.rfile.read(length)
+                name = parse_qs(url.query).get("name", [None])[0]
+                upload = _parse_upload(body, self.headers.get("Content-Type", ""), name)
+
+                try:
+                    future = service.submit(upload)
+                except QueueFullError as e:
+                    raise _HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e)) from None
+                try:
+                    result = future.result(timeout=request_timeout_s)
+                except TimeoutError:
+                    raise _HttpError(HTTPStatus.GATEWAY_TIMEOUT, "OCR timed out.") from None
+                except Exception as e:  # noqa: BLE001
+                    log.error(f"[serve] OCR failed for {upload.name}: {e}")
+                    raise _HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, f"OCR failed: {e}") from None
+            except _HttpError as e:
+                self._send_json(e.status, {"error": str(e)})
+                return
+
+            self._send_json(HTTPStatus.OK, result.model_dump(mode="json"))
+
+    return Handler
+
+
+def make_server(
+    service: OcrService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_upload_mb: int = 32,
+    request_timeout_s: float = 300.0,
+) -> ThreadingHTTPServer:
+    """An HTTP server bound to (host, port) that sends uploads to `service`."""
+    log = AppContext.instance().logger
+    handler = make_handler(service, max_upload_mb * 1024 * 1024, request_timeout_s, log)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(
+    service: OcrService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_upload_mb: int = 32,
+    request_timeout_s: float = 300.0,
+) -> None:
+    """
+    Run the service until interrupted. The port accepts connections right
+    away (so /healthz answers) while the engine warms up in the background;
+    /readyz turns 200 once it is loaded.
+    """
+    log = AppContext.instance().logger
+    server = make_server(service, host, port, max_upload_mb, request_timeout_s)
+
+    def warm_up() -> None:
+        try:
+            service.start()
+        except Exception as exc:  # noqa: BLE001
+            # Stay up (not ready) so /readyz reports the failure to probes.
+            log.error(f"[serve] Could not load engine '{service.engine_name}': {exc}")
+
+    threading.Thread(target=warm_up, name="paku-warmup", daemon=True).start()
+    log.info(f"[serve] Listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("[serve] Interrupted")
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from difflib import SequenceMatcher
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+SIMILARITY_METRICS = ("ratio", "cer", "wer")
+
+
+def levenshtein(a: Sequence[Hashable], b: Sequence[Hashable]) -> int:
+    """
+    Edit distance between two sequences (characters or tokens).
+
+    Shared prefixes/suffixes are stripped first, which makes near-identical
+    OCR outputs cheap. The rest runs Myers/Hyyrö's bit-parallel algorithm
+    with Python ints as bit vectors: one pass over the longer sequence, each
+    step a handful of word-parallel operations over the shorter one, instead
+    of the O(len(a) * len(b)) cell-by-cell table.
+    """
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+
+    peq: Dict[Hashable, int] = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return score
+
+
+def _normalized(distance: int, a_len: int, b_len: int) -> float:
+    return 1.0 - distance / max(a_len, b_len)
+
+
+def similarity(a: str, b: str, metric: str = "ratio") -> float:
+    """
+    Similarity in [0, 1] between two texts.
+
+    - ratio : difflib.SequenceMatcher.ratio() (the historical score)
+    - cer   : 1 - character edit distance / longer length
+    - wer   : 1 - word edit distance / longer word count
+
+    Identical texts return 1.0 without running any metric.
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    if metric == "ratio":
+        return SequenceMatcher(None, a, b).ratio()
+    if metric == "cer":
+        return _normalized(levenshtein(a, b), len(a), len(b))
+    if metric == "wer":
+        ta, tb = a.split(), b.split()
+        if ta == tb:
+            return 1.0
+        if not ta or not tb:
+            return 0.0
+        return _normalized(levenshtein(ta, tb), len(ta), len(tb))
+    raise ValueError(
+        f"Unknown similarity metric: {metric!r}. "
+        f"Use one of: {', '.join(SIMILARITY_METRICS)}."
+    )
+
+
+def score_pairs(pairs: List[Tuple[str, str]], metric: str) -> List[float]:
+    """Score a chunk of (left, right) pairs; the unit of work for worker pools."""
+    return [similarity(a, b, metric) for a, b in pairs]
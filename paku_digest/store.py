@@ -0,0 +1,299 @@
+"""
+Binary, memory-mappable digest result store.
+
+Layout (all integers little-endian):
+
+    header   MAGIC, version
+    records  per document: path (UTF-8) | raw_text (UTF-8) | rest of the
+             document as compact JSON, with ocr.raw_text left out
+    entries  one fixed-size ENTRY per document, in write order
+    table    open-addressing hash table of SLOTs: (path hash, entry + 1)
+    footer   MAGIC, version, documents, entries offset, table offset,
+             table slots
+
+The footer sits at a fixed distance from the end of the file, so a reader
+finds the index without scanning, reaches document `i` at
+`entries + i * ENTRY.size`, and finds a path in O(1) expected probes.
+`raw_text` is a slice of the mapping and is only decoded when asked for.
+If a path was written twice, lookups return its first record.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+from .models import Document
+
+MAGIC = b"PAKUSTOR"
+STORE_VERSION = 1
+
+_HEADER = struct.Struct("<8sI")
+# path offset, path length, text offset (0 = no OCR text), text length,
+# JSON offset, JSON length
+_ENTRY = struct.Struct("<QIQIQI")
+# path hash, entry index + 1 (0 = empty slot)
+_SLOT = struct.Struct("<QQ")
+_FOOTER = struct.Struct("<8sIQQQQ")
+
+
+def _path_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def is_result_store(path: Path) -> bool:
+    """True if `path` starts with the result store magic."""
+    try:
+        with path.open("rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ResultStoreWriter:
+    """
+    Streams Documents into a result store file.
+
+    Records are written as documents arrive; only their fixed-size index
+    entries (36 bytes + an 8-byte hash each) stay in memory until `close()`
+    writes the index and footer. Leaving a `with` block on an exception
+    calls `abort()` instead, so a failed run never looks finished: a store
+    without a footer is rejected by the reader.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._f: BinaryIO = path.open("wb")
+        self._f.write(_HEADER.pack(MAGIC, STORE_VERSION))
+        self._entries = bytearray()
+        self._hashes = array("Q")
+        self._closed = False
+
+    @property
+    def count(self) -> int:
+        return len(self._hashes)
+
+    def write(self, doc: Document) -> Tuple[int, int]:
+        """Append one document; returns its (start, end) byte offsets."""
+        data = doc.model_dump(mode="json")
+        text: Optional[str] = None
+        if data.get("ocr") is not None:
+            text = data["ocr"].pop("raw_text")
+
+        path_b = str(doc.path).encode("utf-8")
+        text_b = text.encode("utf-8") if text is not None else b""
+        json_b = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        f = self._f
+        start = f.tell()
+        f.write(path_b)
+        f.write(text_b)
+        f.write(json_b)
+
+        text_off = start + len(path_b) if text is not None else 0
+        self._entries += _ENTRY.pack(
+            start,
+            len(path_b),
+            text_off,
+            len(text_b),
+            start + len(path_b) + len(text_b),
+            len(json_b),
+        )
+        self._hashes.append(_path_hash(path_b))
+        return start, f.tell()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def fileno(self) -> int:
+        return self._f.fileno()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """Write the entry index, hash table and footer."""
+        if self._closed:
+            return
+        self._closed = True
+        f = self._f
+
+        entries_off = f.tell()
+        f.write(self._entries)
+
+        # Load factor <= 0.5 keeps probe chains short.
+        slots = 1
+        while slots < 2 * max(1, self.count):
+            slots *= 2
+        table = bytearray(slots * _SLOT.size)
+        mask = slots - 1
+        for i, h in enumerate(self._hashes):
+            s = h & mask
+            while _SLOT.unpack_from(table, s * _SLOT.size)[1]:
+                s = (s + 1) & mask
+            _SLOT.pack_into(table, s * _SLOT.size, h, i + 1)
+
+        table_off = f.tell()
+        f.write(table)
+        f.write(_FOOTER.pack(MAGIC, STORE_VERSION, self.count, entries_off, table_off, slots))
+        f.close()
+
+    def abort(self) -> None:
+        """Close the file without an index or footer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._f.close()
+
+    def __enter__(self) -> "ResultStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_store(
+    documents: Iterable[Document],
+    out: Path,
+    on_write: Optional[Callable[[Document, Optional[int], Optional[int]], None]] = None,
+    writer: Optional[ResultStoreWriter] = None,
+) -> int:
+    """
+    Stream documents into a result store at `out` (or into `writer`, which
+    is then closed). `on_write(doc, start, end)` gets each record's byte
+    range, as with `export_pipeline.write_documents`. If `documents` raises,
+    the store is left without a footer.
+    """
+    with writer or ResultStoreWriter(out) as w:
+        for doc in documents:
+            start, end = w.write(doc)
+            if on_write is not None:
+                on_write(doc, start, end)
+    return w.count
+
+
+class ResultStore:
+    """
+    Read-only, mmap-backed view of a result store.
+
+    Nothing is loaded up front beyond the footer: `len()`, `path_of(i)`,
+    `text(i)` and `find(path)` read just the bytes they need from the
+    mapping, so random access stays O(1) for stores of any size. Views from
+    `text_view` must be released before the store is closed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file: cannot be mapped.
+            self._file.close()
+            raise ValueError(f"Not a result store: {path}") from None
+
+        mm = self._mm
+        if len(mm) < _HEADER.size + _FOOTER.size or mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a result store: {path}")
+        magic, version, count, entries_off, table_off, slots = _FOOTER.unpack_from(
+            mm, len(mm) - _FOOTER.size
+        )
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Result store {path} is incomplete (no index); was it closed?")
+        if version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported result store version {version} in {path}")
+
+        self._count = count
+        self._entries_off = entries_off
+        self._table_off = table_off
+        self._slots = slots
+
+    def close(self) -> None:
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            del self._mm
+        self._file.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int, int]:
+        if not 0 <= index < self._count:
+            raise IndexError("document index out of range")
+        return _ENTRY.unpack_from(self._mm, self._entries_off + index * _ENTRY.size)
+
+    # ---------- per-document access ----------
+
+    def path_of(self, index: int) -> str:
+        path_off, path_len, *_ = self._entry(index)
+        return self._mm[path_off : path_off + path_len].decode("utf-8")
+
+    def text_view(self, index: int) -> Optional[memoryview]:
+        """UTF-8 bytes of the document's raw_text, without copying."""
+        _, _, text_off, text_len, _, _ = self._entry(index)
+        if text_off == 0:
+            return None
+        return memoryview(self._mm)[text_off : text_off + text_len]
+
+    def text(self, index: int) -> Optional[str]:
+        _, _, text_off, text_len, _, _ = self._entry(index)
+        if text_off == 0:
+            return None
+        return self._mm[text_off : text_off + text_len].decode("utf-8")
+
+    def document(self, index: int) -> Document:
+        _, _, text_off, text_len, json_off, json_len = self._entry(index)
+        data = json.loads(self._mm[json_off : json_off + json_len])
+        if data.get("ocr") is not None:
+            data["ocr"]["raw_text"] = self._mm[text_off : text_off + text_len].decode("utf-8")
+        return Document.model_validate(data)
+
+    # ---------- lookup ----------
+
+    def find(self, path: str | Path) -> Optional[int]:
+        """Index of the document stored under `path`, or None."""
+        key = str(path).encode("utf-8")
+        h = _path_hash(key)
+        mask = self._slots - 1
+        s = h & mask
+        while True:
+            slot_h, entry = _SLOT.unpack_from(self._mm, self._table_off + s * _SLOT.size)
+            if entry == 0:
+                return None
+            if slot_h == h:
+                path_off, path_len, *_ = self._entry(entry - 1)
+                if self._mm[path_off : path_off + path_len] == key:
+                    return entry - 1
+            s = (s + 1) & mask
+
+    def get(self, path: str | Path) -> Optional[Document]:
+        index = self.find(path)
+        return None if index is None else self.document(index)
+
+    def paths(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self.path_of(i)
+
+    def __iter__(self) -> Iterator[Document]:
+        for i in range(self._count):
+            yield self.document(i)
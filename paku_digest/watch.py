@@ -0,0 +1,361 @@
+"""
+Long-running `watch` mode: keep engines warm in one process and OCR files
+as they appear or change under a directory.
+
+Change detection comes from a `ChangeSource`: file-system events through
+watchdog (inotify on Linux, FSEvents / ReadDirectoryChangesW elsewhere)
+when it is installed, otherwise a polling scan that stats every candidate
+and reports only what differs from the previous scan. Either way a
+changed file goes through a `Debouncer` and is only processed once its
+size and mtime have stayed put for the settle time, so files still being
+copied in are not OCR'd half-written.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, TextIO, Tuple, cast
+
+from .context import AppContext
+from .discovery import DiscoveryOptions, iter_images, matches
+from .index import ResultIndex
+from .manifest import DigestManifest
+from .metrics import REGISTRY
+from .models import Document
+from .ocr.router import RoutedEngine
+from .pipelines.digest_pipeline import digest_files
+from .pipelines.export_pipeline import DocumentWriter, ExportFormat, open_export_file
+from .preprocess import PreprocessOptions
+
+# (size, mtime_ns)
+FileState = Tuple[int, int]
+
+
+def _state(path: Path) -> Optional[FileState]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def watchdog_available() -> bool:
+    return importlib.util.find_spec("watchdog") is not None
+
+
+class PollingSource:
+    """
+    Change source that rescans the tree on every `changes()` call and
+    reports files that are new or whose size / mtime differ from the last
+    scan. Vanished files are forgotten.
+    """
+
+    def __init__(self, root: Path, options: Optional[DiscoveryOptions] = None) -> None:
+        self._root = root
+        self._options = options
+        self._seen: Dict[Path, FileState] = {}
+
+    def changes(self) -> Dict[Path, FileState]:
+        current: Dict[Path, FileState] = {}
+        changed: Dict[Path, FileState] = {}
+        for path in iter_images(self._root, self._options):
+            state = _state(path)
+            if state is None:
+                continue
+            current[path] = state
+            if self._seen.get(path) != state:
+                changed[path] = state
+        self._seen = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class EventSource:
+    """
+    Change source fed by watchdog events. The first `changes()` call
+    reports every existing file (one scan); later calls only stat the
+    paths events were raised for since the previous call.
+    """
+
+    def __init__(self, root: Path, options: Optional[DiscoveryOptions] = None) -> None:
+        from watchdog.events import FileSystemEventHandler  # type: ignore[import]
+        from watchdog.observers import Observer  # type: ignore[import]
+
+        self._root = root
+        self._options = options
+        self._dirty: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._initial = True
+        source = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event) -> None:  # noqa: ANN001
+                if event.event_type in ("deleted", "closed_no_write", "opened"):
+                    return
+                path = getattr(event, "dest_path", "") or event.src_path
+                source._mark(Path(os.fsdecode(path)), event.is_directory)
+
+        self._observer = Observer()
+        self._observer.schedule(
+            _Handler(),
+            str(root),
+            recursive=options is None or options.max_depth != 0,
+        )
+        self._observer.start()
+
+    def _mark(self, path: Path, is_directory: bool) -> None:
+        if is_directory:
+            # A directory moved in raises one event, not one per file.
+            found = [
+                p
+                for p in iter_images(path, self._options)
+                if matches(self._root, p, self._options)
+            ]
+        elif matches(self._root, path, self._options):
+            found = [path]
+        else:
+            return
+        with self._lock:
+            self._dirty.update(found)
+
+    def changes(self) -> Dict[Path, FileState]:
+        if self._initial:
+            self._initial = False
+            paths: Iterable[Path] = iter_images(self._root, self._options)
+        else:
+            with self._lock:
+                paths, self._dirty = self._dirty, set()
+        changed: Dict[Path, FileState] = {}
+        for path in paths:
+            state = _state(path)
+            if state is not None:
+                changed[path] = state
+        return changed
+
+    def close(self) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+
+ChangeSource = PollingSource | EventSource
+
+
+class Debouncer:
+    """
+    Holds changed files until their (size, mtime) has not moved for
+    `settle_s` seconds. Pending files are re-stat'ed on every `ready()`
+    call; a file that disappears is dropped.
+    """
+
+    def __init__(self, settle_s: float) -> None:
+        self._settle_s = settle_s
+        self._pending: Dict[Path, Tuple[FileState, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def observe(self, path: Path, state: FileState, now: float) -> None:
+        prev = self._pending.get(path)
+        if prev is None or prev[0] != state:
+            self._pending[path] = (state, now)
+
+    def ready(self, now: float) -> List[Tuple[Path, FileState]]:
+        out: List[Tuple[Path, FileState]] = []
+        for path, (state, since) in list(self._pending.items()):
+            current = _state(path)
+            if current is None:
+                del self._pending[path]
+            elif current != state:
+                self._pending[path] = (current, now)
+            elif now - since >= self._settle_s:
+                del self._pending[path]
+                out.append((path, state))
+        out.sort()
+        return out
+
+
+class WatchSink:
+    """
+    Where watch results go: appended to `out` (jsonl, csv or txt; stdout
+    when None) and/or the full-text result index. Each document is flushed
+    as soon as it is written.
+    """
+
+    def __init__(
+        self,
+        out: Optional[Path],
+        fmt: str,
+        index: Optional[ResultIndex] = None,
+    ) -> None:
+        self.out = out
+        self.fmt = fmt
+        self._index = index
+        self._stream: TextIO
+        export_fmt = cast(ExportFormat, fmt)  # DocumentWriter rejects the rest
+        if out is not None:
+            write_header = not out.exists() or out.stat().st_size == 0
+            self._stream = open_export_file(out, export_fmt, append=True)
+        else:
+            write_header = True
+            self._stream = sys.stdout
+        self._writer = DocumentWriter(self._stream, fmt=export_fmt, write_header=write_header)
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream
+
+    def write(self, doc: Document) -> Optional[dict]:
+        """Write `doc`; returns its location in `out` for the manifest."""
+        start = self._stream.tell() if self.out is not None else None
+        self._writer.write(doc)
+        if self._index is not None:
+            self._index.add(doc)
+        if self.out is None:
+            return None
+        return {"file": str(self.out), "offset": start, "end": self._stream.tell()}
+
+    def flush(self) -> None:
+        self._stream.flush()
+        if self._index is not None:
+            self._index.commit()
+
+    def close(self) -> None:
+        self._writer.close()
+        if self.out is not None:
+            self._stream.close()
+        if self._index is not None:
+            self._index.close()
+
+
+def run_watch(
+    root: Path,
+    sink: WatchSink,
+    ocr_engine_name: str | None = None,
+    workers: int | None = None,
+    use_cache: bool = True,
+    batch_size: int = 1,
+    discovery: Optional[DiscoveryOptions] = None,
+    preprocess: Optional[PreprocessOptions] = None,
+    pdf_dpi: int | None = None,
+    interval: float = 2.0,
+    settle_s: float = 2.0,
+    poll: bool = False,
+    use_manifest: bool = True,
+    stop: Optional[threading.Event] = None,
+    metrics_out: Optional[Path] = None,
+) -> int:
+    """
+    Watch `root` until `stop` is set (or KeyboardInterrupt), OCR'ing each
+    new or changed file once it has settled and writing it to `sink`.
+
+    - the engine is resolved once up front (for a strategy, every engine
+      it may route to is built), so model start-up is paid before the
+      first file arrives and never again
+    - changes come from watchdog events when available (unless `poll`),
+      otherwise from a scan every `interval` seconds
+    - with `use_manifest`, processed files are recorded in the input's
+      digest manifest, and files unchanged since an earlier run (or
+      earlier `watch`) are not OCR'd again after a restart
+    - with `metrics_out`, Prometheus metrics are rewritten there after each
+      batch (e.g. for node_exporter's textfile collector)
+
+    Returns the number of documents written.
+    """
+    ctx = AppContext.instance()
+    log = ctx.logger
+    stop = stop or threading.Event()
+
+    key = ocr_engine_name or ctx.config.default_ocr
+    started = time.perf_counter()
+    engine = ctx.resolve_engine(key, use_cache=use_cache)
+    if isinstance(engine, RoutedEngine):
+        # A strategy only builds a proxy; load the engines behind it.
+        loaded = engine.warm_up()
+        log.info(f"[watch] Strategy '{key}' loaded: {', '.join(loaded)}")
+    log.info(f"[watch] Engine '{key}' ready in {time.perf_counter() - started:.2f}s")
+    if metrics_out is not None:
+        REGISTRY.write(metrics_out)
+
+    manifest: Optional[DigestManifest] = None
+    skip = None
+    if use_manifest:
+        manifest = DigestManifest.for_input(ctx.config.manifest_dir, root)
+        plan = manifest.plan(
+            resume=False, incremental=True, out=sink.out, fmt=sink.fmt, log=log
+        )
+        skip = plan.skip
+        manifest.begin_run(plan, out=sink.out, fmt=sink.fmt, output_stream=sink.stream)
+
+    if poll or not watchdog_available():
+        source: ChangeSource = PollingSource(root, discovery)
+        log.info(f"[watch] Polling {root} every {interval:g}s")
+    else:
+        source = EventSource(root, discovery)
+        log.info(f"[watch] Watching {root} for file-system events")
+
+    debouncer = Debouncer(settle_s)
+    # State each file had when last processed (or found up to date).
+    done: Dict[Path, FileState] = {}
+    written = 0
+
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            for path, state in source.changes().items():
+                if done.get(path) != state:
+                    debouncer.observe(path, state, now)
+
+            batch: List[Path] = []
+            states: Dict[Path, FileState] = {}
+            for path, state in debouncer.ready(now):
+                first_seen = path not in done
+                done[path] = state
+                # The manifest only vouches for files as they were before
+                # this run; any change seen since is new work.
+                if first_seen and skip is not None and skip(path):
+                    continue
+                batch.append(path)
+                states[path] = state
+
+            if batch:
+                log.info(f"[watch] Processing {len(batch)} new or changed file(s)")
+                for doc in digest_files(
+                    batch,
+                    ocr_engine_name=key,
+                    workers=workers,
+                    use_cache=use_cache,
+                    batch_size=batch_size,
+                    preprocess=preprocess,
+                    pdf_dpi=pdf_dpi,
+                ):
+                    output = sink.write(doc)
+                    written += 1
+                    if manifest is not None:
+                        manifest.record(
+                            doc.path, output=output, stamp=states.get(doc.path)
+                        )
+                sink.flush()
+                if manifest is not None:
+                    manifest.sync()
+                if metrics_out is not None:
+                    REGISTRY.write(metrics_out)
+
+            # Re-check pending files quickly; idle otherwise.
+            wait = min(interval, settle_s / 2) if len(debouncer) else interval
+            stop.wait(wait)
+    except KeyboardInterrupt:
+        log.info("[watch] Interrupted")
+    finally:
+        source.close()
+        if manifest is not None:
+            manifest.close()
+        log.info(f"[watch] Stopped after writing {written} document(s)")
+
+    return written
@@ -0,0 +1,414 @@
+"""
+Coordinator-free work distribution for digest runs across hosts.
+
+A queue is a directory on shared storage:
+
+    <queue>/queue.sqlite3   lease table: one row per input file
+    <queue>/shards/<worker>.jsonl
+                            each worker's results, appended as it goes
+
+Workers pull batches of files by taking a time-limited lease on them in
+one SQLite transaction, keep renewing it while they work, and mark the
+files done after their results are durably in their shard. When a worker
+dies its leases run out and the files go back to whoever asks next, up to
+`max_attempts` times. `merge_shards` then writes every shard into one
+output, keeping a single result per path (a file finished by a worker
+whose lease had already expired can appear in two shards).
+
+SQLite needs working POSIX locks on the shared file system (local disks,
+NFSv4 and most cluster file systems are fine), and every host must see
+the input files under the same paths.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, cast
+
+from .context import AppContext
+from .models import Document
+from .pipelines.digest_pipeline import digest_files
+from .pipelines.export_pipeline import ExportFormat, open_export_file, write_documents
+from .preprocess import PreprocessOptions
+from .store import write_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY,
+    path        TEXT NOT NULL UNIQUE,
+    state       TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+TASK_STATES = ("pending", "leased", "done", "failed")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+@dataclass
+class Lease:
+    worker: str
+    tasks: List[Tuple[int, Path]]  # (task id, path)
+
+    @property
+    def paths(self) -> List[Path]:
+        return [p for _, p in self.tasks]
+
+
+class WorkQueue:
+    """
+    Lease table in `<queue_dir>/queue.sqlite3`.
+
+    Every state change is a short IMMEDIATE transaction, so any number of
+    processes on any number of hosts can call `lease`, `renew`, `complete`
+    and `fail` concurrently without a coordinator. A leased task whose
+    `lease_until` has passed counts as pending again.
+    """
+
+    DB_NAME = "queue.sqlite3"
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.dir = queue_dir
+        self._clock = clock
+        db = queue_dir / self.DB_NAME
+        if not db.exists():
+            raise FileNotFoundError(f"No work queue at {queue_dir}; create it with `queue init`.")
+        self._conn = _connect(db)
+        settings = dict(self._conn.execute("SELECT key, value FROM settings"))
+        self.lease_s = float(settings.get("lease_s", 300))
+        self.max_attempts = int(settings.get("max_attempts", 3))
+
+    @classmethod
+    def create(
+        cls,
+        queue_dir: Path,
+        lease_s: float = 300.0,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ) -> "WorkQueue":
+        """Create (or reopen) a queue; settings apply to every worker."""
+        if lease_s <= 0:
+            raise ValueError("lease_s must be > 0")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        queue_dir.mkdir(parents=True, exist_ok=True)
+        (queue_dir / "shards").mkdir(exist_ok=True)
+        conn = _connect(queue_dir / cls.DB_NAME)
+        try:
+            conn.executescript(_SCHEMA)
+            with _immediate(conn):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    [("lease_s", str(lease_s)), ("max_attempts", str(max_attempts))],
+                )
+        finally:
+            conn.close()
+        return cls(queue_dir, clock=clock)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def shards_dir(self) -> Path:
+        return self.dir / "shards"
+
+    # ---------- producers ----------
+
+    def enqueue(self, paths: Iterable[Path], chunk: int = 10_000) -> int:
+        """Add paths (absolute) not already queued; returns how many were new."""
+        added = 0
+        rows: List[Tuple[str]] = []
+
+        def flush() -> None:
+            nonlocal added
+            with _immediate(self._conn):
+                before = self._conn.total_changes
+                self._conn.executemany("INSERT OR IGNORE INTO tasks (path) VALUES (?)", rows)
+                added += self._conn.total_changes - before
+            rows.clear()
+
+        for p in paths:
+            rows.append((str(p.resolve()),))
+            if len(rows) >= chunk:
+                flush()
+        if rows:
+            flush()
+        return added
+
+    # ---------- workers ----------
+
+    def lease(self, worker: str, limit: int) -> Lease:
+        """
+        Take up to `limit` pending (or expired) tasks for `worker`. Tasks
+        that already used up `max_attempts` are marked failed instead.
+        """
+        now = self._clock()
+        conn = self._conn
+        with _immediate(conn):
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', worker = NULL, lease_until = NULL, "
+                "error = coalesce(error, 'lease expired') "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id, path FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.lease_s, task_id) for task_id, _ in rows],
+            )
+        return Lease(worker=worker, tasks=[(task_id, Path(p)) for task_id, p in rows])
+
+    def renew(self, lease: Lease) -> int:
+        """Extend the lease on tasks `lease.worker` still holds; returns how many."""
+        ids = [task_id for task_id, _ in lease.tasks]
+        return self._update(
+            "UPDATE tasks SET lease_until = ? "
+            "WHERE id = ? AND worker = ? AND state = 'leased'",
+            [(self._clock() + self.lease_s, i, lease.worker) for i in ids],
+        )
+
+    def complete(self, worker: str, task_ids: Iterable[int]) -> int:
+        """
+        Mark tasks done. Also applies when the lease expired meanwhile, as
+        long as no other worker has finished the task: the result is in
+        this worker's shard either way.
+        """
+        return self._update(
+            "UPDATE tasks SET state = 'done', worker = ?, lease_until = NULL, error = NULL "
+            "WHERE id = ? AND state != 'done'",
+            [(worker, i) for i in task_ids],
+        )
+
+    def fail(self, worker: str, task_id: int, error: str) -> None:
+        """Give a task back for another attempt, or fail it for good."""
+        self._update(
+            "UPDATE tasks SET "
+            "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_until = NULL, error = ? "
+            "WHERE id = ? AND worker = ? AND state = 'leased'",
+            [(self.max_attempts, error, task_id, worker)],
+        )
+
+    def _update(self, sql: str, params: List[tuple]) -> int:
+        with _immediate(self._conn):
+            before = self._conn.total_changes
+            self._conn.executemany(sql, params)
+            return self._conn.total_changes - before
+
+    # ---------- status ----------
+
+    def counts(self) -> Dict[str, int]:
+        """Tasks per state; expired leases count as pending."""
+        now = self._clock()
+        counts = {state: 0 for state in TASK_STATES}
+        for state, n in self._conn.execute(
+            "SELECT CASE WHEN state = 'leased' AND lease_until < ? THEN 'pending' "
+            "ELSE state END, count(*) FROM tasks GROUP BY 1",
+            (now,),
+        ):
+            counts[state] = n
+        return counts
+
+    def failures(self, limit: int = 100) -> List[Tuple[str, Optional[str]]]:
+        return self._conn.execute(
+            "SELECT path, error FROM tasks WHERE state = 'failed' ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+
+def _connect(db: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db), timeout=60.0, isolation_level=None)
+    # Rollback journal rather than WAL: WAL needs shared memory, which
+    # processes on different hosts do not have.
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA synchronous=FULL")
+    return conn
+
+
+class _immediate:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error): takes the write lock up front."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self._conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+# ---------- shards ----------
+
+
+def _open_shard(path: Path) -> TextIO:
+    """Open a shard for appending, first cutting off a torn last line."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        with path.open("r+b") as f:
+            data_end = f.seek(0, os.SEEK_END)
+            if data_end:
+                f.seek(max(0, data_end - 1))
+                if f.read(1) != b"\n":
+                    f.seek(0)
+                    keep = f.read().rfind(b"\n") + 1
+                    f.truncate(keep)
+    return open_export_file(path, "jsonl", append=True)
+
+
+class _Heartbeat:
+    """Renews a lease every third of the lease time until stopped."""
+
+    def __init__(self, queue_dir: Path, lease: Lease, lease_s: float, log) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(queue_dir, lease, lease_s / 3, log), daemon=True
+        )
+
+    def _run(self, queue_dir: Path, lease: Lease, every: float, log) -> None:
+        # A separate connection: sqlite3 connections stay in their thread.
+        with WorkQueue(queue_dir) as q:
+            while not self._stop.wait(every):
+                try:
+                    q.renew(lease)
+                except sqlite3.Error as exc:
+                    log.warning(f"[queue] Could not renew lease: {exc}")
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(
+    queue_dir: Path,
+    worker_id: Optional[str] = None,
+    ocr_engine_name: str | None = None,
+    workers: int | None = None,
+    use_cache: bool = True,
+    batch_size: int = 1,
+    lease_size: int = 16,
+    preprocess: Optional[PreprocessOptions] = None,
+    pdf_dpi: int | None = None,
+    idle_wait_s: float = 5.0,
+) -> int:
+    """
+    Pull leases of `lease_size` files from the queue and digest them with
+    warm engines (see `digest_files`), appending results to this worker's
+    shard, until no work is left. While other workers still hold leases
+    this one waits, so it can take over their files if they die.
+
+    Returns the number of documents this worker wrote.
+    """
+    log = AppContext.instance().logger
+    worker = worker_id or default_worker_id()
+    written = 0
+
+    with WorkQueue(queue_dir) as q:
+        shard_path = q.shards_dir / f"{worker}.jsonl"
+        log.info(f"[queue] Worker {worker} writing to {shard_path}")
+        with _open_shard(shard_path) as shard:
+            while True:
+                lease = q.lease(worker, lease_size)
+                if not lease.tasks:
+                    counts = q.counts()
+                    if counts["leased"] == 0 and counts["pending"] == 0:
+                        break
+                    # Others are busy; their files come back if they die.
+                    time.sleep(min(idle_wait_s, q.lease_s))
+                    continue
+
+                log.info(f"[queue] Worker {worker} leased {len(lease.tasks)} file(s)")
+                ids = {str(p): task_id for task_id, p in lease.tasks}
+                finished: List[int] = []
+                with _Heartbeat(queue_dir, lease, q.lease_s, log):
+                    docs = digest_files(
+                        lease.paths,
+                        ocr_engine_name=ocr_engine_name,
+                        workers=workers,
+                        use_cache=use_cache,
+                        batch_size=batch_size,
+                        preprocess=preprocess,
+                        pdf_dpi=pdf_dpi,
+                    )
+                    for doc in docs:
+                        write_documents([doc], fmt="jsonl", stream=shard)
+                        finished.append(ids.pop(str(doc.path)))
+                        written += 1
+
+                # Results must be durable before the queue forgets the files.
+                shard.flush()
+                os.fsync(shard.fileno())
+                q.complete(worker, finished)
+                for path, task_id in ids.items():
+                    q.fail(worker, task_id, "OCR failed (see worker log)")
+                    log.warning(f"[queue] {path} failed; returned to the queue")
+
+    log.info(f"[queue] Worker {worker} done after {written} document(s)")
+    return written
+
+
+def iter_shard_documents(queue_dir: Path) -> Iterator[Document]:
+    """
+    Documents from every shard, one per path (the first one found). Torn
+    trailing lines of crashed workers are skipped.
+    """
+    seen = set()
+    for shard in sorted((queue_dir / "shards").glob("*.jsonl")):
+        with shard.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                doc = Document.model_validate_json(line)
+                key = str(doc.path)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield doc
+
+
+def merge_shards(queue_dir: Path, out: Path, fmt: str = "jsonl") -> int:
+    """Write all shards into one output in `fmt` (any digest format, incl. bin)."""
+    docs = iter_shard_documents(queue_dir)
+    if fmt == "bin":
+        return write_store(docs, out)
+    export_fmt = cast(ExportFormat, fmt)  # checked by the CLI
+    with open_export_file(out, export_fmt) as f:
+        return write_documents(docs, fmt=export_fmt, stream=f)
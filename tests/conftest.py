@@ -0,0 +1,13 @@
+from pathlib import Path
+
+import pytest
+
+from paku_digest.context import AppContext
+
+
+@pytest.fixture
+def fresh_context(tmp_path: Path, monkeypatch):
+    """An AppContext of its own, with its workdir under `tmp_path`."""
+    monkeypatch.setenv("PAKU_WORKDIR", str(tmp_path / "work"))
+    monkeypatch.setattr(AppContext, "_instance", None)
+    yield AppContext.instance()
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from paku_digest.context import AppContext
+from paku_digest.pipelines import benchmark_pipeline
+from paku_digest.pipelines.benchmark_pipeline import (
+    BENCHMARK_SCHEMA,
+    BENCHMARK_SCHEMA_VERSION,
+    _percentile,
+    run_benchmark,
+)
+
+
+def test_percentile_interpolates():
+    values = [10.0, 20.0, 30.0, 40.0]
+    assert _percentile(values, 0) == 10.0
+    assert _percentile(values, 50) == 25.0
+    assert _percentile(values, 100) == 40.0
+    assert _percentile([], 90) == 0.0
+
+
+def test_benchmark_repeats_and_reports_schema(tmp_path: Path):
+    for i in range(3):
+        (tmp_path / f"img_{i}.png").write_bytes(b"x")
+
+    result = run_benchmark(tmp_path, engine_names=["stub"], warmup=2, repeat=4)
+
+    assert result["schema"] == BENCHMARK_SCHEMA
+    assert result["schema_version"] == BENCHMARK_SCHEMA_VERSION
+    assert result["settings"] == {"warmup": 2, "repeat": 4, "cache": False}
+
+    (stub,) = result["engines"]
+    assert len(stub["runs"]) == 12
+    assert stub["ok_count"] == 12
+    lat = stub["latency_ms"]
+    assert lat["min"] <= lat["p50"] <= lat["p90"] <= lat["p99"] <= lat["max"]
+    assert stub["throughput_ips"] > 0
+    assert stub["peak_rss_bytes"] is None or stub["peak_rss_bytes"] > 0
+
+
+def test_each_engine_is_built_inside_its_peak_rss_window(tmp_path: Path, monkeypatch):
+    (tmp_path / "img.png").write_bytes(b"x")
+    ctx = AppContext.instance()
+    events = []
+    get_ocr = ctx.get_ocr
+
+    def building(name):
+        events.append(("build", name))
+        return get_ocr(name)
+
+    monkeypatch.setattr(ctx, "get_ocr", building)
+    monkeypatch.setattr(
+        benchmark_pipeline, "_reset_peak_rss", lambda: events.append(("reset", None)) or True
+    )
+    result = run_benchmark(tmp_path, engine_names=["stub"], warmup=0)
+
+    assert events == [("reset", None), ("build", "stub")]
+    assert result["engines"][0]["peak_rss_scope"] == "engine"
+
+
+def test_benchmark_rejects_bad_repeat(tmp_path: Path):
+    with pytest.raises(ValueError):
+        run_benchmark(tmp_path, repeat=0)
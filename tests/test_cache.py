@@ -0,0 +1,159 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from paku_digest.cache import OcrResultCache, cached_extract, cached_extract_batch
+from paku_digest.models import OcrResult
+from paku_digest.ocr.base import OCREngine
+
+
+class CountingEngine(OCREngine):
+    def __init__(self, lang: str = "en") -> None:
+        self.lang = lang
+        self.calls = 0
+        self.batches = []
+
+    def name(self) -> str:
+        return "counting"
+
+    def cache_params(self) -> dict:
+        return {"lang": self.lang}
+
+    def extract_batch(self, paths):
+        self.batches.append(list(paths))
+        return super().extract_batch(paths)
+
+    def extract(self, path: Path) -> OcrResult:
+        self.calls += 1
+        return OcrResult(
+            engine=self.name(),
+            raw_text=path.read_bytes().decode("utf-8"),
+            meta={"source": str(path)},
+        )
+
+
+def test_cache_hit_skips_engine_and_rebinds_source(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = CountingEngine()
+
+    a = tmp_path / "a.png"
+    b = tmp_path / "b.png"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+
+    first = cached_extract(engine, a, cache)
+    second = cached_extract(engine, b, cache)
+
+    assert engine.calls == 1
+    assert second.raw_text == first.raw_text
+    assert second.meta["source"] == str(b)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.writes) == (1, 1, 1)
+
+
+def test_cache_key_depends_on_engine_params(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    img = tmp_path / "a.png"
+    img.write_bytes(b"text")
+
+    assert cache.key_for(img, CountingEngine("en")) != cache.key_for(
+        img, CountingEngine("it")
+    )
+
+
+def test_cache_prune_evicts_least_recently_used(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = CountingEngine()
+
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"{i}.png"
+        p.write_bytes(f"text-{i}".encode())
+        cached_extract(engine, p, cache)
+        paths.append(p)
+
+    entries, size = cache.usage()
+    assert entries == 4
+
+    removed = cache.prune(max_bytes=size // 2)
+    assert removed >= 2
+    assert cache.usage()[1] <= size // 2
+
+    cache.flush_stats()
+    assert cache.persisted_stats().evictions == removed
+
+    cache.clear()
+    assert cache.usage() == (0, 0)
+
+
+def test_cache_prune_keeps_recently_hit_entries(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = CountingEngine()
+
+    old = tmp_path / "old.png"
+    new = tmp_path / "new.png"
+    old.write_bytes(b"old")
+    new.write_bytes(b"new")
+    cached_extract(engine, old, cache)
+    cached_extract(engine, new, cache)
+
+    old_entry = cache._entry_path(cache.key_for(old, engine))
+    new_entry = cache._entry_path(cache.key_for(new, engine))
+    os.utime(old_entry, (1_000, 1_000))
+    os.utime(new_entry, (2_000, 2_000))
+
+    # A hit refreshes the access time, making "old" the most recent entry.
+    cached_extract(engine, old, cache)
+    cache.prune(max_bytes=int(old_entry.stat().st_size * 1.5))
+
+    assert old_entry.exists()
+    assert not new_entry.exists()
+
+
+def test_overwriting_an_entry_does_not_inflate_usage(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    result = OcrResult(engine="counting", raw_text="x" * 100)
+    cache.put("ab" * 32, result)
+    _, size = cache.usage()
+
+    for _ in range(5):
+        cache.put("ab" * 32, result)
+    with cache._lock:
+        tracked = cache._current_bytes_locked()
+    assert tracked == size == cache.usage()[1]
+
+
+def test_cached_extract_batch_only_sends_misses(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = CountingEngine()
+
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.png"
+        p.write_bytes(f"text-{i}".encode())
+        paths.append(p)
+
+    cached_extract(engine, paths[1], cache)
+    results = cached_extract_batch(engine, paths, cache)
+
+    assert engine.batches == [[paths[0], paths[2]]]
+    assert [r.raw_text for r in results] == ["text-0", "text-1", "text-2"]
+
+
+def test_short_batch_raises_instead_of_dropping_images(tmp_path: Path):
+    class ShortEngine(CountingEngine):
+        def extract_batch(self, paths):
+            return super().extract_batch(paths)[:-1]
+
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    paths = []
+    for i in range(2):
+        p = tmp_path / f"{i}.png"
+        p.write_bytes(f"text-{i}".encode())
+        paths.append(p)
+
+    with pytest.raises(RuntimeError, match="1 results for 2 images"):
+        cached_extract_batch(ShortEngine(), paths, cache)
+    # Nothing half-finished was cached.
+    assert cached_extract_batch(CountingEngine(), paths, cache)[1].raw_text == "text-1"
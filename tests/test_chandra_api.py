@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from paku_digest.config import AppConfig
+from paku_digest.ocr.chandra_api import IMAGE_SEPARATOR, ChandraAPIOCREngine
+
+pytest.importorskip("httpx")
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """Local stand-in for an OpenAI-compatible /v1/chat/completions API."""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.client_ports = set()
+        self.images_per_request = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        assert self.path == "/v1/chat/completions"
+        assert self.headers["Authorization"] == "Bearer secret"
+
+        images = [c for c in body["messages"][0]["content"] if c["type"] == "image_url"]
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.client_ports.add(self.client_address[1])
+            server.images_per_request.append(len(images))
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        texts = [f"text {len(img['image_url']['url'])}" for img in images]
+        payload = json.dumps(
+            {"choices": [{"message": {"content": f"\n{IMAGE_SEPARATOR}\n".join(texts)}}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def chat_server():
+    server = FakeChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _engine(server, **overrides) -> ChandraAPIOCREngine:
+    cfg = AppConfig(
+        env="test",
+        log_level="INFO",
+        default_ocr="stub",
+        workdir=Path("."),
+        paddle_lang="en",
+        chandra_api_url=server.url,
+        chandra_api_key="secret",
+        **overrides,
+    )
+    return ChandraAPIOCREngine(config=cfg, logger=logging.getLogger("test"))
+
+
+def _images(tmp_path: Path, count: int):
+    paths = []
+    for i in range(count):
+        p = tmp_path / f"{i}.png"
+        p.write_bytes(b"x" * (3 * (i + 1)))
+        paths.append(p)
+    return paths
+
+
+def test_extract_reuses_keep_alive_connection(chat_server, tmp_path: Path):
+    engine = _engine(chat_server)
+    try:
+        results = [engine.extract(p) for p in _images(tmp_path, 5)]
+    finally:
+        engine.close()
+
+    assert [r.engine for r in results] == ["chandra-api"] * 5
+    assert results[0].meta["source"].endswith("0.png")
+    assert chat_server.requests == 5
+    assert len(chat_server.client_ports) == 1
+
+
+def test_inflight_requests_are_capped(chat_server, tmp_path: Path):
+    chat_server.delay = 0.05
+    engine = _engine(chat_server, chandra_max_inflight=2)
+    try:
+        results = engine.extract_batch(_images(tmp_path, 8))
+    finally:
+        engine.close()
+
+    assert len(results) == 8
+    assert chat_server.max_in_flight == 2
+
+
+def test_extract_batch_packs_images_per_request(chat_server, tmp_path: Path):
+    engine = _engine(chat_server, chandra_images_per_request=3)
+    paths = _images(tmp_path, 7)
+    try:
+        results = engine.extract_batch(paths)
+    finally:
+        engine.close()
+
+    assert sorted(chat_server.images_per_request) == [1, 3, 3]
+    # Each result maps back to its own image (data URL length grows with size).
+    assert len({r.raw_text for r in results}) == 7
+    assert [r.meta["source"] for r in results] == [str(p) for p in paths]
@@ -0,0 +1,108 @@
+import logging
+import random
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from paku_digest.cli import app
+from paku_digest.dedup import DuplicateFilter, HammingIndex, fingerprint
+from paku_digest.discovery import iter_images
+from paku_digest.models import Document, OcrResult
+from paku_digest.pipelines.digest_pipeline import run_digest
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def _frame(seed: int, caption: str = "") -> "Image.Image":
+    rng = random.Random(seed)
+    img = Image.new("RGB", (640, 360))
+    draw = ImageDraw.Draw(img)
+    for _ in range(30):
+        x, y = rng.randrange(640), rng.randrange(360)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + rng.randrange(40, 200), y + rng.randrange(40, 200)), fill=color)
+    if caption:
+        draw.rectangle((100, 300, 540, 340), fill="black")
+        draw.text((120, 310), caption, fill="white")
+    return img
+
+
+@pytest.fixture
+def frames(tmp_path: Path) -> Path:
+    root = tmp_path / "frames"
+    root.mkdir()
+    _frame(1, "Where are you going?").save(root / "a.png")
+    # A re-upload: downscaled and recompressed.
+    _frame(1, "Where are you going?").resize((480, 270)).save(root / "a_copy.jpg", quality=70)
+    # Same scene, different subtitle.
+    _frame(1, "Nowhere, I said.").save(root / "b.png")
+    _frame(2).save(root / "c.png")
+    return root
+
+
+def test_index_matches_brute_force():
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(200)]
+    # Near copies of a few hashes, so there is something to find.
+    hashes = base + [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in base[:50]]
+    for radius in (0, 2, 5):
+        index = HammingIndex(radius)
+        for i, h in enumerate(hashes):
+            index.add(i, h)
+        for q in hashes[::7]:
+            expected = sorted(
+                (i, (h ^ q).bit_count()) for i, h in enumerate(hashes) if (h ^ q).bit_count() <= radius
+            )
+            assert sorted(index.near(q)) == expected
+
+
+def test_index_remove():
+    index = HammingIndex(3)
+    index.add("a", 0b1011)
+    index.add("b", 0b1010)
+    index.remove("a")
+    assert index.near(0b1011) == [("b", 1)]
+    assert len(index) == 1
+
+
+def test_fingerprint_tells_reuploads_from_new_captions(frames: Path):
+    a, copy, b, c = (fingerprint(frames / n) for n in ("a.png", "a_copy.jpg", "b.png", "c.png"))
+    assert a.distance(copy) <= 4 and a.cell_diff(copy) <= 20
+    assert a.cell_diff(b) > 20
+    assert a.distance(c) > 4
+
+
+def test_digest_copies_result_to_duplicates(fresh_context, frames: Path):
+    docs = {d.path.name: d for d in run_digest(frames, ocr_engine_name="stub", dedup_distance=4)}
+
+    assert set(docs) == {"a.png", "a_copy.jpg", "b.png", "c.png"}
+    # Whichever of the pair is discovered first is OCRed.
+    rep, dup = [p.name for p in iter_images(frames) if p.name.startswith("a")]
+    copy = docs[dup].ocr
+    assert copy.raw_text == docs[rep].ocr.raw_text
+    assert copy.meta["near_duplicate"]["of"] == str(frames / rep)
+    assert copy.meta["path"] == str(frames / dup)
+    for name in (rep, "b.png", "c.png"):
+        assert "near_duplicate" not in docs[name].ocr.meta
+
+
+def test_failed_representative_leaves_duplicates_to_ocr(frames: Path):
+    dedup = DuplicateFilter(4, logging.getLogger("paku-digest-test"))
+    units = list(dedup.units([frames / "a.png", frames / "a_copy.jpg", frames / "c.png"]))
+    assert units == [frames / "a.png", frames / "c.png"]
+
+    ok = Document(path=frames / "c.png", ocr=OcrResult(engine="t", raw_text="c"))
+    assert [d.path for d in dedup.documents([ok])] == [frames / "c.png"]
+    assert dedup.leftovers() == [frames / "a_copy.jpg"]
+
+
+def test_digest_dedup_option(fresh_context, frames: Path, tmp_path: Path):
+    out = tmp_path / "out.jsonl"
+    result = CliRunner().invoke(
+        app,
+        ["digest", str(frames), "--ocr", "stub", "--dedup", "-f", "jsonl", "--out", str(out)],
+    )
+    assert result.exit_code == 0, result.output
+    assert out.read_text().count("near_duplicate") == 1
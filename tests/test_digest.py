@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from paku_digest.cli import app
+from paku_digest.pipelines.digest_pipeline import iter_digest, run_digest
+
+
+def _make_images(root: Path, count: int) -> None:
+    for i in range(count):
+        (root / f"img_{i}.png").write_bytes(f"fake-{i}".encode())
+
+
+def test_iter_digest_streams_documents(tmp_path: Path):
+    _make_images(tmp_path, 3)
+
+    it = iter_digest(input_path=tmp_path, ocr_engine_name="stub")
+    first = next(it)
+    assert first.ocr is not None
+    assert len(list(it)) == 2
+
+
+def test_digest_process_executor_matches_threads(tmp_path: Path):
+    _make_images(tmp_path, 6)
+
+    threaded = run_digest(
+        input_path=tmp_path, ocr_engine_name="stub", workers=2, executor="thread"
+    )
+    processed = run_digest(
+        input_path=tmp_path, ocr_engine_name="stub", workers=2, executor="process"
+    )
+
+    def texts(docs):
+        return sorted(d.ocr.raw_text for d in docs)
+
+    assert len(processed) == 6
+    assert texts(processed) == texts(threaded)
+
+
+def test_digest_batches_paths(tmp_path: Path):
+    _make_images(tmp_path, 5)
+
+    sequential = run_digest(input_path=tmp_path, ocr_engine_name="stub", batch_size=2)
+    threaded = run_digest(
+        input_path=tmp_path, ocr_engine_name="stub", workers=2, batch_size=2
+    )
+
+    assert len(sequential) == 5
+    assert sorted(d.path.name for d in threaded) == sorted(d.path.name for d in sequential)
+
+
+def test_process_workers_report_routing_stats(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(4):
+        (images / f"img_{i}.png").write_bytes(b"x")
+
+    run_digest(input_path=images, ocr_engine_name="light", workers=2, executor="process")
+
+    assert fresh_context.router.stats()["stub"]["calls"] == 4
+    saved = json.loads(fresh_context.config.router_stats_path.read_text())
+    assert saved["engines"]["stub"]["calls"] == 4
+
+
+def test_unknown_engine_fails_before_process_pool_starts(tmp_path: Path):
+    _make_images(tmp_path, 2)
+
+    with pytest.raises(ValueError, match="Unknown OCR engine or strategy"):
+        run_digest(input_path=tmp_path, ocr_engine_name="nope", workers=2, executor="process")
+
+
+def test_unknown_engine_leaves_output_untouched(tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    _make_images(images, 2)
+    out = tmp_path / "o.jsonl"
+    out.write_text("previous run\n")
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "digest", str(images), "--ocr", "nope", "--executor", "process",
+            "--workers", "2", "-f", "jsonl", "--out", str(out),
+        ],
+    )
+    assert result.exit_code != 0
+    assert "Unknown OCR engine or strategy" in result.output
+    assert out.read_text() == "previous run\n"
@@ -0,0 +1,120 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from paku_digest.discovery import DiscoveryOptions, iter_images, matches
+
+
+def _tree(root: Path) -> None:
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "skipme").mkdir()
+    for rel in [
+        "top.png",
+        "notes.txt",
+        "a/one.JPG",
+        "a/one.json",
+        "a/b/deep.tif",
+        "skipme/hidden.png",
+    ]:
+        (root / rel).write_bytes(b"x")
+
+
+def _rel(root: Path, paths) -> set:
+    return {p.relative_to(root).as_posix() for p in paths}
+
+
+def test_iter_images_filters_by_extension(tmp_path: Path):
+    _tree(tmp_path)
+
+    found = _rel(tmp_path, iter_images(tmp_path))
+
+    assert found == {"top.png", "a/one.JPG", "a/b/deep.tif", "skipme/hidden.png"}
+
+
+def test_iter_images_include_exclude_and_depth(tmp_path: Path):
+    _tree(tmp_path)
+
+    opts = DiscoveryOptions(exclude=["skipme"], include=["*.png", "a/*.JPG"])
+    assert _rel(tmp_path, iter_images(tmp_path, opts)) == {"top.png", "a/one.JPG"}
+
+    opts = DiscoveryOptions(max_depth=1)
+    assert _rel(tmp_path, iter_images(tmp_path, opts)) == {
+        "top.png",
+        "a/one.JPG",
+        "skipme/hidden.png",
+    }
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks unsupported")
+def test_iter_images_symlink_policies(tmp_path: Path):
+    _tree(tmp_path)
+    (tmp_path / "link.png").symlink_to(tmp_path / "top.png")
+    (tmp_path / "a" / "loop").symlink_to(tmp_path, target_is_directory=True)
+
+    skip = _rel(tmp_path, iter_images(tmp_path, DiscoveryOptions(symlinks="skip")))
+    files = _rel(tmp_path, iter_images(tmp_path, DiscoveryOptions(symlinks="files")))
+    follow = list(iter_images(tmp_path, DiscoveryOptions(symlinks="follow")))
+
+    assert "link.png" not in skip
+    assert "link.png" in files
+    assert not any(p.startswith("a/loop/") for p in files)
+    # The loop back to the root is entered at most once.
+    assert len(follow) == len(files)
+
+
+def test_iter_images_parallel_walk_matches_sequential(tmp_path: Path):
+    for d in range(8):
+        sub = tmp_path / f"d{d}" / "inner"
+        sub.mkdir(parents=True)
+        for i in range(5):
+            (sub / f"{i}.png").write_bytes(b"x")
+            (sub / f"{i}.txt").write_bytes(b"x")
+
+    sequential = set(iter_images(tmp_path))
+    parallel = list(iter_images(tmp_path, DiscoveryOptions(workers=4)))
+
+    assert len(parallel) == len(set(parallel)) == 40
+    assert set(parallel) == sequential
+
+    # Closing early stops the walker threads.
+    it = iter_images(tmp_path, DiscoveryOptions(workers=4))
+    next(it)
+    it.close()
+
+
+def test_iter_images_parallel_walk_raises_scan_errors(tmp_path: Path, monkeypatch):
+    from paku_digest import discovery
+
+    for d in range(4):
+        (tmp_path / f"d{d}").mkdir()
+        (tmp_path / f"d{d}" / "x.png").write_bytes(b"x")
+
+    real_scan = discovery._Scanner.scan
+
+    def scan(self, item):
+        if item[1] == "d2/":
+            raise RuntimeError("scan failed")
+        return real_scan(self, item)
+
+    monkeypatch.setattr(discovery._Scanner, "scan", scan)
+    with pytest.raises(RuntimeError, match="scan failed"):
+        list(iter_images(tmp_path, DiscoveryOptions(workers=4)))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        DiscoveryOptions(),
+        DiscoveryOptions(exclude=("skipme",)),
+        DiscoveryOptions(include=("*.png",), max_depth=1),
+        DiscoveryOptions(exclude=("a/b",), max_depth=2),
+    ],
+)
+def test_matches_agrees_with_walk(tmp_path: Path, options: DiscoveryOptions):
+    _tree(tmp_path)
+
+    every_file = [p for p in tmp_path.rglob("*") if p.is_file()]
+    assert {p for p in every_file if matches(tmp_path, p, options)} == set(
+        iter_images(tmp_path, options)
+    )
@@ -1,4 +1,8 @@
+import logging
 from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
 
 from paku_digest.context import AppContext
 from paku_digest.models import Document, OcrResult
@@ -39,3 +43,53 @@ def test_digest_pipeline_runs_with_stub(tmp_path: Path):
     assert doc.path.name == "dummy.png"
     assert doc.ocr is not None
     assert doc.ocr.engine == "stub"
+
+
+class FakeTextSystem:
+    """Stands in for PaddleOCR's TextSystem: image N holds N text lines."""
+
+    use_angle_cls = True
+    drop_score = 0.5
+
+    def __init__(self) -> None:
+        self.recognized = []
+
+    def text_detector(self, image):
+        import numpy as np
+
+        lines = int(image[0, 0, 0])
+        boxes = [
+            [[10, 20 * i + 2], [90, 20 * i + 2], [90, 20 * i + 14], [10, 20 * i + 14]]
+            for i in reversed(range(lines))  # unsorted, as the detector returns them
+        ]
+        return (np.array(boxes, dtype="float32") if boxes else None), 0.0
+
+    def text_classifier(self, crops):
+        return crops, [("0", 1.0)] * len(crops), 0.0
+
+    def text_recognizer(self, crops):
+        self.recognized.append(len(crops))
+        # Each crop reads as "<image value>"; the 3rd image's lines are unsure.
+        return [(str(int(c[0, 0, 0])), 0.1 if c[0, 0, 0] == 3 else 0.9) for c in crops], 0.0
+
+
+def test_paddle_batch_recognizes_all_crops_together():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    from paku_digest.ocr.paddle import PaddleOCREngine
+
+    engine = PaddleOCREngine.__new__(PaddleOCREngine)
+    engine._config = SimpleNamespace(paddle_lang="en")
+    engine._logger = logging.getLogger("test")
+    engine._ocr = FakeTextSystem()
+
+    images = [np.full((100, 100, 3), n, dtype="uint8") for n in (2, 0, 3, 1)]
+    paths = [Path(f"{n}.png") for n in range(4)]
+    results = engine.extract_image_batch(images, paths)
+
+    # One recognizer call for the crops of every image in the batch.
+    assert engine._ocr.recognized == [6]
+    assert [r.raw_text for r in results] == ["2\n2", "", "", "1"]
+    assert [r.meta["source"] for r in results] == [str(p) for p in paths]
+    # Lines come out top to bottom.
+    assert [b.bbox.y for b in results[0].blocks] == [2, 22]
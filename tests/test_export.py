@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from paku_digest.models import Document, OcrResult
+from paku_digest.pipelines.export_pipeline import (
+    DocumentWriter,
+    export_documents_to_file,
+    export_documents_to_string,
+)
+
+
+def _docs():
+    return [
+        Document(path=Path("a.png"), ocr=OcrResult(engine="stub", raw_text="line one\nline two")),
+        Document(path=Path("b.png"), ocr=OcrResult(engine="stub", raw_text="é", language="it")),
+        Document(path=Path("c.png")),
+    ]
+
+
+def test_streamed_json_matches_pretty_array():
+    docs = _docs()
+    expected = json.dumps(
+        [d.model_dump(mode="json") for d in docs], ensure_ascii=False, indent=2
+    )
+    assert export_documents_to_string(docs, fmt="json") == expected
+    assert export_documents_to_string([], fmt="json") == "[]"
+
+
+def test_streamed_formats_round_trip():
+    docs = _docs()
+    jsonl = export_documents_to_string(docs, fmt="jsonl")
+    assert [json.loads(line)["path"] for line in jsonl.splitlines()] == [
+        "a.png",
+        "b.png",
+        "c.png",
+    ]
+    assert export_documents_to_string(docs, fmt="txt") == "line one line two\né\n"
+    csv_text = export_documents_to_string(docs, fmt="csv")
+    assert csv_text.startswith("path,engine,language,raw_text\r\n")
+    assert csv_text.count("\r\n") == 4
+
+
+def test_writer_flushes_each_document(tmp_path: Path):
+    out = tmp_path / "out.jsonl"
+    with out.open("w", encoding="utf-8") as f:
+        writer = DocumentWriter(f, fmt="jsonl")
+        writer.write(_docs()[0])
+        # Visible on disk before the writer is closed.
+        assert json.loads(out.read_text(encoding="utf-8"))["path"] == "a.png"
+        writer.close()
+
+    export_documents_to_file(_docs(), fmt="json", out_path=tmp_path / "x" / "out.json")
+    assert len(json.loads((tmp_path / "x" / "out.json").read_text(encoding="utf-8"))) == 3
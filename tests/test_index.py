@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from paku_digest.cli import app
+from paku_digest.index import ResultIndex
+from paku_digest.models import Document, OcrResult
+
+
+def _doc(path: Path, text: str) -> Document:
+    return Document(path=path, ocr=OcrResult(engine="stub", raw_text=text, language="en"))
+
+
+def test_search_ranks_and_snippets(tmp_path: Path):
+    with ResultIndex(tmp_path / "index.sqlite3") as index:
+        index.add(_doc(tmp_path / "a.png", "Quarterly report, draft"))
+        index.add(_doc(tmp_path / "b.png", "Settings screen: Quarterly Report"))
+        index.add(_doc(tmp_path / "c.png", "Nothing to see here"))
+        index.add(Document(path=tmp_path / "d.png"))
+        index.commit()
+
+        assert len(index) == 4
+        hits = index.search('"quarterly report"')
+        assert {Path(h.path).name for h in hits} == {"a.png", "b.png"}
+        assert all("[" in h.snippet for h in hits)
+        assert index.search("quart*", limit=1)[0].engine == "stub"
+        assert index.search("report NOT draft")[0].path == str(tmp_path / "b.png")
+        assert index.search("missing") == []
+
+        with pytest.raises(ValueError, match="Invalid search query"):
+            index.search('"unbalanced')
+
+
+def test_reindexing_a_path_replaces_it(tmp_path: Path):
+    with ResultIndex(tmp_path / "index.sqlite3") as index:
+        index.add(_doc(tmp_path / "a.png", "old words"))
+        index.commit()
+        index.add(_doc(tmp_path / "a.png", "new words"))
+        index.commit()
+
+        assert len(index) == 1
+        assert index.search("old") == []
+        assert index.get(tmp_path / "a.png").ocr.raw_text == "new words"
+
+
+def test_rows_are_committed_in_batches(tmp_path: Path):
+    db = tmp_path / "index.sqlite3"
+    writer = ResultIndex(db, commit_every=3, commit_interval=3600)
+    reader = ResultIndex(db)
+    try:
+        for i in range(4):
+            writer.add(_doc(tmp_path / f"{i}.png", f"text {i}"))
+        # The first three went in one transaction; the fourth is pending.
+        assert len(reader) == 3
+    finally:
+        writer.close()
+    assert len(reader) == 4
+    reader.close()
+
+
+def test_digest_index_then_search(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for name in ("a.png", "b.png"):
+        (images / name).write_bytes(name.encode())
+
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["digest", str(images), "--ocr", "stub", "--index", "--out", str(tmp_path / "o.json")]
+    )
+    assert result.exit_code == 0, result.output
+
+    result = runner.invoke(app, ["search", "stub"])
+    assert result.exit_code == 0, result.output
+    hits = json.loads(result.output)
+    assert sorted(Path(h["path"]).name for h in hits) == ["a.png", "b.png"]
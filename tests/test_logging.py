@@ -0,0 +1,103 @@
+import io
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+from paku_digest.logging_utils import AsyncHandler, FileLogSampler, JsonFormatter, TextFormatter
+
+
+def _logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"paku-digest-test.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_json_records_carry_structured_fields():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    log = _logger("json", handler)
+
+    fields = {"path": "a.png", "engine": "stub", "elapsed_ms": 1.5}
+    log.info("[stub] OCR on %s", "a.png", extra=fields)
+    record = json.loads(stream.getvalue())
+    assert record["msg"] == "[stub] OCR on a.png"
+    assert record["level"] == "INFO"
+    assert (record["path"], record["engine"], record["elapsed_ms"]) == ("a.png", "stub", 1.5)
+
+
+def test_sampler_thins_per_file_records_only():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter())
+    handler.addFilter(FileLogSampler(every=3))
+    log = _logger("sample", handler)
+
+    for i in range(6):
+        log.info("file %d", i, extra={"path": f"{i}.png"})
+    log.warning("file 7 failed", extra={"path": "7.png"})
+    log.info("summary")
+
+    lines = stream.getvalue().splitlines()
+    assert [line.split("] ", 2)[2] for line in lines] == [
+        "file 0",
+        "file 3 (+2 suppressed)",
+        "file 7 failed (+2 suppressed)",
+        "summary",
+    ]
+
+
+def test_rate_limit_caps_records_per_second():
+    sampler = FileLogSampler(per_second=2)
+    records = [
+        logging.LogRecord("t", logging.INFO, __file__, 0, "x", None, None) for _ in range(10)
+    ]
+    for r in records:
+        r.path = "a.png"
+    assert sum(sampler.filter(r) for r in records) == 2
+
+
+def test_async_handler_writes_from_background_thread():
+    stream = io.StringIO()
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, writer)
+    log = _logger("async", AsyncHandler(log_queue, FileLogSampler(), max_queued=100_000))
+    listener.start()
+
+    def work(n):
+        for i in range(200):
+            log.info("worker %d item %d", n, i, extra={"path": f"{n}-{i}.png"})
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    listener.stop()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == 800
+    assert {r["thread"] for r in records} != {"MainThread"}
+
+
+def test_full_queue_drops_info_but_keeps_warnings():
+    log_queue = queue.SimpleQueue()
+    sampler = FileLogSampler()
+    log = _logger("full", AsyncHandler(log_queue, sampler, max_queued=1))
+
+    log.info("kept")
+    log.info("dropped")
+    log.warning("kept too")
+    log.info("dropped again")
+
+    queued = []
+    while not log_queue.empty():
+        queued.append(log_queue.get())
+    assert [r.getMessage() for r in queued] == ["kept", "kept too"]
+    assert queued[1].suppressed == 1
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from paku_digest.cli import app
+from paku_digest.manifest import DigestManifest
+from paku_digest.models import Document, OcrResult
+from paku_digest.pipelines.export_pipeline import open_export_file, write_documents
+
+LOG = logging.getLogger("test")
+
+
+def _make_images(root: Path, names):
+    root.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (root / name).write_bytes(name.encode())
+
+
+def _digest(*args):
+    result = CliRunner().invoke(app, ["digest", *args])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def test_incremental_only_processes_new_or_changed(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    _make_images(images, ["a.png", "b.png"])
+    out = tmp_path / "out.jsonl"
+
+    _digest(str(images), "-f", "jsonl", "--out", str(out))
+    assert len(out.read_text().splitlines()) == 2
+
+    _make_images(images, ["c.png"])
+    (images / "a.png").write_bytes(b"changed")
+    _digest(str(images), "-f", "jsonl", "--out", str(out), "--incremental")
+
+    names = sorted(Path(json.loads(line)["path"]).name for line in out.read_text().splitlines())
+    assert names == ["a.png", "c.png"]
+
+
+def test_touched_files_are_settled_by_hash_without_the_cache(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    _make_images(images, ["a.png", "b.png"])
+    out = tmp_path / "out.jsonl"
+    _digest(str(images), "-f", "jsonl", "--out", str(out), "--no-cache")
+
+    manifest = DigestManifest.for_input(fresh_context.config.manifest_dir, images)
+    assert all(e.sha256 is not None for e in manifest.entries())
+
+    # Same bytes, newer mtime: skipped by content. Same size, new bytes: redone.
+    st = (images / "a.png").stat()
+    os.utime(images / "a.png", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    (images / "b.png").write_bytes(b"B.png")
+    _digest(str(images), "-f", "jsonl", "--out", str(out), "--incremental", "--no-cache")
+
+    names = [Path(json.loads(line)["path"]).name for line in out.read_text().splitlines()]
+    assert names == ["b.png"]
+
+
+def test_record_uses_the_stamp_taken_before_processing(tmp_path: Path):
+    images = tmp_path / "images"
+    _make_images(images, ["a.png", "gone.png"])
+    manifest = DigestManifest(tmp_path / "manifest.jsonl")
+    plan = manifest.plan(resume=False, incremental=False, out=None, fmt="jsonl", log=LOG)
+    assert not plan.skip(images / "a.png")
+    before = (images / "a.png").stat()
+
+    # Rewritten while being OCR'd, and a file deleted before its record.
+    (images / "a.png").write_bytes(b"rewritten")
+    (images / "gone.png").unlink()
+    manifest.begin_run(plan, out=None, fmt="jsonl")
+    manifest.record(images / "a.png")
+    manifest.record(images / "gone.png")
+    manifest.close()
+
+    [entry] = manifest.entries()
+    assert (entry.size, entry.mtime_ns) == (before.st_size, before.st_mtime_ns)
+    assert entry.sha256 is None
+
+
+def test_resume_skips_finished_files_and_repairs_output(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    _make_images(images, ["a.png", "b.png", "c.png"])
+    out = tmp_path / "out.jsonl"
+
+    # Simulate a run that died after two documents, mid-way through a third.
+    manifest = DigestManifest.for_input(fresh_context.config.manifest_dir, images)
+    plan = manifest.plan(resume=False, incremental=False, out=out, fmt="jsonl", log=LOG)
+
+    def crashing_docs():
+        for name in ["a.png", "b.png"]:
+            yield Document(path=images / name, ocr=OcrResult(engine="stub", raw_text=name))
+        raise KeyboardInterrupt
+
+    with open_export_file(out, "jsonl") as f:
+        manifest.begin_run(plan, out=out, fmt="jsonl", output_stream=f)
+        with pytest.raises(KeyboardInterrupt):
+            write_documents(
+                crashing_docs(),
+                fmt="jsonl",
+                stream=f,
+                on_write=lambda doc, start, end: manifest.record(
+                    doc.path, output={"file": str(out), "offset": start, "end": end}
+                ),
+            )
+        manifest.close()
+    with out.open("a") as f:
+        f.write('{"path": "torn')
+
+    _digest(str(images), "-f", "jsonl", "--out", str(out), "--resume")
+
+    docs = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [Path(d["path"]).name for d in docs] == ["a.png", "b.png", "c.png"]
+    runs = manifest.runs()
+    assert [r["resumed"] for r in runs] == [False, True]
+    assert len({r["run"] for r in runs}) == 1
+    assert len(manifest.entries()) == 3
+
+
+def test_resume_rejects_json_arrays(fresh_context, tmp_path: Path):
+    result = CliRunner().invoke(
+        app, ["digest", str(tmp_path), "--out", str(tmp_path / "o.json"), "--resume"]
+    )
+    assert result.exit_code != 0
@@ -0,0 +1,188 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from paku_digest.cache import OcrResultCache, cached_extract
+from paku_digest.cli import app
+from paku_digest.metrics import (
+    CACHE_EVENTS,
+    ENGINE_ERRORS,
+    ENGINE_SECONDS,
+    STAGE_SECONDS,
+    TRACER,
+    MetricsRegistry,
+    span,
+)
+from paku_digest.models import OcrResult
+from paku_digest.ocr.base import OCREngine
+from paku_digest.pipelines.digest_pipeline import run_digest
+
+
+def _samples(text: str) -> dict:
+    """Prometheus text -> {'name{labels}': value}."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            out[key] = float(value)
+    return out
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    files = registry.counter("t_files_total", "Files.", ("status",))
+    latency = registry.histogram("t_seconds", "Latency.", ("engine",), buckets=(0.1, 1.0))
+
+    files.inc(status="ok")
+    files.inc(2, status='we"ird')
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, engine="stub")
+
+    text = registry.render()
+    assert "# TYPE t_files_total counter" in text
+    assert "# TYPE t_seconds histogram" in text
+    samples = _samples(text)
+    assert samples['t_files_total{status="ok"}'] == 1
+    assert samples['t_files_total{status="we\\"ird"}'] == 2
+    assert samples['t_seconds_bucket{engine="stub",le="0.1"}'] == 1
+    assert samples['t_seconds_bucket{engine="stub",le="1"}'] == 2
+    assert samples['t_seconds_bucket{engine="stub",le="+Inf"}'] == 3
+    assert samples['t_seconds_count{engine="stub"}'] == 3
+    assert samples['t_seconds_sum{engine="stub"}'] == pytest.approx(5.55)
+
+    with pytest.raises(ValueError):
+        files.inc(engine="stub")
+
+
+def test_take_and_merge_move_worker_values():
+    worker, parent = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, parent):
+        registry.counter("t_total", "T.", ("k",))
+        registry.histogram("t_seconds", "T.")
+
+    worker.counter("t_total", "T.", ("k",)).inc(3, k="a")
+    worker.histogram("t_seconds", "T.").observe(0.2)
+    parent.merge(worker.take())
+    parent.merge(worker.take())  # nothing new since the last take
+
+    assert parent.counter("t_total", "T.", ("k",)).value(k="a") == 3
+    assert parent.histogram("t_seconds", "T.").count() == 1
+    assert worker.counter("t_total", "T.", ("k",)).value(k="a") == 0
+
+
+def test_spans_are_traced_only_when_enabled():
+    TRACER.take()
+    with span("unit-test"):
+        pass
+    assert TRACER.take() == []
+
+    TRACER.enabled = True
+    try:
+        with span("unit-test", item=1):
+            pass
+    finally:
+        TRACER.enabled = False
+    (event,) = TRACER.take()
+    assert event["name"] == "unit-test" and event["ph"] == "X"
+    assert event["args"] == {"item": 1}
+
+
+class _EchoEngine(OCREngine):
+    def name(self) -> str:
+        return "echo"
+
+    def extract(self, path: Path) -> OcrResult:
+        if path.read_bytes() == b"bad":
+            raise RuntimeError("unreadable")
+        return OcrResult(engine="echo", raw_text=path.read_text())
+
+
+class _Wrapper(OCREngine):
+    """Calls another engine through the cache, like RoutedEngine."""
+
+    def __init__(self, inner: OCREngine, cache: OcrResultCache) -> None:
+        self.inner, self.cache = inner, cache
+
+    def name(self) -> str:
+        return "wrapper"
+
+    def cacheable(self) -> bool:
+        return False
+
+    def extract(self, path: Path) -> OcrResult:
+        return cached_extract(self.inner, path, self.cache)
+
+
+def test_engine_calls_and_cache_events_are_counted(tmp_path: Path):
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = _Wrapper(_EchoEngine(), cache)
+    good, bad = tmp_path / "good.png", tmp_path / "bad.png"
+    good.write_bytes(b"text")
+    bad.write_bytes(b"bad")
+
+    before = (
+        ENGINE_SECONDS.count(engine="echo", call="extract"),
+        ENGINE_SECONDS.count(engine="wrapper", call="extract"),
+        ENGINE_ERRORS.value(engine="echo"),
+        CACHE_EVENTS.value(event="hit"),
+        STAGE_SECONDS.count(stage="ocr"),
+    )
+    cached_extract(engine, good, cache)
+    cached_extract(engine, good, cache)  # inner engine served from cache
+    with pytest.raises(RuntimeError):
+        cached_extract(engine, bad, cache)
+    after = (
+        ENGINE_SECONDS.count(engine="echo", call="extract"),
+        ENGINE_SECONDS.count(engine="wrapper", call="extract"),
+        ENGINE_ERRORS.value(engine="echo"),
+        CACHE_EVENTS.value(event="hit"),
+        STAGE_SECONDS.count(stage="ocr"),
+    )
+    # echo ran for good.png once and bad.png once; only outer calls are "ocr".
+    assert [a - b for a, b in zip(after, before)] == [2, 3, 1, 1, 3]
+
+
+def test_process_workers_report_their_metrics(fresh_context, tmp_path: Path):
+    for i in range(4):
+        (tmp_path / f"img_{i}.png").write_bytes(f"fake-{i}".encode())
+    before = ENGINE_SECONDS.count(engine="stub", call="extract")
+
+    docs = run_digest(tmp_path, ocr_engine_name="stub", workers=2, executor="process")
+
+    assert len(docs) == 4
+    assert ENGINE_SECONDS.count(engine="stub", call="extract") - before == 4
+
+
+def test_digest_writes_metrics_and_trace(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(3):
+        (images / f"img_{i}.png").write_bytes(f"fake-{i}".encode())
+    metrics_out = tmp_path / "metrics.prom"
+    trace_out = tmp_path / "trace.json"
+
+    def run():
+        result = CliRunner().invoke(
+            app,
+            [
+                "digest", str(images), "--ocr", "stub", "--out", str(tmp_path / "o.jsonl"),
+                "-f", "jsonl", "--metrics-out", str(metrics_out), "--trace-out", str(trace_out),
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        return _samples(metrics_out.read_text())
+
+    first = run()
+    second = run()
+
+    ok = 'paku_documents_total{status="ok"}'
+    assert second[ok] - first[ok] == 3
+    assert first['paku_engine_call_seconds_count{engine="stub",call="extract"}'] >= 3
+    assert first['paku_stage_seconds_count{stage="discovery"}'] >= 3
+
+    trace = json.loads(trace_out.read_text())
+    names = {e["name"] for e in trace["traceEvents"]}
+    assert {"discovery", "export"} <= names
+    assert not TRACER.enabled
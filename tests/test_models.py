@@ -0,0 +1,115 @@
+import pickle
+import tracemalloc
+
+import pytest
+from pydantic import ValidationError
+
+from paku_digest.models import BlockArray, BoundingBox, Document, OcrBlock, OcrResult
+
+
+def _blocks(n: int):
+    return [
+        OcrBlock(
+            text=f"line {i}",
+            confidence=0.5,
+            bbox=BoundingBox(x=i, y=2 * i, width=100, height=10) if i % 2 else None,
+            type="word" if i % 3 else "line",
+        )
+        for i in range(n)
+    ]
+
+
+def test_block_array_serializes_like_a_list_of_blocks():
+    blocks = _blocks(5)
+    plain = OcrResult(engine="e", raw_text="t", blocks=blocks)
+    result = OcrResult(engine="e", raw_text="t", blocks=BlockArray(blocks).as_blocks())
+
+    assert isinstance(plain.blocks, list)
+    assert isinstance(result.blocks, BlockArray)
+    assert result.model_dump(mode="json") == plain.model_dump(mode="json")
+    assert result.model_dump_json() == plain.model_dump_json()
+    assert OcrResult.model_validate_json(result.model_dump_json()) == result
+
+
+def test_block_array_views_and_pickle():
+    blocks = _blocks(4)
+    compact = BlockArray(blocks)
+
+    assert list(compact) == blocks
+    assert blocks == list(compact)
+    assert compact[-1] == blocks[-1]
+    assert compact[1:3] == blocks[1:3]
+    assert list(compact.texts) == [b.text for b in blocks]
+    assert compact.bbox(0) is None
+    assert pickle.loads(pickle.dumps(compact)) == compact
+
+
+def test_block_array_views_are_read_only():
+    compact = BlockArray(_blocks(2))
+    with pytest.raises(ValidationError):
+        compact[0].text = "changed"
+    with pytest.raises(ValidationError):
+        compact[1].bbox.x = 5
+    assert compact[0].text == "line 0"
+
+
+def test_block_array_validates_like_ocr_block():
+    with pytest.raises(ValidationError):
+        OcrResult(engine="e", raw_text="", blocks=[{"text": "x", "confidence": 1.5}])
+    with pytest.raises(ValidationError):
+        OcrResult(engine="e", raw_text="", blocks=[{"text": "x", "confidence": 0.5, "type": "page"}])
+
+    blocks = BlockArray()
+    with pytest.raises(ValueError):
+        blocks.add("x", 1.5)
+    with pytest.raises(ValueError):
+        blocks.add("x", 0.5, type="page")
+    with pytest.raises(TypeError):
+        blocks.add(7, 0.5)
+    with pytest.raises(TypeError):
+        blocks.add("x", "0.5")
+    with pytest.raises(TypeError):
+        blocks.add("x", 0.5, (1.5, 0, 10, 10))
+    blocks.add("x", 1, (1.0, 0, 10, 10))
+    assert len(blocks) == 1 and blocks[0].bbox.x == 1
+
+
+def test_result_json_schema_lists_ocr_blocks():
+    schema = Document.model_json_schema()
+    blocks = schema["$defs"]["OcrResult"]["properties"]["blocks"]
+    assert blocks["type"] == "array"
+    assert blocks["items"] == {"$ref": "#/$defs/OcrBlock"}
+    assert OcrResult.model_json_schema(mode="serialization")["properties"]["blocks"]["type"] == "array"
+
+
+def _traced(build):
+    tracemalloc.start()
+    try:
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def test_block_array_uses_less_memory_than_block_models():
+    rows = [(f"text of line {i}", 0.9, (i, i, 300, 20)) for i in range(2000)]
+
+    def as_models():
+        return [
+            OcrBlock(
+                text=t,
+                confidence=c,
+                bbox=BoundingBox(x=b[0], y=b[1], width=b[2], height=b[3]),
+            )
+            for t, c, b in rows
+        ]
+
+    def as_columns():
+        blocks = BlockArray()
+        for t, c, b in rows:
+            blocks.add(t, c, b)
+        return blocks
+
+    assert _traced(as_columns) * 5 < _traced(as_models)
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from paku_digest.pipelines.digest_pipeline import run_digest
+
+pdfium = pytest.importorskip("pypdfium2")
+pytest.importorskip("PIL")
+
+
+def _make_pdf(path: Path, pages: int) -> None:
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(200, 100)
+    pdf.save(str(path))
+    pdf.close()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"workers": 3}, {"workers": 2, "batch_size": 2}],
+    ids=["sequential", "threads", "batched"],
+)
+def test_pdf_pages_are_collected_into_one_document(tmp_path: Path, options):
+    _make_pdf(tmp_path / "report.pdf", 4)
+    (tmp_path / "photo.png").write_bytes(b"fake")
+
+    docs = run_digest(input_path=tmp_path, ocr_engine_name="stub", pdf_dpi=36, **options)
+    by_name = {d.path.name: d for d in docs}
+
+    assert set(by_name) == {"report.pdf", "photo.png"}
+    assert by_name["photo.png"].pages == []
+
+    pdf = by_name["report.pdf"]
+    assert [p.number for p in pdf.pages] == [1, 2, 3, 4]
+    assert all(p.ocr is not None and p.error is None for p in pdf.pages)
+    assert pdf.pages[2].ocr.meta["path"] == f"{tmp_path / 'report.pdf'}#page=3"
+    assert pdf.ocr.raw_text.split("\f") == [
+        f"[stub text for report.page{n}.png]" for n in range(1, 5)
+    ]
+    assert pdf.ocr.meta["pages"] == 4
+
+
+def test_pdf_pages_leave_no_scratch_files(tmp_path: Path):
+    from paku_digest.context import AppContext
+
+    _make_pdf(tmp_path / "a.pdf", 2)
+    run_digest(input_path=tmp_path / "a.pdf", ocr_engine_name="stub", workers=2)
+
+    pages_dir = AppContext.instance().config.pages_dir
+    assert not pages_dir.exists() or not any(pages_dir.iterdir())
+
+
+def test_pages_reuse_one_open_document(tmp_path: Path, monkeypatch):
+    from paku_digest import pdf as pdf_module
+
+    _make_pdf(tmp_path / "a.pdf", 3)
+    _make_pdf(tmp_path / "b.pdf", 2)
+    opened = []
+    real = pdfium.PdfDocument
+
+    def counting(*args, **kwargs):
+        opened.append(args[0])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(pdfium, "PdfDocument", counting)
+    refs = [pdf_module.PageRef(tmp_path / "a.pdf", i, 3, 36) for i in range(3)]
+    try:
+        assert pdf_module.page_count(tmp_path / "a.pdf") == 3
+        for ref in refs:
+            pdf_module.render_page(ref, tmp_path / f"p{ref.number}.png")
+        assert len(opened) == 1
+
+        # A rewritten file is opened afresh.
+        os.replace(tmp_path / "b.pdf", tmp_path / "a.pdf")
+        assert pdf_module.page_count(tmp_path / "a.pdf") == 2
+        assert len(opened) == 2
+    finally:
+        pdf_module.close_documents()
@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import pytest
+
+from paku_digest.cache import OcrResultCache, cached_extract, cached_extract_batch
+from paku_digest.models import OcrResult
+from paku_digest.ocr.base import OCREngine
+from paku_digest.preprocess import (
+    DecodedImageCache,
+    PreparedImage,
+    PreprocessOptions,
+    Preprocessor,
+)
+
+
+class _Pixels:
+    def __init__(self, nbytes: int) -> None:
+        self.nbytes = nbytes
+
+
+def test_decoded_image_cache_evicts_least_recently_used():
+    cache = DecodedImageCache(max_bytes=250)
+    for name in ("a", "b"):
+        cache.put((name,), PreparedImage(pixels=_Pixels(100), original_size=(1, 1)))
+
+    assert cache.get(("a",)) is not None  # "b" is now the oldest
+    cache.put(("c",), PreparedImage(pixels=_Pixels(100), original_size=(1, 1)))
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None
+    assert cache.usage() == (2, 200)
+
+    # Larger than the whole budget: never stored.
+    cache.put(("big",), PreparedImage(pixels=_Pixels(1000), original_size=(1, 1)))
+    assert cache.get(("big",)) is None
+
+
+class ImageEngine(OCREngine):
+    def __init__(self, name: str = "pixels") -> None:
+        self._name = name
+        self.shapes = []
+        self.bbox = None
+
+    def name(self) -> str:
+        return self._name
+
+    def accepts_images(self) -> bool:
+        return True
+
+    def extract(self, path: Path) -> OcrResult:
+        self.shapes.append(None)  # read the file itself
+        return OcrResult(engine=self.name(), raw_text="x", meta={"source": str(path)})
+
+    def extract_image(self, image, path: Path) -> OcrResult:
+        self.shapes.append(image.shape)
+        return OcrResult(
+            engine=self.name(),
+            raw_text="x",
+            blocks=[{"text": "x", "confidence": 0.9, "bbox": self.bbox}] if self.bbox else [],
+            meta={"source": str(path)},
+        )
+
+
+def _write_image(path: Path, width: int, height: int) -> None:
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    cv2.imwrite(str(path), np.full((height, width, 3), 255, dtype=np.uint8))
+
+
+def test_preprocessor_decodes_once_and_downscales(tmp_path: Path, monkeypatch):
+    img = tmp_path / "scan.png"
+    _write_image(img, 400, 200)
+
+    import paku_digest.preprocess as preprocess
+
+    decodes = []
+    real_prepare = preprocess.prepare
+
+    def counting_prepare(path, options):
+        decodes.append(path)
+        return real_prepare(path, options)
+
+    monkeypatch.setattr(preprocess, "prepare", counting_prepare)
+
+    pre = Preprocessor(
+        PreprocessOptions(max_side=100, grayscale=True),
+        cache=DecodedImageCache(max_bytes=1 << 20),
+    )
+    light, heavy = ImageEngine("light"), ImageEngine("heavy")
+
+    first = cached_extract(light, img, None, pre)
+    cached_extract_batch(heavy, [img], None, pre)
+
+    assert decodes == [img]
+    assert light.shapes == heavy.shapes == [(50, 100)]
+    assert first.meta["preprocess"]["scale"] == 0.25
+    assert first.meta["preprocess"]["original_size"] == [400, 200]
+
+
+def test_preprocess_options_are_part_of_the_cache_key(tmp_path: Path):
+    img = tmp_path / "scan.png"
+    _write_image(img, 64, 64)
+
+    cache = OcrResultCache(root=tmp_path / "cache", max_bytes=1 << 20)
+    engine = ImageEngine()
+
+    cached_extract(engine, img, cache, Preprocessor(PreprocessOptions()))
+    cached_extract(engine, img, cache, None)
+    cached_extract(engine, img, cache, Preprocessor(PreprocessOptions(grayscale=True)))
+
+    # Default options: no decode, and the same cache key as no preprocessor.
+    assert engine.shapes == [None, (64, 64)]
+    assert cache.stats().hits == 1
+
+
+def test_boxes_are_mapped_back_to_original_pixels(tmp_path: Path):
+    img = tmp_path / "scan.png"
+    _write_image(img, 400, 200)
+    engine = ImageEngine()
+    engine.bbox = {"x": 10, "y": 5, "width": 20, "height": 8}
+
+    result = cached_extract(engine, img, None, Preprocessor(PreprocessOptions(max_side=100)))
+
+    box = result.blocks[0].bbox
+    assert (box.x, box.y, box.width, box.height) == (40, 20, 80, 32)
+
+
+def test_to_original_undoes_deskew_rotation():
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    width, height, angle = 200, 100, 12.0
+    image = PreparedImage(
+        pixels=np.zeros((height, width), dtype=np.uint8),
+        original_size=(width * 2, height * 2),
+        scale=0.5,
+        deskew_angle=angle,
+    )
+    # A point of the original, downscaled and rotated like `deskew` does.
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    x, y = matrix @ np.array([60.0, 30.0, 1.0])
+
+    back = image.to_original((round(x), round(y), 0, 0))
+    assert abs(back[0] - 120) <= 2 and abs(back[1] - 60) <= 2
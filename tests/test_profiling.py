@@ -0,0 +1,76 @@
+import pstats
+import threading
+import time
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from paku_digest.cli import app
+from paku_digest.metrics import span
+from paku_digest.profiling import PROFILER, profile_session
+
+
+def _busy_in_ocr(stop: threading.Event) -> None:
+    with span("ocr"):
+        while not stop.is_set():
+            sum(i * i for i in range(1000))
+
+
+def test_samples_running_threads_by_stage():
+    stop = threading.Event()
+    busy = threading.Thread(target=_busy_in_ocr, args=(stop,))
+    idle = threading.Thread(target=stop.wait)
+    PROFILER.start(0.002)
+    busy.start()
+    idle.start()
+    time.sleep(0.3)
+    stop.set()
+    busy.join()
+    idle.join()
+    profile = PROFILER.stop()
+
+    assert profile.total > 0
+    functions = {stack[-1][2] for _, stack in profile.samples}
+    assert "_busy_in_ocr" in {k[2] for _, stack in profile.samples for k in stack}
+    assert not any(name.endswith("wait") for name in functions)
+    ocr = sum(n for (stage, _), n in profile.samples.items() if stage == "ocr")
+    assert ocr / profile.total > 0.5
+    assert "_busy_in_ocr" in profile.summary(5)
+
+
+def test_profile_files_are_standard_formats(tmp_path: Path):
+    stop = threading.Event()
+    busy = threading.Thread(target=_busy_in_ocr, args=(stop,))
+    reports = []
+    with profile_session(tmp_path / "run", interval_s=0.002, report=reports.append):
+        busy.start()
+        time.sleep(0.2)
+        stop.set()
+        busy.join()
+
+    stats = pstats.Stats(str(tmp_path / "run.pstats"))
+    assert any(func[2] == "_busy_in_ocr" for func in stats.stats)
+    lines = (tmp_path / "run.collapsed").read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("ocr;") for line in lines)
+    assert reports and reports[0].startswith("[profile]")
+
+
+def test_digest_profile_option(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(3):
+        (images / f"img_{i}.png").write_bytes(f"fake-{i}".encode())
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "digest", str(images), "--ocr", "stub", "--out", str(tmp_path / "o.json"),
+            "--profile", str(tmp_path / "prof"), "--profile-interval-ms", "1",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "[profile]" in result.output
+    assert (tmp_path / "prof.pstats").exists()
+    assert (tmp_path / "prof.collapsed").exists()
+    assert not PROFILER.running
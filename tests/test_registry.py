@@ -0,0 +1,104 @@
+import logging
+from importlib.metadata import EntryPoint
+from pathlib import Path
+
+import pytest
+
+from paku_digest.config import AppConfig
+from paku_digest.models import OcrResult
+from paku_digest.ocr import registry as registry_mod
+from paku_digest.ocr.base import OCREngine
+from paku_digest.ocr.registry import EngineRegistry, EngineSpec, plugin_specs
+from paku_digest.ocr.router import EngineRouter
+
+LOG = logging.getLogger("test")
+
+
+def _config() -> AppConfig:
+    return AppConfig(
+        env="test",
+        log_level="INFO",
+        default_ocr="stub",
+        workdir=Path("."),
+        paddle_lang="en",
+    )
+
+
+class FakeEngine(OCREngine):
+    built = 0
+
+    def __init__(self, config, logger) -> None:
+        type(self).built += 1
+
+    def name(self) -> str:
+        return "fake"
+
+    def kind(self) -> str:
+        return "heavy"
+
+    def extract(self, path: Path) -> OcrResult:
+        return OcrResult(engine="fake", raw_text="")
+
+
+class BrokenEngine(FakeEngine):
+    def __init__(self, config, logger) -> None:
+        raise RuntimeError("model files missing")
+
+
+def test_registry_builds_engines_lazily_once():
+    FakeEngine.built = 0
+    reg = EngineRegistry(_config(), LOG, [EngineSpec("fake", "heavy", FakeEngine)])
+
+    assert list(reg) == ["fake"]
+    assert reg.kind_of("fake") == "heavy"
+    assert FakeEngine.built == 0
+
+    assert reg["fake"] is reg["fake"]
+    assert FakeEngine.built == 1
+    assert reg.is_loaded("fake")
+
+
+def test_registry_hides_unavailable_engines():
+    specs = [
+        EngineSpec("fake", "heavy", FakeEngine, probe=lambda cfg: "not installed"),
+        EngineSpec("broken", "heavy", BrokenEngine),
+    ]
+    reg = EngineRegistry(_config(), LOG, specs)
+
+    assert "fake" not in reg
+    assert "broken" in reg
+    with pytest.raises(KeyError):
+        reg["broken"]
+    assert "broken" not in reg
+    assert reg.unavailable() == {"fake": "not installed", "broken": "model files missing"}
+
+
+def test_router_skips_engines_that_fail_to_build():
+    FakeEngine.built = 0
+    specs = [
+        EngineSpec("broken", "heavy", BrokenEngine),
+        EngineSpec("fake", "heavy", FakeEngine),
+    ]
+    router = EngineRouter(engines=EngineRegistry(_config(), LOG, specs))
+
+    assert router.select("auto").name() == "fake"
+    assert FakeEngine.built == 1
+
+
+def test_plugin_specs_load_from_entry_points(tmp_path: Path, monkeypatch):
+    (tmp_path / "paku_fake_plugin.py").write_text(
+        "from paku_digest.ocr.registry import EngineSpec\n"
+        "from paku_digest.ocr.stub import StubOCREngine\n"
+        "SPEC = EngineSpec(name='fake-plugin', kind='light', factory=StubOCREngine)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    eps = [
+        EntryPoint("fake-plugin", "paku_fake_plugin:SPEC", registry_mod.ENTRY_POINT_GROUP),
+        EntryPoint("bad", "paku_fake_plugin:missing", registry_mod.ENTRY_POINT_GROUP),
+    ]
+    monkeypatch.setattr(registry_mod, "entry_points", lambda group: eps)
+
+    specs = plugin_specs(LOG)
+
+    assert [s.name for s in specs] == ["fake-plugin"]
+    assert specs[0].source == "plugin:paku_fake_plugin:SPEC"
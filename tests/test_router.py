@@ -0,0 +1,276 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from paku_digest.models import OcrBlock, OcrResult
+from paku_digest.ocr.base import InputError, OCREngine, PartialBatchError
+from paku_digest.ocr.cascade import CascadePolicy
+from paku_digest.ocr.health import HALF_OPEN, OPEN, EngineHealth
+from paku_digest.ocr.router import EngineRouter
+from paku_digest.preprocess import PreprocessOptions, Preprocessor
+
+
+class ScriptedEngine(OCREngine):
+    def __init__(self, name: str, kind: str, fail: bool = False, delay: float = 0.0) -> None:
+        self._name = name
+        self._kind = kind
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def name(self) -> str:
+        return self._name
+
+    def kind(self) -> str:
+        return self._kind
+
+    def extract(self, path: Path) -> OcrResult:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self._name} down")
+        return OcrResult(engine=self._name, raw_text="ok", blocks=[], language=None, meta={})
+
+
+def test_breaker_opens_and_probes_half_open():
+    h = EngineHealth(failure_threshold=2, cooldown_s=0.05)
+    for _ in range(2):
+        assert h.acquire()
+        h.release(False, 1.0)
+    assert h.snapshot()["state"] == OPEN
+    assert not h.acquire()
+
+    time.sleep(0.06)
+    assert h.snapshot()["state"] == HALF_OPEN
+    assert h.acquire()  # the single probe
+    assert not h.acquire()
+    h.release(True, 1.0)
+    assert h.snapshot()["state"] == "closed"
+
+
+def test_routed_engine_fails_over_and_stops_calling_broken_engine():
+    heavy = ScriptedEngine("heavy", "heavy", fail=True)
+    light = ScriptedEngine("light", "light")
+    router = EngineRouter(
+        engines={"heavy": heavy, "light": light}, failure_threshold=3, cooldown_s=60
+    )
+    routed = router.route("auto")
+
+    for _ in range(10):
+        assert routed.extract(Path("x.png")).engine == "light"
+
+    assert heavy.calls == 3  # breaker opened after the threshold
+    stats = router.stats()
+    assert stats["heavy"]["state"] == OPEN
+    assert stats["light"]["calls"] == 10
+
+
+def test_router_prefers_faster_engine_of_same_kind():
+    slow = ScriptedEngine("slow", "heavy", delay=0.02)
+    fast = ScriptedEngine("fast", "heavy")
+    router = EngineRouter(engines={"slow": slow, "fast": fast})
+    routed = router.route("heavy")
+
+    for _ in range(6):
+        routed.extract(Path("x.png"))
+
+    assert fast.calls > slow.calls
+
+
+def test_router_latency_budget_demotes_slow_heavy_engine():
+    heavy = ScriptedEngine("heavy", "heavy", delay=0.02)
+    light = ScriptedEngine("light", "light")
+    router = EngineRouter(engines={"heavy": heavy, "light": light}, latency_budget_ms=5)
+    routed = router.route("auto")
+
+    for _ in range(5):
+        routed.extract(Path("x.png"))
+
+    assert heavy.calls == 1
+    assert light.calls == 4
+
+
+def test_router_stats_persist(tmp_path: Path):
+    path = tmp_path / "router-stats.json"
+    engines = {"light": ScriptedEngine("light", "light")}
+    router = EngineRouter(engines=engines, stats_path=path)
+    router.route("light").extract(Path("x.png"))
+    router.save_stats()
+
+    reloaded = EngineRouter(engines=engines, stats_path=path)
+    assert reloaded.stats()["light"]["calls"] == 1
+    assert reloaded.stats()["light"]["ewma_latency_ms"] is not None
+
+
+def test_concurrent_saves_add_up(tmp_path: Path):
+    path = tmp_path / "router-stats.json"
+    engines = {"light": ScriptedEngine("light", "light")}
+    first = EngineRouter(engines=engines, stats_path=path)
+    second = EngineRouter(engines=engines, stats_path=path)
+    for router, calls in ((first, 2), (second, 3)):
+        for _ in range(calls):
+            router.route("light").extract(Path("x.png"))
+    first.save_stats()
+    second.save_stats()
+    second.save_stats()  # nothing new: no double counting
+
+    assert EngineRouter(engines=engines, stats_path=path).stats()["light"]["calls"] == 5
+
+
+def test_take_and_merge_stats_between_routers():
+    engines = {"light": ScriptedEngine("light", "light")}
+    worker = EngineRouter(engines=engines)
+    parent = EngineRouter(engines=engines)
+    for _ in range(3):
+        worker.route("light").extract(Path("x.png"))
+    parent.merge_stats(worker.take_stats())
+    assert worker.take_stats() == {}
+
+    merged = parent.stats()["light"]
+    assert merged["calls"] == 3
+    assert merged["ewma_latency_ms"] is not None
+
+
+def test_router_raises_when_nothing_available():
+    router = EngineRouter(engines={"heavy": ScriptedEngine("heavy", "heavy", fail=True)})
+    with pytest.raises(RuntimeError, match="heavy down"):
+        router.route("auto").extract(Path("x.png"))
+
+
+class ConfidenceEngine(ScriptedEngine):
+    """Light engine whose confidence depends on the file name."""
+
+    def extract(self, path: Path) -> OcrResult:
+        self.calls += 1
+        if path.stem.startswith("blank"):
+            return OcrResult(engine=self._name, raw_text="  ", blocks=[], meta={})
+        conf = 0.3 if path.stem.startswith("hard") else 0.95
+        return OcrResult(
+            engine=self._name,
+            raw_text="text",
+            blocks=[OcrBlock(text="text", confidence=conf)],
+            meta={},
+        )
+
+
+def test_cascade_escalates_only_uncertain_images():
+    light = ConfidenceEngine("light", "light")
+    heavy = ScriptedEngine("heavy", "heavy")
+    router = EngineRouter(
+        engines={"light": light, "heavy": heavy},
+        cascade=CascadePolicy(min_confidence=0.8),
+    )
+    routed = router.route("cascade")
+
+    paths = [Path(n) for n in ["easy1.png", "hard.png", "easy2.png", "blank.png"]]
+    results = routed.extract_batch(paths)
+
+    assert [r.engine for r in results] == ["light", "heavy", "light", "heavy"]
+    assert heavy.calls == 2
+    assert results[0].meta["cascade"] == {
+        "engine": "light",
+        "escalated": False,
+        "confidence": 0.95,
+    }
+    assert results[1].meta["cascade"]["reason"] == "low_confidence"
+    assert results[1].meta["cascade"]["light_confidence"] == 0.3
+    assert results[3].meta["cascade"]["reason"] == "empty_text"
+
+
+def test_cascade_keeps_light_result_when_heavy_fails():
+    light = ConfidenceEngine("light", "light")
+    heavy = ScriptedEngine("heavy", "heavy", fail=True)
+    router = EngineRouter(engines={"light": light, "heavy": heavy})
+
+    result = router.route("cascade").extract(Path("hard.png"))
+
+    assert result.engine == "light"
+    assert result.meta["cascade"]["heavy_error"] == "heavy down"
+
+
+class ImageEngine(ScriptedEngine):
+    """Engine fed decoded pixels by the preprocessor."""
+
+    def accepts_images(self) -> bool:
+        return True
+
+    def extract_image(self, image, path: Path) -> OcrResult:
+        return self.extract(path)
+
+
+def test_corrupt_files_do_not_open_breakers(tmp_path: Path):
+    pytest.importorskip("cv2")
+    heavy = ImageEngine("heavy", "heavy")
+    light = ImageEngine("light", "light")
+    router = EngineRouter(
+        engines={"heavy": heavy, "light": light}, failure_threshold=2, cooldown_s=60
+    )
+    routed = router.route(
+        "auto", preprocessor=Preprocessor(PreprocessOptions(grayscale=True))
+    )
+
+    for i in range(5):
+        bad = tmp_path / f"bad_{i}.png"
+        bad.write_bytes(b"not an image")
+        with pytest.raises(InputError, match="Could not load"):
+            routed.extract(bad)
+
+    assert heavy.calls == light.calls == 0
+    stats = router.stats()
+    assert all(s["state"] == "closed" and s["errors"] == 0 for s in stats.values())
+    assert all(s["inflight"] == 0 for s in stats.values())
+    assert router.candidates("auto") == ["heavy", "light"]
+
+
+class PoisonEngine(ConfidenceEngine):
+    """Light engine that cannot handle files named poison*."""
+
+    def extract(self, path: Path) -> OcrResult:
+        if path.stem.startswith("poison"):
+            self.calls += 1
+            raise RuntimeError("light choked")
+        return super().extract(path)
+
+
+def test_cascade_escalates_only_the_image_that_broke_the_light_batch():
+    light = PoisonEngine("light", "light")
+    heavy = ScriptedEngine("heavy", "heavy")
+    router = EngineRouter(engines={"light": light, "heavy": heavy})
+
+    paths = [Path(n) for n in ["easy1.png", "poison.png", "hard.png", "easy2.png"]]
+    results = router.route("cascade").extract_batch(paths)
+
+    assert [r.engine for r in results] == ["light", "heavy", "heavy", "light"]
+    assert heavy.calls == 2
+    assert results[1].meta["cascade"]["reason"] == "light_failed"
+    assert results[1].meta["cascade"]["light_error"] == "light choked"
+    assert results[2].meta["cascade"]["reason"] == "low_confidence"
+    assert results[0].meta["cascade"]["escalated"] is False
+
+
+def test_cascade_batch_keeps_other_results_when_one_image_fails_both_engines():
+    import logging
+
+    from paku_digest.pipelines.digest_pipeline import _process_batch
+
+    light = PoisonEngine("light", "light")
+    heavy = ScriptedEngine("heavy", "heavy", fail=True)
+    router = EngineRouter(engines={"light": light, "heavy": heavy})
+    routed = router.route("cascade")
+
+    paths = [Path(n) for n in ["easy1.png", "poison.png", "hard.png"]]
+    with pytest.raises(PartialBatchError) as info:
+        routed.extract_batch(paths)
+    easy, failed, hard = info.value.outcomes
+    assert easy.engine == "light" and hard.engine == "light"
+    assert str(failed) == "heavy down"
+    per_batch = light.calls
+
+    outcomes = _process_batch(paths, routed, logging.getLogger("test"))
+    assert [(doc is not None, err) for _, doc, err in outcomes] == [
+        (True, None),
+        (False, "heavy down"),
+        (True, None),
+    ]
+    assert light.calls == 2 * per_batch  # not redone image by image
@@ -0,0 +1,82 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from paku_digest.discovery import iter_images
+from paku_digest.pipelines.digest_pipeline import run_digest
+from paku_digest.scheduler import bounded_map
+
+
+def test_slow_consumer_holds_back_submission():
+    pulled = []
+    yielded = 0
+
+    def source():
+        for i in range(50):
+            # Items pulled but not yet handed out are all in flight.
+            assert len(pulled) - yielded < 3
+            pulled.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        out = []
+        for item, fut in bounded_map(lambda i: pool.submit(lambda: i * i), source(), 3):
+            yielded += 1
+            time.sleep(0.001)  # slow sink
+            out.append((item, fut.result()))
+
+    assert sorted(out) == [(i, i * i) for i in range(50)]
+
+
+def test_ordered_yields_input_order():
+    def work(i):
+        time.sleep(random.random() * 0.005)
+        return i
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = [
+            fut.result()
+            for _, fut in bounded_map(lambda i: pool.submit(work, i), range(60), 8, ordered=True)
+        ]
+    assert results == list(range(60))
+
+
+def test_closing_early_cancels_pending():
+    gate = threading.Event()
+    futures = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+
+        def submit(i):
+            fut = pool.submit((lambda: i) if i == 0 else gate.wait)
+            futures.append(fut)
+            return fut
+
+        it = bounded_map(submit, range(10), 4)
+        item, _ = next(it)
+        it.close()
+        gate.set()
+
+    assert item == 0
+    assert len(futures) == 4  # the input was not drained
+    assert sum(f.cancelled() for f in futures) >= 2
+
+
+def test_rejects_empty_budget():
+    with pytest.raises(ValueError):
+        list(bounded_map(lambda i: None, [1], 0))
+
+
+def test_run_digest_ordered_with_workers(fresh_context, tmp_path: Path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(12):
+        (images / f"img_{i:02d}.png").write_bytes(f"fake-{i}".encode())
+
+    docs = run_digest(
+        images, ocr_engine_name="stub", workers=4, max_in_flight=3, ordered=True
+    )
+    assert [d.path for d in docs] == list(iter_images(images))
@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from paku_digest.server import MicroBatcher, OcrService, QueueFullError, make_server
+
+
+def test_batcher_groups_concurrent_items():
+    calls = []
+    gate = threading.Event()
+
+    def handler(items):
+        gate.wait(5)
+        calls.append(list(items))
+        return [i * 10 if i != 3 else ValueError("bad") for i in items]
+
+    batcher = MicroBatcher(handler, max_batch=4, max_wait_s=0.2)
+    batcher.start()
+    try:
+        futures = [batcher.submit(i) for i in range(6)]
+        gate.set()
+        assert [f.result(5) for f in futures if f is not futures[3]] == [0, 10, 20, 40, 50]
+        with pytest.raises(ValueError):
+            futures[3].result(5)
+    finally:
+        batcher.close()
+
+    assert [len(c) for c in calls] == [4, 2]
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_batcher_bounds_added_latency_and_queue():
+    batcher = MicroBatcher(lambda items: items, max_batch=100, max_wait_s=0.05, max_queue=1)
+    batcher.start()
+    try:
+        started = time.monotonic()
+        assert batcher.submit("x").result(5) == "x"
+        assert time.monotonic() - started < 1.0
+    finally:
+        batcher.close()
+
+    stalled = MicroBatcher(lambda items: items, max_queue=1)  # never started
+    stalled.submit("a")
+    with pytest.raises(QueueFullError):
+        stalled.submit("b")
+
+
+def test_batcher_fails_every_item_of_a_short_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=2, max_wait_s=0.2)
+    batcher.start()
+    try:
+        futures = [batcher.submit(i) for i in range(2)]
+        for fut in futures:
+            with pytest.raises(RuntimeError, match="results for"):
+                fut.result(5)
+    finally:
+        batcher.close()
+
+
+def _request(url, data=None, headers=None):
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_strategy_service_loads_its_engines_before_ready(fresh_context):
+    service = OcrService("cascade")
+    assert not fresh_context.ocr_engines.is_loaded("stub")
+    service.start()
+    try:
+        assert service.ready.is_set()
+        assert fresh_context.ocr_engines.is_loaded("stub")
+    finally:
+        service.close()
+
+
+def test_http_service_batches_uploads(fresh_context):
+    service = OcrService("stub", max_batch=8, max_wait_ms=100)
+    server = make_server(service, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert _request(base + "/healthz")[0] == 200
+        status, body = _request(base + "/readyz")
+        assert status == 503 and body["ready"] is False
+        assert _request(base + "/ocr", b"img", {"Content-Type": "image/png"})[0] == 503
+
+        service.start()
+        assert _request(base + "/readyz")[0] == 200
+
+        def post(i):
+            return _request(
+                f"{base}/ocr?name=scan{i}.png", f"image-{i}".encode(), {"Content-Type": "image/png"}
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            responses = list(ex.map(post, range(8)))
+        assert all(status == 200 for status, _ in responses)
+        assert [body["engine"] for _, body in responses] == ["stub"] * 8
+        assert responses[5][1]["meta"]["path"] == "scan5.png"
+        stats = service.batcher.stats()
+        assert stats["items"] == 8 and stats["batches"] < 8
+
+        boundary = "xyz"
+        multipart = (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="shot.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+            "jpeg-bytes\r\n"
+            f"--{boundary}--\r\n"
+        ).encode()
+        status, body = _request(
+            base + "/ocr", multipart, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+        assert status == 200
+        assert body["meta"]["path"] == "shot.jpg"
+
+        assert _request(base + "/ocr", b"", {"Content-Type": "image/png"})[0] == 400
+        assert _request(base + "/nope")[0] == 404
+
+        with urllib.request.urlopen(base + "/metrics", timeout=10) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            metrics = resp.read().decode()
+        assert 'paku_http_requests_total{endpoint="/ocr",code="200"}' in metrics
+        assert "paku_serve_batch_size_count" in metrics
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,69 @@
+import json
+import random
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import pytest
+
+from paku_digest.pipelines.compare_pipeline import run_compare
+from paku_digest.similarity import levenshtein, similarity
+
+
+def _dp_levenshtein(a, b) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def test_levenshtein_matches_reference():
+    rng = random.Random(7)
+    for _ in range(200):
+        a = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 90)))
+        b = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 90)))
+        assert levenshtein(a, b) == _dp_levenshtein(a, b)
+
+    assert levenshtein("the cat sat".split(), "the hat sat down".split()) == 2
+
+
+def test_similarity_metrics():
+    a, b = "kitten sitting", "sitting kitten"
+    assert similarity(a, b, "ratio") == SequenceMatcher(None, a, b).ratio()
+    assert similarity("kitten", "sitting", "cer") == pytest.approx(1 - 3 / 7)
+    assert similarity("a b c d", "a x c d", "wer") == pytest.approx(0.75)
+    assert similarity("same", "same", "cer") == 1.0
+    assert similarity("", "text", "wer") == 0.0
+    with pytest.raises(ValueError):
+        similarity("a", "b", "bleu")
+
+
+def _digest(path: Path, texts: dict) -> Path:
+    docs = [{"path": p, "ocr": {"raw_text": t}} for p, t in texts.items()]
+    path.write_text(json.dumps(docs), encoding="utf-8")
+    return path
+
+
+def test_compare_parallel_matches_sequential(tmp_path: Path):
+    rng = random.Random(3)
+    left, right = {}, {}
+    for i in range(150):
+        words = [rng.choice(["alpha", "beta", "gamma", "delta"]) for _ in range(20)]
+        left[f"p{i}"] = " ".join(words)
+        if i % 3:
+            words[rng.randrange(20)] = "omega"
+        right[f"p{i}"] = " ".join(words)
+    left["only-left"] = "x"
+
+    lpath = _digest(tmp_path / "l.json", left)
+    rpath = _digest(tmp_path / "r.json", right)
+
+    sequential = run_compare(lpath, rpath, metric="cer")
+    parallel = run_compare(lpath, rpath, metric="cer", workers=2)
+
+    assert parallel == sequential
+    assert sequential["metric"] == "cer"
+    assert sequential["exact_equal_count"] == 50
+    assert sequential["total_paths"] == 151
@@ -0,0 +1,133 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from paku_digest.models import Document, OcrBlock, OcrResult
+from paku_digest.pipelines.compare_pipeline import run_compare
+from paku_digest.store import ResultStore, ResultStoreWriter, is_result_store, write_store
+
+
+def _docs():
+    return [
+        Document(
+            path=Path("a.png"),
+            ocr=OcrResult(
+                engine="stub",
+                raw_text="line one\nline two",
+                blocks=[OcrBlock(text="line one", confidence=0.9)],
+                meta={"source": "a.png"},
+            ),
+        ),
+        Document(path=Path("b.png"), ocr=OcrResult(engine="stub", raw_text="é", language="it")),
+        Document(path=Path("c.png")),
+    ]
+
+
+def test_round_trip_and_lookup(tmp_path: Path):
+    out = tmp_path / "run.bin"
+    assert write_store(_docs(), out) == 3
+    assert is_result_store(out)
+
+    with ResultStore(out) as store:
+        assert len(store) == 3
+        assert list(store.paths()) == ["a.png", "b.png", "c.png"]
+        assert list(store) == _docs()
+
+        i = store.find("b.png")
+        assert i == 1
+        assert store.text(i) == "é"
+        assert store.get(Path("a.png")) == _docs()[0]
+        assert store.text(store.find("c.png")) is None
+        assert store.find("missing.png") is None
+        with pytest.raises(IndexError):
+            store.path_of(3)
+
+
+def test_text_view_is_zero_copy(tmp_path: Path):
+    out = tmp_path / "run.bin"
+    write_store(_docs(), out)
+
+    store = ResultStore(out)
+    view = store.text_view(0)
+    assert isinstance(view, memoryview)
+    assert view.readonly
+    assert bytes(view).decode("utf-8") == "line one\nline two"
+    view.release()
+    store.close()
+
+
+def test_many_documents_lookup(tmp_path: Path):
+    out = tmp_path / "run.bin"
+    docs = (
+        Document(path=Path(f"img/{i}.png"), ocr=OcrResult(engine="stub", raw_text=f"text {i}"))
+        for i in range(5000)
+    )
+    write_store(docs, out)
+
+    with ResultStore(out) as store:
+        for i in (0, 1234, 4999):
+            assert store.text(store.find(f"img/{i}.png")) == f"text {i}"
+
+
+def test_on_write_reports_record_ranges(tmp_path: Path):
+    out = tmp_path / "run.bin"
+    ranges = []
+    write_store(_docs(), out, on_write=lambda doc, start, end: ranges.append((start, end)))
+
+    assert len(ranges) == 3
+    assert all(start < end for start, end in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_unfinished_and_foreign_files_are_rejected(tmp_path: Path):
+    partial = tmp_path / "partial.bin"
+    writer = ResultStoreWriter(partial)
+    writer.write(_docs()[0])
+    writer.flush()
+    with pytest.raises(ValueError, match="incomplete"):
+        ResultStore(partial)
+    writer.close()
+
+    other = tmp_path / "run.json"
+    other.write_text("[]", encoding="utf-8")
+    assert not is_result_store(other)
+    with pytest.raises(ValueError, match="Not a result store"):
+        ResultStore(other)
+
+
+def test_failed_run_leaves_no_footer(tmp_path: Path):
+    out = tmp_path / "failed.bin"
+
+    def failing_docs():
+        yield _docs()[0]
+        raise RuntimeError("engine died")
+
+    with pytest.raises(RuntimeError):
+        write_store(failing_docs(), out)
+    with pytest.raises(ValueError, match="incomplete"):
+        ResultStore(out)
+
+
+def test_compare_reads_stores_and_json(tmp_path: Path):
+    left = tmp_path / "left.bin"
+    write_store(_docs(), left)
+
+    right_docs = [
+        {"path": "a.png", "ocr": {"engine": "stub", "raw_text": "line one\nline two"}},
+        {"path": "b.png", "ocr": {"engine": "stub", "raw_text": "e"}},
+        {"path": "d.png", "ocr": {"engine": "stub", "raw_text": "new"}},
+    ]
+    right_json = tmp_path / "right.json"
+    right_json.write_text(json.dumps(right_docs), encoding="utf-8")
+    right_bin = tmp_path / "right.bin"
+    write_store((Document.model_validate(d) for d in right_docs), right_bin)
+
+    from_json = run_compare(left, right_json)
+    from_bin = run_compare(left, right_bin)
+    assert from_json["per_path"] == from_bin["per_path"]
+    assert from_json["total_paths"] == 4
+    # a.png, plus c.png: no text on either side.
+    assert from_json["exact_equal_count"] == 2
+    assert from_json["left_only_count"] == 1
+    assert from_json["right_only_count"] == 1
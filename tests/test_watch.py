@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from paku_digest.watch import Debouncer, PollingSource, WatchSink, run_watch
+
+
+def _wait_for(predicate, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.02)
+
+
+def _lines(out: Path):
+    return out.read_text().splitlines() if out.exists() else []
+
+
+def test_debouncer_waits_for_file_to_settle(tmp_path: Path):
+    f = tmp_path / "a.png"
+    f.write_bytes(b"part")
+    st = f.stat()
+    debouncer = Debouncer(settle_s=1.0)
+
+    debouncer.observe(f, (st.st_size, st.st_mtime_ns), now=0.0)
+    assert debouncer.ready(now=0.5) == []
+
+    # Still being written: the clock restarts.
+    f.write_bytes(b"partial content")
+    assert debouncer.ready(now=0.8) == []
+    assert debouncer.ready(now=1.5) == []
+    ready = debouncer.ready(now=1.9)
+    assert [p for p, _ in ready] == [f]
+    assert len(debouncer) == 0
+
+
+def test_polling_source_reports_only_changes(tmp_path: Path):
+    (tmp_path / "a.png").write_bytes(b"a")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    source = PollingSource(tmp_path)
+
+    assert list(source.changes()) == [tmp_path / "a.png"]
+    assert source.changes() == {}
+
+    (tmp_path / "b.png").write_bytes(b"b")
+    (tmp_path / "a.png").write_bytes(b"changed")
+    assert sorted(p.name for p in source.changes()) == ["a.png", "b.png"]
+
+
+def test_watch_loads_a_strategy_s_engines_up_front(fresh_context, tmp_path: Path):
+    stop = threading.Event()
+    stop.set()
+    sink = WatchSink(tmp_path / "out.jsonl", "jsonl")
+    try:
+        run_watch(tmp_path, sink, ocr_engine_name="cascade", stop=stop, use_manifest=False)
+    finally:
+        sink.close()
+    assert fresh_context.ocr_engines.is_loaded("stub")
+
+
+def _start(root: Path, out: Path, **kwargs):
+    stop = threading.Event()
+    sink = WatchSink(out, "jsonl")
+    result = {}
+
+    def run():
+        result["written"] = run_watch(
+            root,
+            sink,
+            ocr_engine_name="stub",
+            interval=0.05,
+            settle_s=0.1,
+            stop=stop,
+            **kwargs,
+        )
+        sink.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return stop, thread, result
+
+
+@pytest.mark.parametrize("poll", [True, False])
+def test_watch_processes_new_and_changed_files(fresh_context, tmp_path: Path, poll: bool):
+    if not poll:
+        pytest.importorskip("watchdog")
+    root = tmp_path / "inbox"
+    root.mkdir()
+    (root / "existing.png").write_bytes(b"old")
+    out = tmp_path / "out.jsonl"
+
+    stop, thread, result = _start(root, out, poll=poll)
+    try:
+        _wait_for(lambda: len(_lines(out)) == 1)
+        (root / "new.png").write_bytes(b"new")
+        _wait_for(lambda: len(_lines(out)) == 2)
+        (root / "existing.png").write_bytes(b"edited")
+        _wait_for(lambda: len(_lines(out)) == 3)
+    finally:
+        stop.set()
+        thread.join()
+
+    names = [Path(json.loads(line)["path"]).name for line in _lines(out)]
+    assert names == ["existing.png", "new.png", "existing.png"]
+    assert result["written"] == 3
+
+    # A restart only picks up what changed while it was down.
+    (root / "later.png").write_bytes(b"later")
+    metrics = tmp_path / "metrics.prom"
+    stop, thread, result = _start(root, out, poll=True, metrics_out=metrics)
+    try:
+        _wait_for(lambda: len(_lines(out)) == 4)
+        time.sleep(0.3)
+    finally:
+        stop.set()
+        thread.join()
+    assert result["written"] == 1
+    assert Path(json.loads(_lines(out)[-1])["path"]).name == "later.png"
+    assert 'paku_documents_total{status="ok"}' in metrics.read_text()
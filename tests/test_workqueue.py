@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from paku_digest.models import Document, OcrResult
+from paku_digest.pipelines.export_pipeline import write_documents
+from paku_digest.workqueue import WorkQueue, iter_shard_documents, merge_shards, run_worker
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def _make_images(root: Path, count: int):
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        p = root / f"img_{i:03d}.png"
+        p.write_bytes(f"fake-{i}".encode())
+        paths.append(p)
+    return paths
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_leases_expire_and_are_requeued(tmp_path: Path):
+    clock = _Clock()
+    paths = _make_images(tmp_path / "in", 5)
+    with WorkQueue.create(tmp_path / "q", lease_s=10, max_attempts=2, clock=clock) as q:
+        assert q.enqueue(paths) == 5
+        assert q.enqueue(paths[:2]) == 0
+
+        a = q.lease("a", 3)
+        b = q.lease("b", 3)
+        assert len(a.tasks) == 3 and len(b.tasks) == 2
+        assert q.lease("c", 3).tasks == []
+        assert q.counts() == {"pending": 0, "leased": 5, "done": 0, "failed": 0}
+
+        q.complete("b", [task_id for task_id, _ in b.tasks])
+        clock.now += 5
+        assert q.renew(a) == 3
+        clock.now += 8  # within the renewed lease
+        assert q.lease("c", 3).tasks == []
+
+        # Worker a dies: its files come back once the lease runs out.
+        clock.now += 10
+        c = q.lease("c", 10)
+        assert sorted(c.paths) == sorted(a.paths)
+        assert q.renew(a) == 0
+
+        # A second expiry uses up max_attempts=2.
+        clock.now += 20
+        assert q.lease("d", 10).tasks == []
+        assert q.counts() == {"pending": 0, "leased": 0, "done": 2, "failed": 3}
+
+
+def test_failed_task_is_retried_then_given_up(tmp_path: Path):
+    with WorkQueue.create(tmp_path / "q", max_attempts=2) as q:
+        q.enqueue(_make_images(tmp_path / "in", 1))
+        (task_id, _), = q.lease("a", 1).tasks
+        q.fail("a", task_id, "boom")
+        assert q.counts()["pending"] == 1
+        (task_id, _), = q.lease("a", 1).tasks
+        q.fail("a", task_id, "boom again")
+        assert q.counts()["failed"] == 1
+        assert q.failures()[0][1] == "boom again"
+
+
+def test_worker_takes_over_dead_workers_leases(fresh_context, tmp_path: Path):
+    paths = _make_images(tmp_path / "in", 6)
+    qdir = tmp_path / "q"
+    with WorkQueue.create(qdir, lease_s=0.3) as q:
+        q.enqueue(paths)
+        q.lease("ghost", 4)  # never completed
+
+    assert run_worker(qdir, worker_id="w1", ocr_engine_name="stub", idle_wait_s=0.05) == 6
+    with WorkQueue(qdir) as q:
+        assert q.counts()["done"] == 6
+
+
+def test_torn_shards_are_repaired_and_deduplicated(fresh_context, tmp_path: Path):
+    paths = _make_images(tmp_path / "in", 3)
+    qdir = tmp_path / "q"
+    with WorkQueue.create(qdir) as q:
+        q.enqueue(paths)
+
+    # A crashed worker left a duplicate and a half-written line behind.
+    doc = Document(path=paths[0].resolve(), ocr=OcrResult(engine="stub", raw_text="x"))
+    shard = qdir / "shards" / "w1.jsonl"
+    with shard.open("w", encoding="utf-8") as f:
+        write_documents([doc], fmt="jsonl", stream=f)
+        f.write('{"path": "torn')
+
+    run_worker(qdir, worker_id="w1", ocr_engine_name="stub")
+    assert all(json.loads(line) for line in shard.read_text().splitlines())
+
+    out = tmp_path / "merged.jsonl"
+    assert merge_shards(qdir, out) == 3
+    assert len({d.path for d in iter_shard_documents(qdir)}) == 3
+
+
+def test_workers_in_separate_processes_share_a_queue(tmp_path: Path):
+    paths = _make_images(tmp_path / "in", 40)
+    qdir = tmp_path / "q"
+    env = {**os.environ, "PAKU_WORKDIR": str(tmp_path / "work"), "PAKU_LOG_LEVEL": "WARNING"}
+
+    def cli(*args):
+        return [sys.executable, "-m", "paku_digest.cli", "queue", *args]
+
+    subprocess.run(cli("init", str(qdir), str(tmp_path / "in")), cwd=REPO, env=env, check=True)
+    procs = [
+        subprocess.Popen(
+            cli("work", str(qdir), "--ocr", "stub", "--lease-size", "3", "--worker-id", f"w{i}"),
+            cwd=REPO,
+            env=env,
+        )
+        for i in range(3)
+    ]
+    assert [p.wait(timeout=120) for p in procs] == [0, 0, 0]
+
+    out = tmp_path / "merged.jsonl"
+    subprocess.run(cli("merge", str(qdir), "--out", str(out)), cwd=REPO, env=env, check=True)
+    merged = [json.loads(line)["path"] for line in out.read_text().splitlines()]
+    assert sorted(merged) == sorted(str(p.resolve()) for p in paths)